@@ -0,0 +1,18 @@
+"""
+Gunicorn hooks, read from the working directory by every entrypoint (the
+Procfiles and start.sh all run gunicorn from backend/).
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    """Drop the previous run's per-worker metrics files (see roadmap.metrics)"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roadmap_backend.settings')
+    from django.conf import settings
+
+    directory = settings.ROADMAP_METRICS.get('DIRECTORY')
+    if not directory:
+        return
+    for path in glob.glob(os.path.join(str(directory), '*.json*')):
+        os.unlink(path)
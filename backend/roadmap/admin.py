@@ -4,15 +4,11 @@ from .models import RoadmapItem, Upvote, Comment
 
 @admin.register(RoadmapItem)
 class RoadmapItemAdmin(admin.ModelAdmin):
-    list_display = ['title', 'status', 'category', 'upvote_count', 'created_at']
+    list_display = ['title', 'status', 'category', 'upvote_count', 'comment_count', 'created_at']
     list_filter = ['status', 'category', 'created_at']
     search_fields = ['title', 'description']
     list_editable = ['status']
     ordering = ['-created_at']
-    
-    def upvote_count(self, obj):
-        return obj.upvote_count
-    upvote_count.short_description = 'Upvotes'
 
 
 @admin.register(Upvote)
@@ -25,10 +21,10 @@ class UpvoteAdmin(admin.ModelAdmin):
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ['user', 'roadmap_item', 'parent_comment', 'content_preview', 'depth_level', 'created_at']
+    list_display = ['user', 'roadmap_item', 'parent_comment', 'content_preview', 'depth', 'created_at']
     list_filter = ['created_at', 'roadmap_item']
     search_fields = ['user__username', 'content', 'roadmap_item__title']
-    readonly_fields = ['created_at', 'updated_at', 'depth_level']
+    readonly_fields = ['created_at', 'updated_at', 'depth', 'root_comment']
     
     def content_preview(self, obj):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
@@ -0,0 +1,160 @@
+"""
+Async variants of the roadmap read endpoints, for serving under ASGI.
+
+Each async view wraps the existing DRF view class and reuses everything that
+does not touch the database: request parsing, filter backends, ordering,
+pagination links, serializers, conditional GET and the response cache. Only
+the steps that run SQL are swapped for the async ORM (``aget``, ``acount``,
+``async for``), so a slow client or a slow SQLite read parks a coroutine
+instead of holding a worker thread. Authentication and permission checks,
+which may hit the database through pluggable backends, run in
+``sync_to_async``; token lookups are usually served by the token cache anyway.
+
+Other methods (POST to the comments endpoint) are handed to the sync view
+unchanged. ``urls.py`` routes to these views when ``ROADMAP_ASYNC_READS`` is
+on; the JSON output is identical either way.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+
+from . import views
+from .cache import AnonymousResponseCacheMixin
+from .conditional import ConditionalGetMixin
+from .models import ContentVersion
+from .search import search_index_available, search_index_available_for
+from .serializers import RoadmapItemDetailSerializer
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class AsyncReadView:
+    """Runs the GET path of ``view_class`` on the async ORM"""
+    view_class = None
+
+    @classmethod
+    def as_view(cls):
+        sync_view = cls.view_class.as_view()
+
+        async def view(request, *args, **kwargs):
+            if request.method not in READ_METHODS:
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            return await cls().dispatch(request, *args, **kwargs)
+
+        view.view_class = cls.view_class
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        view = self.view_class()
+        view.args = args
+        view.kwargs = kwargs
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request = request
+        view.headers = view.default_response_headers
+        try:
+            await sync_to_async(view.initial)(request, *args, **kwargs)
+            response = await self.get(view, request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        response = view.finalize_response(request, response, *args, **kwargs)
+        # JSON rendering is pure CPU; doing it here saves the handler a thread hop
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+
+    async def get(self, view, request):
+        """ConditionalGetMixin.get and AnonymousResponseCacheMixin.get, in the same order"""
+        if not isinstance(view, ConditionalGetMixin):
+            return await self.cached_or_read(view, request)
+
+        version, updated_at = await ContentVersion.acurrent(view.get_version_scope())
+        etag, last_modified = view.get_validators(request, version, updated_at)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await self.cached_or_read(view, request)
+            if response.status_code != 200:
+                return response
+        return view.set_validators(response, etag, last_modified)
+
+    async def cached_or_read(self, view, request):
+        if isinstance(view, AnonymousResponseCacheMixin):
+            response = view.get_cached_response(request)
+            if response is not None:
+                return response
+        if hasattr(view, 'upvoted_item_ids'):
+            # A first read of the user's upvote set queries; the serializer reuses it
+            await sync_to_async(view.upvoted_item_ids)()
+        return await self.read(view, request)
+
+    async def read(self, view, request):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncReadView):
+    """ListAPIView.list with the page fetched through the async ORM"""
+
+    async def read(self, view, request):
+        queryset = view.get_queryset()
+        if not search_index_available.cache_info().currsize:
+            # Resolved (and cached) off the event loop before the search filter asks
+            await sync_to_async(search_index_available_for)(queryset)
+        queryset = view.filter_queryset(queryset)
+        response = await self.page(view, request, queryset)
+        facets = view.facet_queryset(queryset) if hasattr(view, 'facet_queryset') else None
+        if facets is not None:
+            response.data['facets'] = view.facet_counts([row async for row in facets])
+        return response
+
+    async def page(self, view, request, queryset):
+        paginator = view.paginator
+        if paginator is not None:
+            page = await paginator.apaginate_queryset(queryset, request, view=view)
+            if page is not None:
+                return paginator.get_paginated_response(view.get_serializer(page, many=True).data)
+        rows = [row async for row in queryset]
+        return Response(view.get_serializer(rows, many=True).data)
+
+
+class AsyncRoadmapItemListView(AsyncListView):
+    view_class = views.RoadmapItemListView
+
+
+class AsyncRoadmapCommentsView(AsyncListView):
+    view_class = views.RoadmapCommentsView
+
+
+class AsyncRoadmapItemDetailView(AsyncReadView):
+    """RetrieveAPIView.retrieve with the item and its comment thread loaded asynchronously"""
+    view_class = views.RoadmapItemDetailView
+
+    async def read(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, ValueError, TypeError):
+            # Same message as get_object_or_404 in the sync view
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        view.check_object_permissions(request, instance)
+
+        if view.wants_field('comments'):
+            instance.comment_thread = [
+                comment async for comment in RoadmapItemDetailSerializer.comment_queryset(instance)
+            ]
+        return Response(view.get_serializer(instance).data)
+
+
+class AsyncUserProfileView(AsyncReadView):
+    view_class = views.user_profile.cls
+
+    async def read(self, view, request):
+        # request.user is already resolved by authentication; no further queries
+        return view.get(request)
+
+
+roadmap_list = AsyncRoadmapItemListView.as_view()
+roadmap_detail = AsyncRoadmapItemDetailView.as_view()
+roadmap_comments = AsyncRoadmapCommentsView.as_view()
+user_profile = AsyncUserProfileView.as_view()
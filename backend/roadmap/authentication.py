@@ -0,0 +1,146 @@
+"""
+Token authentication with an in-process cache of token -> user lookups.
+
+DRF's TokenAuthentication joins ``authtoken_token`` and ``auth_user`` on every
+authenticated request. ``CachedTokenAuthentication`` keeps recent results in a
+bounded LRU with a TTL, so repeat requests skip the database entirely.
+
+Entries are evicted when the token is deleted (logout) and whenever the user
+row is saved or deleted (deactivation, profile edits); see signals.py. The LRU
+is private to each worker process, so evictions also leave a short-lived
+tombstone in the shared ``ALIAS`` cache that other workers check on a hit.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+
+from .timing import TimedAuthenticationMixin
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_TOKEN_CACHE', {})
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> (user, token, expiry, cached_at)"""
+    tombstone_prefix = 'roadmap:token:revoked'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', True)
+
+    @property
+    def max_size(self):
+        return _settings().get('MAX_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return _settings().get('TTL', 300)
+
+    @property
+    def shared(self):
+        alias = _settings().get('ALIAS')
+        return caches[alias] if alias else None
+
+    def tombstone_key(self, key):
+        return f'{self.tombstone_prefix}:{key}'
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and self.shared is not None:
+            # Evicted (on any worker) since this copy was cached
+            evicted_at = self.shared.get(self.tombstone_key(key))
+            if evicted_at is not None and evicted_at >= entry[3]:
+                self.discard(key)
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            return None
+        # A copy, so per-request state (cached relations) never leaks between requests
+        return copy.copy(entry[0]), entry[1]
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._entries[key] = (user, token, time.monotonic() + self.ttl, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def evict(self, key):
+        """Drop ``key`` here and make every other worker drop it on its next hit"""
+        self.discard(key)
+        if self.shared is not None:
+            # The eviction time, never deleted: entries cached before it are stale
+            # everywhere, while copies re-cached after it stay valid
+            self.shared.set(self.tombstone_key(key), time.time(), timeout=self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, len(self._entries)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+            'size': size,
+            'max_size': self.max_size,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TimedAuthenticationMixin, TokenAuthentication):
+    """TokenAuthentication backed by ``token_cache``"""
+
+    def authenticate_credentials(self, key):
+        if not token_cache.enabled:
+            return super().authenticate_credentials(key)
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        # Inactive users and unknown tokens raise here and are never cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
+
+
+class TimedSessionAuthentication(TimedAuthenticationMixin, SessionAuthentication):
+    """SessionAuthentication whose work is reported as ``auth`` in Server-Timing"""
@@ -0,0 +1,126 @@
+"""
+In-process dispatch of batched GET sub-requests (``POST /api/batch/``).
+
+The batch request goes through the middleware stack and DRF authentication
+once. Each sub-request is then a bare ``HttpRequest`` resolved against the
+URLconf and handed straight to the view. The resolved user and token ride
+along as DRF's forced authentication, so the sub-views skip their own
+authenticators but still apply their permission checks, throttles, response
+cache and serializers exactly as for a standalone call.
+
+Sub-responses are already-rendered JSON. They are spliced into the batch
+body as raw bytes instead of being parsed and re-encoded.
+"""
+import json
+import logging
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+# The DRF read endpoints; only these understand the forced authentication
+BATCHABLE_ROUTES = {
+    'roadmap_list', 'roadmap_detail', 'roadmap_comments', 'roadmap_stats', 'user_profile', 'my_upvotes',
+}
+FORWARDED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_BATCH', {})
+
+
+def max_requests():
+    return _settings().get('MAX_REQUESTS', 10)
+
+
+class BatchError(ValueError):
+    """The batch payload itself is malformed; nothing is dispatched"""
+
+
+def parse_batch(data):
+    """``[(id, method, path)]`` from ``{"requests": [...]}``; entries are paths or objects"""
+    entries = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise BatchError('requests must be a non-empty list')
+    if len(entries) > max_requests():
+        raise BatchError(f'A batch may contain at most {max_requests()} requests')
+    parsed = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        if not isinstance(entry, dict) or not isinstance(entry.get('path'), str):
+            raise BatchError(f'requests[{index}] must be a path or an object with a path')
+        parsed.append((entry.get('id', index), str(entry.get('method', 'GET')).upper(), entry['path']))
+    return parsed
+
+
+def build_subrequest(request, path, query):
+    """A GET to ``path`` carrying the batch request's headers and resolved credentials"""
+    subrequest = HttpRequest()
+    subrequest.method = 'GET'
+    subrequest.path = subrequest.path_info = path
+    subrequest.META = {
+        key: value for key, value in request.META.items()
+        if key.startswith('HTTP_') or key in ('SERVER_NAME', 'SERVER_PORT', 'REMOTE_ADDR', 'wsgi.url_scheme')
+    }
+    # Sub-responses are always full bodies
+    subrequest.META.pop('HTTP_IF_NONE_MATCH', None)
+    subrequest.META.pop('HTTP_IF_MODIFIED_SINCE', None)
+    subrequest.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query})
+    subrequest.GET = QueryDict(query)
+    subrequest.COOKIES = request.COOKIES
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def error_part(request_id, status_code, message):
+    return json.dumps({'id': request_id, 'status': status_code, 'body': {'error': message}}).encode()
+
+
+def dispatch(request, request_id, method, target):
+    """One JSON-encoded entry of the ``responses`` list"""
+    if method != 'GET':
+        return error_part(request_id, 405, 'Only GET sub-requests can be batched')
+    url = urlsplit(target)
+    if url.scheme or url.netloc or not url.path.startswith('/'):
+        return error_part(request_id, 400, 'path must be an absolute path on this server')
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return error_part(request_id, 404, 'Not found')
+    if match.namespace != 'roadmap' or match.url_name not in BATCHABLE_ROUTES:
+        return error_part(request_id, 400, 'This route cannot be batched')
+
+    subrequest = build_subrequest(request, url.path, url.query)
+    subrequest.resolver_match = match
+    try:
+        if iscoroutinefunction(match.func):
+            response = async_to_sync(match.func)(subrequest, *match.args, **match.kwargs)
+        else:
+            response = match.func(subrequest, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    except Exception:
+        # One failing sub-request must not take the rest of the batch down with it
+        logger.exception('Batched sub-request to %s failed', url.path)
+        return error_part(request_id, 500, 'Internal server error')
+
+    content = response.content
+    if not response.get('Content-Type', '').startswith('application/json') or not content:
+        content = json.dumps(content.decode(response.charset, 'replace')).encode()
+    head = {'id': request_id, 'status': response.status_code}
+    headers = {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)}
+    if headers:
+        head['headers'] = headers
+    return json.dumps(head)[:-1].encode() + b', "body": ' + content + b'}'
+
+
+def run_batch(request, entries):
+    """The ``{"responses": [...]}`` body for parsed ``entries``, in order"""
+    parts = [dispatch(request, request_id, method, path) for request_id, method, path in entries]
+    return b'{"responses": [' + b', '.join(parts) + b']}'
@@ -0,0 +1,186 @@
+"""
+Versioned response cache for anonymous roadmap reads.
+
+Cached bodies are keyed by the normalized query string and a version number:
+one global version for list responses and one per roadmap item for detail
+responses. Writes bump the versions (see signals.py), so a cached response is
+never served after the data behind it changed; old entries simply stop being
+addressed and age out with the cache timeout.
+
+The cache alias comes from ``settings.ROADMAP_RESPONSE_CACHE``. A local-memory
+cache is private to each worker process, so deployments running several
+gunicorn workers should point it at the file-based cache instead.
+"""
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+LIST_SCOPE = 'list'
+
+
+def item_scope(item_id):
+    return f'item:{item_id}'
+
+
+def change_scopes(item_id=None):
+    """Scopes affected by a change to ``item_id`` (or to the list as a whole)"""
+    return [LIST_SCOPE] if item_id is None else [LIST_SCOPE, item_scope(item_id)]
+
+
+def normalized_query(request):
+    """
+    Query string with parameters sorted. Empty values are kept: a parameter
+    that is present but blank may still change the response.
+    """
+    return urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_RESPONSE_CACHE', {})
+
+
+class ResponseCache:
+    """Thin wrapper over a Django cache alias that tracks hits and misses"""
+    key_prefix = 'roadmap:response'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', True)
+
+    @property
+    def cache(self):
+        return caches[_settings().get('ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return _settings().get('TIMEOUT', 300)
+
+    def version_key(self, scope):
+        return f'{self.key_prefix}:version:{scope}'
+
+    def get_version(self, scope):
+        key = self.version_key(scope)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, 1, timeout=None)
+            version = self.cache.get(key, 1)
+        return version
+
+    def bump(self, scope):
+        key = self.version_key(scope)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, timeout=None)
+            self.cache.incr(key)
+
+    def invalidate(self, item_id=None):
+        """
+        Invalidate the list responses and, when given, one item's detail
+        responses. Bumped now and again on commit, so a reader that cached the
+        pre-commit state in between is invalidated as well.
+        """
+        scopes = change_scopes(item_id)
+
+        def bump_all():
+            for scope in scopes:
+                self.bump(scope)
+
+        bump_all()
+        transaction.on_commit(bump_all)
+
+    def build_key(self, view_name, scope, request):
+        # The bodies hold absolute next/previous links, so the origin is part of the key
+        origin = f'{request.scheme}://{request.get_host()}'
+        digest = hashlib.sha1(f'{origin}?{normalized_query(request)}'.encode('utf-8')).hexdigest()
+        return f'{self.key_prefix}:{view_name}:{scope}:v{self.get_version(scope)}:{digest}'
+
+    def get(self, key):
+        content = self.cache.get(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def set(self, key, content):
+        self.cache.set(key, content, timeout=self.timeout)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+response_cache = ResponseCache()
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Serve GET responses for anonymous users from ``response_cache``.
+
+    Views set ``response_cache_name`` and may override ``get_response_cache_scope``
+    to key on a single item's version instead of the global list version.
+    """
+    response_cache_name = None
+
+    def get_response_cache_scope(self):
+        return LIST_SCOPE
+
+    def get_response_cache_key(self, request):
+        if not response_cache.enabled or request.user.is_authenticated:
+            return None
+        return response_cache.build_key(
+            self.response_cache_name, self.get_response_cache_scope(), request
+        )
+
+    def get_cached_response(self, request):
+        """The stored response for this request, or None (remembering the key to store under)"""
+        self.response_cache_key = self.get_response_cache_key(request)
+        if self.response_cache_key is None:
+            return None
+        content = response_cache.get(self.response_cache_key)
+        if content is None:
+            return None
+        response = HttpResponse(content, content_type='application/json')
+        response['X-Cache'] = 'HIT'
+        return response
+    
+    def get(self, request, *args, **kwargs):
+        response = self.get_cached_response(request)
+        if response is not None:
+            return response
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'response_cache_key', None)
+        if key is not None and response.status_code == 200 and hasattr(response, 'render'):
+            response.render()
+            response_cache.set(key, response.content)
+            response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,55 @@
+"""
+Conditional GET (ETag / Last-Modified) for roadmap read endpoints.
+
+The validator is the ContentVersion counter for the view's scope, so checking
+it costs one primary-key lookup; a matching ``If-None-Match`` is answered with
+304 before any queryset is built or serializer runs. The ETag also covers the
+view, the normalized query string and the requesting user, because payloads
+carry per-user fields (``user_upvoted``, ``can_edit``) that must never be
+revalidated across users.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import LIST_SCOPE, normalized_query
+from .models import ContentVersion
+
+
+class ConditionalGetMixin:
+    """Answer GETs with ETag/Last-Modified and 304 for unchanged content"""
+
+    def get_version_scope(self):
+        return LIST_SCOPE
+
+    def get_etag(self, request, version):
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        key = '|'.join([
+            type(self).__name__, self.get_version_scope(), str(version),
+            str(user), normalized_query(request),
+        ])
+        return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get_validators(self, request, version, updated_at):
+        """(etag, last_modified timestamp) for a ContentVersion row"""
+        last_modified = updated_at.timestamp() if updated_at else None
+        return self.get_etag(request, version), last_modified
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(
+            request, *ContentVersion.current(self.get_version_scope())
+        )
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, last_modified)
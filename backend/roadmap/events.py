@@ -0,0 +1,397 @@
+"""
+Live stream of upvote and comment changes over Server-Sent Events.
+
+Write paths call ``publish`` inside their transaction. It inserts a
+``LiveEvent`` row carrying the item's counters after the change (and the ids
+of the comments involved), so the event commits or rolls back with the change
+itself. The table is the fan-out between workers: each process runs one
+``EventHub`` thread that tails it every ``POLL_INTERVAL`` seconds while anyone
+is subscribed, keeps the newest events in a ring buffer, and wakes its
+subscribers. The cost is one indexed query per worker per interval, however
+many clients are connected.
+
+Because ids come from the table, they are shared by all workers and only
+grow. That makes ``Last-Event-ID`` resumption a range read: a reconnecting
+client gets everything after its id, from the ring if it is recent enough
+and from the table otherwise. Rows beyond ``RETENTION`` are pruned. A client
+that falls further behind than that gets a ``reset`` event and should refetch.
+
+Streams end after ``MAX_DURATION`` seconds and browsers reconnect on their
+own (resuming from the last id), which bounds how long a sync worker is held.
+Under WSGI each open stream occupies a worker thread, so a process serves at
+most ``MAX_SYNC_STREAMS`` of them and answers further ones with a 503. Under
+ASGI the stream is an async iterator and holds no thread at all.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Max, Min
+
+from .models import LiveEvent, RoadmapItem
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_LIVE_EVENTS', {})
+
+
+def publish(kind, roadmap_item, comment_ids=()):
+    """Record a change to ``roadmap_item``, whose counters must already be up to date"""
+    event = LiveEvent.objects.create(
+        kind=kind,
+        roadmap_item_id=roadmap_item.pk,
+        upvote_count=roadmap_item.upvote_count,
+        comment_count=roadmap_item.comment_count,
+        comment_ids=list(comment_ids),
+    )
+    prune(event.pk, event.pk)
+    return event
+
+
+def publish_counts(kind, item_ids):
+    """``publish`` for a batch of items, reading their counters from the database"""
+    rows = RoadmapItem.objects.filter(pk__in=item_ids).order_by('pk').values_list(
+        'pk', 'upvote_count', 'comment_count'
+    )
+    events = LiveEvent.objects.bulk_create([
+        LiveEvent(kind=kind, roadmap_item_id=pk, upvote_count=upvotes, comment_count=comments)
+        for pk, upvotes, comments in rows
+    ])
+    if events:
+        prune(events[0].pk, events[-1].pk)
+    return events
+
+
+def prune(first_id, last_id):
+    """Each time ids cross a multiple of ``PRUNE_EVERY``, drop all but the last ``RETENTION``"""
+    every = _settings().get('PRUNE_EVERY', 500)
+    if last_id // every > (first_id - 1) // every:
+        LiveEvent.objects.filter(pk__lte=last_id - _settings().get('RETENTION', 10000)).delete()
+
+
+def encode_event(event_id, kind, item_id, upvote_count, comment_count, comment_ids):
+    """The SSE frame for one event"""
+    data = json.dumps({
+        'item': item_id,
+        'upvote_count': upvote_count,
+        'comments_count': comment_count,
+        'comment_ids': comment_ids,
+    }, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'.encode()
+
+
+EVENT_FIELDS = ('pk', 'roadmap_item_id', 'kind', 'upvote_count', 'comment_count', 'comment_ids')
+
+
+def frame_row(row):
+    """``(id, item_id, frame)`` for a ``values_list(*EVENT_FIELDS)`` row"""
+    pk, item_id, kind, upvotes, comments, comment_ids = row
+    return pk, item_id, encode_event(pk, kind, item_id, upvotes, comments, comment_ids)
+
+
+class Subscription:
+    """One connected stream's wake-up signal, for a thread or an event loop"""
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.ready = threading.Event() if loop is None else asyncio.Event()
+
+    def clear(self):
+        self.ready.clear()
+
+    def notify(self):
+        if self.loop is None:
+            self.ready.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:
+            pass  # the loop has shut down; the stream is gone
+
+    def wait(self, timeout):
+        """True if woken, False on timeout (thread subscriptions)"""
+        return self.ready.wait(timeout)
+
+    async def await_ready(self, timeout):
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class EventHub:
+    """This worker's tail of the LiveEvent table and its subscribers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._subscribers = set()
+        self._ring = deque()
+        # The ring holds every event with floor < id <= head
+        self.head = None
+        self.floor = None
+        self._poller = None
+        self.polls = 0
+        self._sync_streams = 0
+        self.rejected = 0
+
+    @property
+    def poll_interval(self):
+        return _settings().get('POLL_INTERVAL', 0.5)
+
+    @property
+    def buffer_size(self):
+        return _settings().get('BUFFER', 1000)
+
+    def _start(self):
+        """Anchor the ring at the newest event (sync context only)"""
+        with self._lock:
+            started = self.head is not None
+        if not started:
+            last = LiveEvent.objects.aggregate(last=Max('pk'))['last'] or 0
+            with self._lock:
+                if self.head is None:
+                    self.head = self.floor = last
+        if self._poller is None and self.poll_interval:
+            with self._lock:
+                if self._poller is None:
+                    self._poller = threading.Thread(target=self._run_poller, name='live-events', daemon=True)
+                    self._poller.start()
+
+    def subscribe(self, loop=None):
+        """Register a stream; returns its Subscription and the current head id"""
+        self._start()
+        subscription = Subscription(loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+            self._wakeup.notify()
+            return subscription, self.head
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def hold_thread(self):
+        """Claim one of the ``MAX_SYNC_STREAMS`` slots; False if they are all taken"""
+        limit = _settings().get('MAX_SYNC_STREAMS', 2)
+        with self._lock:
+            if limit is not None and self._sync_streams >= limit:
+                self.rejected += 1
+                return False
+            self._sync_streams += 1
+            return True
+
+    def release_thread(self):
+        with self._lock:
+            self._sync_streams -= 1
+
+    def events_after(self, cursor):
+        """
+        ``(id, item_id, frame)`` for buffered events after ``cursor``, or None
+        if the ring no longer reaches back that far and the table must be read
+        """
+        with self._lock:
+            if self.floor is None or cursor < self.floor:
+                return None
+            if cursor >= self.head:
+                return []
+            return [event for event in self._ring if event[0] > cursor]
+
+    def poll(self):
+        """Pull new rows into the ring and wake subscribers; returns how many arrived"""
+        with self._lock:
+            if self.head is None:
+                return 0
+            head = self.head
+        batch = _settings().get('BATCH_SIZE', 500)
+        arrived = []
+        while True:
+            rows = list(
+                LiveEvent.objects.filter(pk__gt=head).order_by('pk').values_list(*EVENT_FIELDS)[:batch]
+            )
+            arrived.extend(frame_row(row) for row in rows)
+            if len(rows) < batch:
+                break
+            head = rows[-1][0]
+        with self._lock:
+            self.polls += 1
+            arrived = [event for event in arrived if event[0] > self.head]
+            if not arrived:
+                return 0
+            self._ring.extend(arrived)
+            while len(self._ring) > self.buffer_size:
+                self.floor = self._ring.popleft()[0]
+            self.head = arrived[-1][0]
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.notify()
+        return len(arrived)
+
+    def _run_poller(self):
+        while True:
+            with self._lock:
+                while not self._subscribers:
+                    self._wakeup.wait()
+            close_old_connections()
+            try:
+                self.poll()
+            except Exception:
+                # The table is re-read from the same head on the next pass
+                connections.close_all()
+            time.sleep(self.poll_interval)
+
+    def reset(self):
+        """Forget buffered events and the anchor (tests)"""
+        with self._lock:
+            self._ring.clear()
+            self.head = self.floor = None
+            self._sync_streams = self.rejected = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'sync_streams': self._sync_streams,
+                'rejected': self.rejected,
+                'buffered': len(self._ring),
+                'head': self.head,
+                'polls': self.polls,
+            }
+
+
+event_hub = EventHub()
+
+
+def parse_event_id(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class HeldStream:
+    """
+    A WSGI stream's frames, holding a slot from ``event_hub.hold_thread`` until
+    the server closes the response, whether or not it was ever iterated
+    """
+
+    def __init__(self, frames):
+        self._frames = frames
+        self._held = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._frames)
+
+    def close(self):
+        if self._held:
+            self._held = False
+            self._frames.close()
+            event_hub.release_thread()
+
+
+class EventStream:
+    """
+    The frames for one client: replay after ``last_event_id`` (if given),
+    then live events, with heartbeats, until ``MAX_DURATION`` elapses.
+    ``item_id`` restricts the stream to a single roadmap item.
+    """
+
+    def __init__(self, item_id=None, last_event_id=None):
+        self.item_id = item_id
+        self.last_event_id = last_event_id
+        config = _settings()
+        self.heartbeat = config.get('HEARTBEAT', 15)
+        self.max_duration = config.get('MAX_DURATION', 300)
+        self.retry = config.get('RETRY', 3000)
+        self.batch_size = config.get('BATCH_SIZE', 500)
+
+    def start(self, head):
+        """The opening frames and the id to stream after; queries the table when resuming"""
+        frames = [f'retry: {self.retry}\n\n'.encode()]
+        if self.last_event_id is None:
+            return frames, head
+        oldest = LiveEvent.objects.aggregate(oldest=Min('pk'))['oldest']
+        if self.last_event_id > head or (oldest is not None and self.last_event_id + 1 < oldest):
+            # Missed events were pruned, or the ids belong to another database
+            frames.append(b'event: reset\ndata: {}\n\n')
+            return frames, head
+        return frames, self.last_event_id
+
+    def read(self, cursor):
+        """``(frames, cursor)`` from the hub's ring, or None if it does not reach back to ``cursor``"""
+        events = event_hub.events_after(cursor)
+        if not events:
+            return events if events is None else ([], cursor)
+        frames = [frame for _, item_id, frame in events if self.item_id is None or item_id == self.item_id]
+        return frames, events[-1][0]
+
+    def read_table(self, cursor):
+        """``(frames, cursor)`` for the next batch of missed events, read from the table"""
+        upper = event_hub.head
+        queryset = LiveEvent.objects.filter(pk__gt=cursor, pk__lte=upper)
+        if self.item_id is not None:
+            queryset = queryset.filter(roadmap_item_id=self.item_id)
+        rows = list(queryset.order_by('pk').values_list(*EVENT_FIELDS)[:self.batch_size])
+        frames = [frame_row(row)[2] for row in rows]
+        return frames, rows[-1][0] if len(rows) == self.batch_size else upper
+
+    def frames(self):
+        """The stream as a generator, for WSGI"""
+        subscription, head = event_hub.subscribe()
+        try:
+            frames, cursor = self.start(head)
+            yield b''.join(frames)
+            deadline = time.monotonic() + self.max_duration
+            last_sent = time.monotonic()
+            while True:
+                subscription.clear()
+                frames, cursor = self.read(cursor) or self.read_table(cursor)
+                if frames:
+                    yield b''.join(frames)
+                    last_sent = time.monotonic()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                woken = subscription.wait(min(self.heartbeat, remaining))
+                if not woken and time.monotonic() - last_sent >= self.heartbeat:
+                    yield b': keep-alive\n\n'
+                    last_sent = time.monotonic()
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    async def aframes(self):
+        """The stream as an async generator, for ASGI; only table reads leave the event loop"""
+        loop = asyncio.get_running_loop()
+        subscription, head = await sync_to_async(event_hub.subscribe)(loop)
+        try:
+            frames, cursor = await sync_to_async(self.start)(head)
+            yield b''.join(frames)
+            deadline = time.monotonic() + self.max_duration
+            last_sent = time.monotonic()
+            while True:
+                subscription.clear()
+                result = self.read(cursor)
+                frames, cursor = result or await sync_to_async(self.read_table)(cursor)
+                if frames:
+                    yield b''.join(frames)
+                    last_sent = time.monotonic()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                woken = await subscription.await_ready(min(self.heartbeat, remaining))
+                if not woken and time.monotonic() - last_sent >= self.heartbeat:
+                    yield b': keep-alive\n\n'
+                    last_sent = time.monotonic()
+        finally:
+            event_hub.unsubscribe(subscription)
@@ -0,0 +1,80 @@
+"""
+Sparse fieldsets for the roadmap read endpoints.
+
+``?fields=id,title,upvote_count`` keeps only the named fields and
+``?omit=description`` drops fields from the full set. Both accept a
+comma-separated list or repeated parameters, and may be combined. Requested
+fields keep exactly the shape they have in the full response.
+
+The selection trims the queries as well as the payload. Views declare which
+columns and which per-request work each field needs, and ``sparse_queryset``
+loads only those columns with ``.only()``. Views also skip work such as the
+``user_upvoted`` subquery or the nested comment thread when nobody asked for
+the field. The ETag and the anonymous response cache are both keyed on the
+query string, so each fieldset is validated and cached separately.
+"""
+from rest_framework.exceptions import ValidationError
+
+
+def parse_field_list(request, name):
+    """The named fields, or None when the parameter is absent or blank (``?fields=``)"""
+    names = {part.strip() for value in request.query_params.getlist(name) for part in value.split(',')}
+    names.discard('')
+    return names or None
+
+
+class SparseFieldsetMixin:
+    """
+    Serve ``fields`` / ``omit`` selections for GET requests. ``field_columns``
+    maps each serializer field to the model columns it reads; columns in
+    ``always_load`` are loaded regardless (ordering and cursor positions).
+    """
+    field_columns = {}
+    always_load = ()
+
+    def available_fields(self):
+        return list(self.get_serializer_class().Meta.fields)
+
+    @property
+    def sparse_fields(self):
+        """The selected field names, or None for the full representation"""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def parse_sparse_fields(self):
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        fields = parse_field_list(self.request, 'fields')
+        omit = parse_field_list(self.request, 'omit')
+        if fields is None and omit is None:
+            return None
+        available = self.available_fields()
+        errors = {}
+        for name, requested in (('fields', fields), ('omit', omit)):
+            unknown = sorted((requested or set()) - set(available))
+            if unknown:
+                errors[name] = [
+                    f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}"
+                ]
+        if errors:
+            raise ValidationError(errors)
+        selected = set(available) if fields is None else fields
+        return selected - (omit or set())
+
+    def wants_field(self, name):
+        return self.sparse_fields is None or name in self.sparse_fields
+
+    def sparse_queryset(self, queryset):
+        """``queryset`` loading only the columns the selected fields read"""
+        if self.sparse_fields is None:
+            return queryset
+        columns = set(self.always_load)
+        for name in self.sparse_fields:
+            columns.update(self.field_columns.get(name, (name,)))
+        return queryset.only(*sorted(columns))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.sparse_fields is not None:
+            kwargs.setdefault('fields', self.sparse_fields)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,61 @@
+from django.db import models
+from django.db.models import F, Func, Value
+from rest_framework import filters
+from .search import build_match_expression, search_index_available_for
+
+
+class RoadmapOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that also understands the ``sort_by`` presets declared on a
+    view as ``sort_by_orderings``. An explicit ``ordering`` parameter still wins,
+    and full-text results are ranked by relevance unless either is given.
+    """
+    sort_by_param = 'sort_by'
+    
+    def get_ordering(self, request, queryset, view):
+        explicit = (
+            self.ordering_param in request.query_params or
+            self.sort_by_param in request.query_params
+        )
+        if not explicit and FullTextSearchFilter.rank_annotation in queryset.query.annotations:
+            return [FullTextSearchFilter.rank_annotation] + list(self.get_default_ordering(view))
+        return super().get_ordering(request, queryset, view)
+    
+    def get_default_ordering(self, view):
+        sort_by = view.request.query_params.get(self.sort_by_param)
+        presets = getattr(view, 'sort_by_orderings', {})
+        if sort_by in presets:
+            return list(presets[sort_by])
+        return super().get_default_ordering(view)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter backed by the FTS5 index on RoadmapItem, annotating each match
+    with its BM25 rank (lower is better) and, with ``?highlight=true``, a
+    highlighted snippet. Falls back to ``LIKE`` matching when the index is not
+    available on the current database.
+    """
+    highlight_param = 'highlight'
+    rank_annotation = 'search_rank'
+    snippet_annotation = 'search_snippet'
+    snippet_tokens = 12
+    
+    def filter_queryset(self, request, queryset, view):
+        if not search_index_available_for(queryset):
+            return super().filter_queryset(request, queryset, view)
+        
+        match = build_match_expression(self.get_search_terms(request))
+        if not match:
+            return queryset
+        
+        queryset = queryset.filter(search_index__document__match=match).annotate(
+            **{self.rank_annotation: F('search_index__rank')}
+        )
+        if request.query_params.get(self.highlight_param, '').lower() in ('1', 'true'):
+            queryset = queryset.annotate(**{self.snippet_annotation: Func(
+                F('search_index__document'), Value(-1), Value('<mark>'), Value('</mark>'),
+                Value('…'), Value(self.snippet_tokens),
+                function='snippet', output_field=models.TextField()
+            )})
+        return queryset
@@ -0,0 +1,153 @@
+"""
+Password hashing on a small bounded thread pool.
+
+PBKDF2 is pure CPU. Run inline, a burst of logins ties up every request
+thread and starves roadmap reads. ``login`` and ``register`` hand the hashing to
+``hashing_pool`` instead: at most ``WORKERS`` hashes run at once per process
+(hashlib releases the GIL, so these are real cores) and at most ``MAX_QUEUE``
+more may wait. Anything beyond that is rejected straight away with
+``HashingPoolFull``, which the views turn into a 503 with ``Retry-After``.
+
+Only the hashing moves to the pool; database access stays on the request
+thread, so it keeps its connection and transaction. The request thread still
+waits for its hash: the gain is the cap on concurrent hashes, not a freed thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+
+class HashingPoolFull(Exception):
+    """Every hashing slot and queue position is taken"""
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_PASSWORD_HASHING', {})
+
+
+class PasswordHashingPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._size = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', True)
+
+    @property
+    def workers(self):
+        return _settings().get('WORKERS', 2)
+
+    @property
+    def capacity(self):
+        return self.workers + _settings().get('MAX_QUEUE', 8)
+
+    @property
+    def timeout(self):
+        return _settings().get('TIMEOUT', 30)
+
+    @property
+    def retry_after(self):
+        return _settings().get('RETRY_AFTER', 1)
+
+    def _get_executor(self):
+        # Rebuilt if WORKERS changes (settings overrides in tests)
+        if self._executor is None or self._size != self.workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._size = self.workers
+            self._executor = ThreadPoolExecutor(max_workers=self._size, thread_name_prefix='password-hashing')
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def submit(self, fn, *args):
+        """Queue ``fn(*args)`` and return its future, or raise ``HashingPoolFull``"""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise HashingPoolFull()
+            self.in_flight += 1
+            executor = self._get_executor()
+        future = executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args):
+        """Run ``fn(*args)`` on the pool and wait for the result"""
+        if not self.enabled:
+            return fn(*args)
+        return self.submit(fn, *args).result(timeout=self.timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'capacity': self.capacity,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+hashing_pool = PasswordHashingPool()
+
+
+def _verify(password, encoded):
+    """Check ``password`` and whether the stored hash should be upgraded"""
+    if not check_password(password, encoded):
+        return False, False
+    try:
+        return True, identify_hasher(encoded).must_update(encoded)
+    except ValueError:
+        return True, False
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` with the hashing done on ``hashing_pool``.
+
+    Listed in ``AUTHENTICATION_BACKENDS``, so logins still go through
+    ``authenticate()``: other backends run too, ``user_login_failed`` is
+    sent on failure and ``user_can_authenticate`` decides about inactive
+    users. Unknown usernames still pay for one hash, so response times
+    don't reveal which accounts exist.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            hashing_pool.run(make_password, password)
+            return None
+        valid, must_update = hashing_pool.run(_verify, password, user.password)
+        if not valid:
+            return None
+        if must_update:
+            user.password = hashing_pool.run(make_password, password)
+            user.save(update_fields=['password'])
+        return user if self.user_can_authenticate(user) else None
+
+
+def authenticate_credentials(request, username, password):
+    """``authenticate()``; raises ``HashingPoolFull`` when the pool is saturated"""
+    return authenticate(request, username=username, password=password)
+
+
+def hash_password(password):
+    return hashing_pool.run(make_password, password)
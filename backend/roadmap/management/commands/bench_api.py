@@ -0,0 +1,292 @@
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from roadmap.models import RoadmapItem
+from roadmap.seeding import SEED_PASSWORD, seed_dataset
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook counting queries and their time (on every alias)"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class LoginStorm:
+    """Background threads posting logins until the context exits"""
+
+    def __init__(self, threads, users, seed):
+        self.threads = threads
+        self.users = users
+        self.seed = seed
+        self.statuses = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers = []
+
+    def __enter__(self):
+        for index in range(self.threads):
+            worker = threading.Thread(target=self.login_loop, args=(index,), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+
+    def login_loop(self, index):
+        client = APIClient(HTTP_HOST='localhost')
+        rng = random.Random(self.seed + index)
+        url = reverse('roadmap:login')
+        try:
+            while not self._stop.is_set():
+                response = client.post(url, {
+                    'username': f'seed{self.seed}_user{rng.randrange(self.users)}',
+                    'password': SEED_PASSWORD,
+                })
+                with self._lock:
+                    self.statuses[response.status_code] += 1
+        finally:
+            connections.close_all()
+
+    def summary(self):
+        return {'threads': self.threads, 'statuses': {str(code): count for code, count in self.statuses.items()}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway database and report p50/p95/p99 latency, query count '
+        'and SQL time for the main roadmap endpoints'
+    )
+    endpoints = [
+        'roadmap_list', 'roadmap_detail', 'toggle_upvote', 'roadmap_comments',
+        'detail_page', 'detail_page_batch', 'roadmap_stats',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--upvotes-per-item', type=int, default=10)
+        parser.add_argument('--comments-per-item', type=int, default=4)
+        parser.add_argument('--reply-depth', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint')
+        parser.add_argument(
+            '--endpoint', action='append', choices=self.endpoints, dest='selected',
+            help='Only run this endpoint (repeatable)'
+        )
+        parser.add_argument('--anonymous', action='store_true', help='Drive read endpoints without a token')
+        parser.add_argument(
+            '--login-storm', type=int, default=0, metavar='THREADS',
+            help='Keep this many threads logging in while the endpoints are measured'
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+        parser.add_argument('--compare', help='Previous --output file to report deltas against')
+        parser.add_argument(
+            '--use-database', action='store_true',
+            help='Seed and run against the configured database instead of a throwaway test database'
+        )
+
+    def handle(self, *args, **options):
+        old_name = None
+        mirrored = {}
+        if not options['use_database']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            mirrored = self.mirror_read_aliases()
+        try:
+            results = self.run(options)
+        finally:
+            for alias, settings_dict in mirrored.items():
+                connections[alias].close()
+                connections[alias].settings_dict = settings_dict
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['compare']:
+            self.compare(results, options['compare'])
+
+    def run(self, options):
+        summary = seed_dataset(
+            items=options['items'], users=options['users'],
+            upvotes_per_item=options['upvotes_per_item'],
+            comments_per_item=options['comments_per_item'],
+            reply_depth=options['reply_depth'], seed=options['seed'],
+        )
+        token = Token.objects.get(user__username=summary.pop('username'))
+        item_ids = list(RoadmapItem.objects.values_list('id', flat=True))
+        if not item_ids:
+            raise CommandError('The benchmark needs at least one roadmap item')
+
+        rng = random.Random(options['seed'])
+        reader = APIClient(HTTP_HOST='localhost')
+        writer = APIClient(HTTP_HOST='localhost')
+        writer.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        if not options['anonymous']:
+            reader.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        requests = {
+            'roadmap_list': lambda: reader.get(reverse('roadmap:roadmap_list'), self.list_params(rng)),
+            'roadmap_detail': lambda: reader.get(
+                reverse('roadmap:roadmap_detail', kwargs={'pk': rng.choice(item_ids)})),
+            'toggle_upvote': lambda: writer.post(
+                reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': rng.choice(item_ids)})),
+            'roadmap_comments': lambda: reader.get(
+                reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': rng.choice(item_ids)})),
+            # What opening an item costs: one request per resource, or one batch
+            'detail_page': lambda: self.in_sequence(
+                [reader.get(path) for path in self.detail_page_paths(rng.choice(item_ids), options)]),
+            'detail_page_batch': lambda: self.in_sequence([reader.post(
+                reverse('roadmap:batch'),
+                {'requests': self.detail_page_paths(rng.choice(item_ids), options)}, format='json')]),
+            'roadmap_stats': lambda: reader.get(reverse('roadmap:roadmap_stats')),
+        }
+
+        results = {'dataset': dict(summary, seed=options['seed']), 'endpoints': {}}
+        storm = LoginStorm(options['login_storm'], summary['users'], options['seed'])
+        # Measure the endpoints themselves, not the anonymous response cache
+        with override_settings(ROADMAP_RESPONSE_CACHE={'ENABLED': False}), storm:
+            for name in options['selected'] or self.endpoints:
+                results['endpoints'][name] = self.measure(
+                    requests[name], options['requests'], options['warmup'])
+        if storm.threads:
+            results['login_storm'] = storm.summary()
+        return results
+
+    @staticmethod
+    def list_params(rng):
+        return rng.choice([
+            {},
+            {'sort_by': 'popularity'},
+            {'status': 'planning'},
+            {'search': rng.choice(['dark', 'api', 'sync export'])},
+            {'pagination': 'cursor'},
+        ])
+
+    @staticmethod
+    def detail_page_paths(item_id, options):
+        paths = [
+            reverse('roadmap:roadmap_detail', kwargs={'pk': item_id}),
+            reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': item_id}),
+        ]
+        if not options['anonymous']:
+            paths.insert(0, reverse('roadmap:user_profile'))
+        return paths
+
+    @staticmethod
+    def in_sequence(responses):
+        """The first failed response of a multi-request scenario, else the last one"""
+        for response in responses:
+            if response.status_code >= 400:
+                return response
+        response = responses[-1]
+        if response.request['PATH_INFO'] == reverse('roadmap:batch'):
+            failed = [part for part in json.loads(response.content)['responses'] if part['status'] >= 400]
+            if failed:
+                raise CommandError(f"Batched request {failed[0]['id']} returned {failed[0]['status']}")
+        return response
+
+    @staticmethod
+    def mirror_read_aliases():
+        """Point read aliases (TEST MIRROR of default) at the throwaway database, as the test runner does"""
+        mirrored = {}
+        for alias in connections:
+            if alias != DEFAULT_DB_ALIAS and connections[alias].settings_dict['TEST']['MIRROR'] == DEFAULT_DB_ALIAS:
+                mirrored[alias] = connections[alias].settings_dict
+                connections[alias].close()
+                connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+        return mirrored
+
+    def measure(self, send, requests, warmup):
+        for _ in range(warmup):
+            send()
+
+        latencies, query_counts, sql_times = [], [], []
+        for _ in range(requests):
+            recorder = QueryRecorder()
+            with ExitStack() as stack:
+                # Reads may be routed to another alias
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                start = time.perf_counter()
+                response = send()
+                latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+            query_counts.append(recorder.count)
+            sql_times.append(recorder.seconds * 1000)
+
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        return {
+            'requests': requests,
+            'p50_ms': round(cuts[49], 3),
+            'p95_ms': round(cuts[94], 3),
+            'p99_ms': round(cuts[98], 3),
+            'mean_queries': round(statistics.fmean(query_counts), 2),
+            'max_queries': max(query_counts),
+            'mean_sql_ms': round(statistics.fmean(sql_times), 3),
+        }
+
+    def report(self, results):
+        dataset = results['dataset']
+        self.stdout.write(
+            f"Dataset (seed {dataset['seed']}): {dataset['items']} items, {dataset['users']} users, "
+            f"{dataset['upvotes']} upvotes, {dataset['comments']} comments"
+        )
+        if 'login_storm' in results:
+            storm = results['login_storm']
+            statuses = ', '.join(f'{code}: {count}' for code, count in sorted(storm['statuses'].items()))
+            self.stdout.write(f"Login storm ({storm['threads']} threads): {statuses}")
+        self.stdout.write(
+            f"{'endpoint':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'sql ms':>10}"
+        )
+        for name, row in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<18}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+                f"{row['mean_queries']:>10.1f}{row['mean_sql_ms']:>10.2f}"
+            )
+
+    def compare(self, results, path):
+        with open(path) as fh:
+            baseline = json.load(fh)
+        if baseline.get('dataset') != results['dataset']:
+            self.stdout.write(self.style.WARNING('Baseline was recorded on a different dataset'))
+        self.stdout.write(f'Change against {path}:')
+        for name, row in results['endpoints'].items():
+            before = baseline.get('endpoints', {}).get(name)
+            if before is None:
+                continue
+            deltas = []
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_queries'):
+                change = (row[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0
+                deltas.append(f'{metric} {change:+.1f}%')
+            self.stdout.write(f"{name:<18}" + ', '.join(deltas))
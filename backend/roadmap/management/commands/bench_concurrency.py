@@ -0,0 +1,142 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold N concurrent keep-alive connections against a running server and '
+        'report throughput and latency (compare the WSGI and ASGI serving modes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='+', help='URLs to request, rotated per connection')
+        parser.add_argument('--connections', type=int, default=128)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+        parser.add_argument('--token', help='Send Authorization: Token <token>')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Extra connections that trickle each request out over --send-time seconds'
+        )
+        parser.add_argument('--send-time', type=float, default=2.0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        targets = [urlsplit(url) for url in options['url']]
+        if any(target.scheme != 'http' for target in targets):
+            raise CommandError('Only http:// URLs are supported')
+        results = asyncio.run(self.run(targets, options))
+
+        self.stdout.write(
+            f"{results['connections']} connections, {results['duration_s']:.1f}s: "
+            f"{results['requests']} requests ({results['requests_per_s']:.1f}/s), "
+            f"{results['errors']} errors"
+        )
+        if results['slow_clients']:
+            self.stdout.write(
+                f"{results['slow_clients']} slow clients completed {results['slow_requests']} requests"
+            )
+        if results['requests']:
+            self.stdout.write(
+                f"latency p50 {results['p50_ms']:.1f} ms, p95 {results['p95_ms']:.1f} ms, "
+                f"p99 {results['p99_ms']:.1f} ms"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+
+    async def run(self, targets, options):
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + options['duration']
+        start = time.perf_counter()
+        slow_requests = []
+        await asyncio.gather(
+            *(self.connection(targets[index % len(targets)], options, deadline, latencies, errors)
+              for index in range(options['connections'])),
+            *(self.connection(targets[index % len(targets)], options, deadline, slow_requests, errors,
+                              send_time=options['send_time'])
+              for index in range(options['slow_clients'])),
+        )
+        elapsed = time.perf_counter() - start
+
+        results = {
+            'connections': options['connections'],
+            'duration_s': elapsed,
+            'requests': len(latencies),
+            'requests_per_s': len(latencies) / elapsed,
+            'errors': len(errors),
+            'slow_clients': options['slow_clients'],
+            'slow_requests': len(slow_requests),
+        }
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            results.update(p50_ms=cuts[49], p95_ms=cuts[94], p99_ms=cuts[98])
+        return results
+
+    async def connection(self, target, options, deadline, latencies, errors, send_time=0.0):
+        path = target.path or '/'
+        if target.query:
+            path = f'{path}?{target.query}'
+        headers = [f'GET {path} HTTP/1.1', f'Host: {target.netloc}', 'Connection: keep-alive']
+        if options['token']:
+            headers.append(f"Authorization: Token {options['token']}")
+        request = ('\r\n'.join(headers) + '\r\n\r\n').encode('ascii')
+
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(target.hostname, target.port or 80)
+                sent = time.perf_counter()
+                if send_time:
+                    # Slow client: the server sees the request arrive a few bytes at a time
+                    pieces = [request[i:i + 8] for i in range(0, len(request), 8)]
+                    for piece in pieces[:-1]:
+                        writer.write(piece)
+                        await writer.drain()
+                        await asyncio.sleep(send_time / len(pieces))
+                    request_tail = pieces[-1]
+                else:
+                    request_tail = request
+                writer.write(request_tail)
+                status, keep_alive = await asyncio.wait_for(self.read_response(reader), options['timeout'])
+                latencies.append((time.perf_counter() - sent) * 1000)
+                if status >= 400:
+                    errors.append(status)
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as exc:
+                errors.append(type(exc).__name__)
+                if writer is not None:
+                    writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    @staticmethod
+    async def read_response(reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        fields = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                fields[name.strip().lower()] = value.strip()
+
+        if fields.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(fields.get('content-length', 0)))
+        return status, fields.get('connection', '').lower() != 'close'
@@ -0,0 +1,65 @@
+import timeit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.request import Request
+
+from roadmap.models import RoadmapItem, Comment
+from roadmap.serializers import RoadmapItemSerializer, CommentSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare DRF field serialization with the fast path per 1,000 objects (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=1000, help='Objects serialized per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+
+    def handle(self, *args, **options):
+        count = options['objects']
+        now = timezone.now()
+        user = User(pk=1, username='bench', email='bench@example.com', date_joined=now)
+
+        django_request = APIRequestFactory().get('/api/roadmap/')
+        force_authenticate(django_request, user=user)
+        request = Request(django_request)
+        request.user = user
+        context = {'request': request}
+
+        items = []
+        comments = []
+        for i in range(count):
+            item = RoadmapItem(
+                pk=i + 1, title=f'Item {i}', description='Benchmark item ' * 8,
+                created_at=now, updated_at=now, upvote_count=i, comment_count=i % 7
+            )
+            item.user_upvoted_annotated = bool(i % 2)
+            items.append(item)
+            comment = Comment(
+                pk=i + 1, user=user, roadmap_item=item, content='Benchmark comment',
+                depth=i % 3, created_at=now, updated_at=now
+            )
+            comment.parent_comment_id = i if i % 3 else None
+            comments.append(comment)
+
+        cases = [
+            ('RoadmapItemSerializer', RoadmapItemSerializer, items),
+            ('CommentSerializer', CommentSerializer, comments),
+        ]
+        for name, serializer_class, objects in cases:
+            timings = {}
+            for fast in (False, True):
+                with override_settings(ROADMAP_FAST_SERIALIZATION=fast):
+                    timings[fast] = min(timeit.repeat(
+                        lambda: serializer_class(objects, many=True, context=context).data,
+                        number=1, repeat=options['repeat']
+                    ))
+            per_thousand = {fast: seconds * 1000 / count * 1000 for fast, seconds in timings.items()}
+            self.stdout.write(
+                f'{name}: fields {per_thousand[False]:.2f} ms, '
+                f'fast {per_thousand[True]:.2f} ms per 1,000 objects '
+                f'({timings[False] / timings[True]:.1f}x)'
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from roadmap.upvote_buffer import upvote_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply journalled upvote toggles to the database (write-behind mode); '
+        'replays segments left behind by crashed workers'
+    )
+
+    def handle(self, *args, **options):
+        summary = upvote_buffer.flush()
+        if summary is None:
+            raise CommandError('Another process is flushing the upvote journal; try again shortly.')
+        self.stdout.write(self.style.SUCCESS(
+            f"Applied {summary['toggles']} toggles from {summary['segments']} journal segments "
+            f"({summary['added']} upvotes added, {summary['removed']} removed)."
+        ))
@@ -1,11 +1,34 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
 from roadmap.models import RoadmapItem
+from roadmap.seeding import SEED_PASSWORD, seed_dataset
 
 
 class Command(BaseCommand):
-    help = 'Populate database with sample roadmap items'
+    help = (
+        'Populate database with sample roadmap items, or with a synthetic '
+        'dataset of any size when --items is given'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, help='Generate this many synthetic roadmap items')
+        parser.add_argument('--users', type=int, default=100, help='Synthetic users (each gets a token)')
+        parser.add_argument('--upvotes-per-item', type=int, default=20, help='Average upvotes per item')
+        parser.add_argument(
+            '--zipf', type=float, default=1.0, dest='zipf_exponent',
+            help='Skew of the upvote distribution (0 = uniform)'
+        )
+        parser.add_argument('--comments-per-item', type=int, default=3, help='Average top-level comments per item')
+        parser.add_argument('--reply-depth', type=int, default=2, help='Maximum reply nesting (0-2)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
 
     def handle(self, *args, **options):
+        if options['items'] is not None:
+            return self.populate_synthetic(options)
+
         # Sample roadmap items
         sample_items = [
             {
@@ -88,4 +111,27 @@ class Command(BaseCommand):
 
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {created_count} new roadmap items.')
-        ) 
\ No newline at end of file
+        ) 
+
+    def populate_synthetic(self, options):
+        prefix = f"seed{options['seed']}_user"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Users for seed {options['seed']} already exist; pass a different --seed"
+            )
+
+        start = time.perf_counter()
+        summary = seed_dataset(
+            items=options['items'], users=options['users'],
+            upvotes_per_item=options['upvotes_per_item'],
+            zipf_exponent=options['zipf_exponent'],
+            comments_per_item=options['comments_per_item'],
+            reply_depth=options['reply_depth'], seed=options['seed'],
+            batch_size=options['batch_size'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {summary['items']} items, {summary['users']} users, "
+            f"{summary['upvotes']} upvotes and {summary['comments']} comments "
+            f"in {time.perf_counter() - start:.1f}s"
+        ))
+        self.stdout.write(f"Log in as {summary['username']} with password {SEED_PASSWORD!r}")
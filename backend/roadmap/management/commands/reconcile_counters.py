@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from roadmap.signals import record_change
+from roadmap.models import RoadmapItem, Upvote, Comment
+from roadmap.ranking import hot_score_expression
+from roadmap.summary import rebuild_summary, summary_drifted
+
+
+def related_count(model):
+    """Correlated COUNT(*) of ``model`` rows pointing at the outer roadmap item"""
+    counts = (
+        model.objects.filter(roadmap_item=OuterRef('pk'))
+        .order_by()
+        .values('roadmap_item')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized upvote and comment counters on roadmap items'
+    batch_size = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted items without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = RoadmapItem.objects.annotate(
+                actual_upvotes=related_count(Upvote),
+                actual_comments=related_count(Comment),
+            ).exclude(
+                upvote_count=F('actual_upvotes'),
+                comment_count=F('actual_comments'),
+            )
+            drifted_ids = list(drifted.values_list('id', flat=True))
+
+            if options['dry_run']:
+                stale_summary = summary_drifted()
+                if drifted_ids:
+                    self.stdout.write(
+                        self.style.WARNING(f'{len(drifted_ids)} roadmap items have drifted counters.')
+                    )
+                if stale_summary:
+                    self.stdout.write(self.style.WARNING('The roadmap stats summary has drifted.'))
+                if not drifted_ids and not stale_summary:
+                    self.stdout.write(self.style.SUCCESS('All roadmap item counters are consistent.'))
+                return
+
+            # One UPDATE per batch of drifted rows instead of a save() per item
+            for start in range(0, len(drifted_ids), self.batch_size):
+                batch = RoadmapItem.objects.filter(id__in=drifted_ids[start:start + self.batch_size])
+                batch.update(
+                    upvote_count=related_count(Upvote),
+                    comment_count=related_count(Comment),
+                )
+                # Separate UPDATE so the score reads the repaired counters
+                batch.update(hot_score=hot_score_expression())
+            for item_id in drifted_ids:
+                record_change(item_id)
+
+            # The triggers follow the repairs above; this catches a summary
+            # left behind by triggers that were missing
+            rebuilt = summary_drifted()
+            if rebuilt:
+                rebuild_summary()
+                record_change(None)
+
+        if not drifted_ids and not rebuilt:
+            self.stdout.write(self.style.SUCCESS('All roadmap item counters are consistent.'))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f'Reconciled counters on {len(drifted_ids)} roadmap items.')
+        )
+        if rebuilt:
+            self.stdout.write(self.style.SUCCESS('Rebuilt the roadmap stats summary.'))
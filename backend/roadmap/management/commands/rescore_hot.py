@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from roadmap.models import RoadmapItem
+from roadmap.ranking import hot_score_expression
+from roadmap.signals import record_change
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the time-decayed hot score of every roadmap item; '
+        'run after changing ROADMAP_HOT_RANKING or bulk-loading counters'
+    )
+    batch_size = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report items whose stored score is out of date without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        ids = list(RoadmapItem.objects.order_by('pk').values_list('pk', flat=True))
+        stale = 0
+        # Short transactions, so live upvotes are not held behind one long write
+        for start in range(0, len(ids), self.batch_size):
+            batch = RoadmapItem.objects.filter(pk__in=ids[start:start + self.batch_size]).exclude(
+                hot_score=hot_score_expression()
+            )
+            if options['dry_run']:
+                stale += batch.count()
+                continue
+            with transaction.atomic():
+                stale += batch.update(hot_score=hot_score_expression())
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{stale} of {len(ids)} roadmap items have stale hot scores.'))
+            return
+        if stale:
+            # Anything sorted by sort_by=hot may have changed order
+            record_change(None)
+        self.stdout.write(self.style.SUCCESS(f'Rescored {stale} of {len(ids)} roadmap items.'))
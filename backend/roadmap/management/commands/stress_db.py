@@ -0,0 +1,183 @@
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.db.utils import ConnectionHandler
+
+
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent upvote-style writers and list-style readers against a scratch '
+        'SQLite file and count "database is locked" errors, with Django\'s stock '
+        'connection settings and with the ones configured in settings.DATABASES'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per profile')
+        parser.add_argument('--items', type=int, default=50)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument(
+            '--profile', choices=['stock', 'configured', 'both'], default='both',
+            help='stock: no OPTIONS, one alias; configured: settings.DATABASES as deployed'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        profiles = ['stock', 'configured'] if options['profile'] == 'both' else [options['profile']]
+        results = {}
+        for name in profiles:
+            write_options, read_options = self.profile_options(name)
+            results[name] = result = self.run_profile(write_options, read_options, options)
+            self.stdout.write(
+                f"{name:<10} writes {result['writes_per_s']:8.1f}/s (p99 {result['write_p99_ms']:7.1f} ms)  "
+                f"reads {result['reads_per_s']:8.1f}/s (p99 {result['read_p99_ms']:7.1f} ms)  "
+                f"lock errors: {result['write_lock_errors']} writes, {result['read_lock_errors']} reads  "
+                f"counters {'consistent' if result['consistent'] else 'INCONSISTENT'}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+
+    def profile_options(self, name):
+        if name == 'stock':
+            return {}, None
+        read_alias = getattr(settings, 'ROADMAP_READ_DATABASE', None)
+        write_options = settings.DATABASES[DEFAULT_DB_ALIAS].get('OPTIONS', {})
+        read_options = settings.DATABASES[read_alias].get('OPTIONS', {}) if read_alias else None
+        return write_options, read_options
+
+    def run_profile(self, write_options, read_options, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stress.sqlite3')
+            databases = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path,
+                                     'OPTIONS': dict(write_options)}}
+            if read_options is not None:
+                databases['read'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path,
+                                     'OPTIONS': dict(read_options)}
+            handler = ConnectionHandler(databases)
+            read_alias = 'read' if read_options is not None else 'default'
+
+            with handler['default'].cursor() as cursor:
+                cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, votes INTEGER NOT NULL)')
+                cursor.execute(
+                    'CREATE TABLE vote (user_id INTEGER NOT NULL, item_id INTEGER NOT NULL, '
+                    'UNIQUE (user_id, item_id))'
+                )
+                cursor.execute('CREATE INDEX vote_item ON vote (item_id)')
+                cursor.executemany(
+                    'INSERT INTO item (id, votes) VALUES (%s, 0)', [(i,) for i in range(options['items'])]
+                )
+            handler.close_all()
+
+            deadline = time.perf_counter() + options['duration']
+            stats = {'write': [], 'read': [], 'write_errors': [], 'read_errors': []}
+            lock = threading.Lock()
+            threads = [
+                threading.Thread(target=self.worker, args=(
+                    handler, 'default', self.toggle, write_options.get('transaction_mode'),
+                    random.Random(options['seed'] + i), deadline, options, stats, 'write', lock))
+                for i in range(options['writers'])
+            ] + [
+                threading.Thread(target=self.worker, args=(
+                    handler, read_alias, self.read, None,
+                    random.Random(options['seed'] + 1000 + i), deadline, options, stats, 'read', lock))
+                for i in range(options['readers'])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            with handler['default'].cursor() as cursor:
+                cursor.execute(
+                    'SELECT COUNT(*) FROM item WHERE votes != '
+                    '(SELECT COUNT(*) FROM vote WHERE vote.item_id = item.id)'
+                )
+                drifted = cursor.fetchone()[0]
+            handler.close_all()
+
+        return {
+            'writes': len(stats['write']),
+            'reads': len(stats['read']),
+            'writes_per_s': len(stats['write']) / elapsed,
+            'reads_per_s': len(stats['read']) / elapsed,
+            'write_p99_ms': self.p99(stats['write']),
+            'read_p99_ms': self.p99(stats['read']),
+            'write_lock_errors': sum(1 for exc in stats['write_errors'] if is_lock_error(exc)),
+            'read_lock_errors': sum(1 for exc in stats['read_errors'] if is_lock_error(exc)),
+            'other_errors': sorted({str(exc) for exc in stats['write_errors'] + stats['read_errors']
+                                    if not is_lock_error(exc)}),
+            'consistent': drifted == 0,
+        }
+
+    @staticmethod
+    def p99(latencies):
+        if len(latencies) < 2:
+            return latencies[0] if latencies else 0.0
+        return statistics.quantiles(latencies, n=100, method='inclusive')[98]
+
+    def worker(self, handler, alias, operation, transaction_mode, rng, deadline, options, stats, kind, lock):
+        connection = handler[alias]
+        latencies, errors = [], []
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    with connection.cursor() as cursor:
+                        operation(cursor, transaction_mode, rng, options)
+                except OperationalError as exc:
+                    errors.append(exc)
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+            with lock:
+                stats[kind].extend(latencies)
+                stats[f'{kind}_errors'].extend(errors)
+
+    @staticmethod
+    def toggle(cursor, transaction_mode, rng, options):
+        """The toggle_upvote transaction: look up, insert or delete, adjust the counter"""
+        user_id, item_id = rng.randrange(options['users']), rng.randrange(options['items'])
+        cursor.execute(f'BEGIN {transaction_mode}' if transaction_mode else 'BEGIN')
+        try:
+            cursor.execute('SELECT 1 FROM vote WHERE user_id = %s AND item_id = %s', [user_id, item_id])
+            if cursor.fetchone():
+                cursor.execute('DELETE FROM vote WHERE user_id = %s AND item_id = %s', [user_id, item_id])
+                delta = -1
+            else:
+                cursor.execute('INSERT INTO vote (user_id, item_id) VALUES (%s, %s)', [user_id, item_id])
+                delta = 1
+            cursor.execute('UPDATE item SET votes = votes + %s WHERE id = %s', [delta, item_id])
+            cursor.execute('COMMIT')
+        except OperationalError:
+            try:
+                cursor.execute('ROLLBACK')
+            except OperationalError:
+                pass  # the failed statement already ended the transaction
+            raise
+
+    @staticmethod
+    def read(cursor, transaction_mode, rng, options):
+        """A list page and one item's vote count"""
+        cursor.execute('SELECT id, votes FROM item ORDER BY votes DESC, id LIMIT 20')
+        cursor.fetchall()
+        cursor.execute('SELECT COUNT(*) FROM vote WHERE item_id = %s', [rng.randrange(options['items'])])
+        cursor.fetchone()
@@ -0,0 +1,269 @@
+"""
+Prometheus metrics at ``/api/metrics``, summed across worker processes.
+
+Each process counts in memory: requests by route, method and status, a latency
+histogram per route, the queries and SQL time those requests ran, and upvote and
+comment writes. A scrape also collects the counters the caches, the hashing pool
+and the upvote buffer already keep (the numbers behind ``/api/stats/cache/``).
+
+Whichever worker answers a scrape has to report for all of them, so each
+process also writes its counts to its own file in ``DIRECTORY``. The file is
+``<pid>-<start>.json``, replaced atomically by a daemon thread every
+``FLUSH_INTERVAL`` seconds while there is something new. The scraping worker
+writes its own file first and then sums every file in the directory. Files
+left by workers that have exited are kept and still counted, so totals never
+go backwards when gunicorn replaces a worker. Clear the directory when the
+server starts (gunicorn.conf.py does). Without a ``DIRECTORY`` (the default under
+DEBUG) the endpoint reports the answering process only. No collector or
+extra service is involved: Prometheus scrapes the endpoint directly.
+"""
+import atexit
+import hmac
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .timing import route_view
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+FAMILIES = {
+    'roadmap_http_requests_total': ('counter', 'Requests by route, method and status code.'),
+    'roadmap_http_request_duration_seconds': ('histogram', 'Request latency by route and method.'),
+    'roadmap_db_queries_total': ('counter', 'Database queries run while serving requests.'),
+    'roadmap_db_query_duration_seconds_total': ('counter', 'Time spent in database queries while serving requests.'),
+    'roadmap_upvote_writes_total': ('counter', 'Upvote rows added or removed.'),
+    'roadmap_comment_writes_total': ('counter', 'Comments created or deleted.'),
+    'roadmap_cache_requests_total': ('counter', 'Cache lookups by cache and result.'),
+    'roadmap_password_hashing_total': ('counter', 'Login and registration password hashes by result.'),
+    'roadmap_upvote_buffer_toggles_total': ('counter', 'Write-behind upvote toggles journaled and flushed.'),
+    'roadmap_upvote_buffer_flush_failures_total': ('counter', 'Write-behind upvote flushes that raised.'),
+}
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_METRICS', {})
+
+
+def collect():
+    """This process's counters from the existing ``stats()`` of the caches and pools"""
+    from .authentication import token_cache
+    from .cache import response_cache
+    from .hashing import hashing_pool
+    from .upvote_buffer import upvote_buffer
+    from .upvote_sets import upvote_sets
+
+    response, token, sets = response_cache.stats(), token_cache.stats(), upvote_sets.stats()
+    hashing, buffer = hashing_pool.stats(), upvote_buffer.stats()
+    samples = {}
+    for cache, hits, misses in (
+        ('response', response['hits'], response['misses']),
+        ('token', token['hits'], token['misses']),
+        ('upvote_set', sets['hits'], sets['loads']),
+    ):
+        samples[sample_key('roadmap_cache_requests_total', cache=cache, result='hit')] = hits
+        samples[sample_key('roadmap_cache_requests_total', cache=cache, result='miss')] = misses
+    for result in ('completed', 'rejected'):
+        samples[sample_key('roadmap_password_hashing_total', result=result)] = hashing[result]
+    for state in ('buffered', 'flushed'):
+        samples[sample_key('roadmap_upvote_buffer_toggles_total', state=state)] = buffer[state]
+    samples[sample_key('roadmap_upvote_buffer_flush_failures_total')] = buffer['flush_failures']
+    return samples
+
+
+def scrape_allowed(request):
+    """A scraper presenting ``TOKEN`` as a bearer token, or a signed-in staff user"""
+    token = _settings().get('TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[7:].encode(), token.encode()):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def sample_key(name, **labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class MetricsStore:
+    content_type = CONTENT_TYPE
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._samples = {}
+        self._dirty = False
+        self._flusher = None
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', True)
+
+    @property
+    def directory(self):
+        return _settings().get('DIRECTORY')
+
+    @property
+    def buckets(self):
+        return tuple(_settings().get('BUCKETS', DEFAULT_BUCKETS))
+
+    def _own(self):
+        """Start afresh in a forked child; the parent's counts are in the parent's file"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._filename = f'{self._pid}-{time.time_ns()}.json'
+            self._samples = {}
+            self._dirty = False
+            self._flusher = None
+
+    def _add(self, key, value):
+        self._samples[key] = self._samples.get(key, 0) + value
+
+    def _changed(self):
+        self._dirty = True
+        if self._flusher is None and self.directory:
+            self._flusher = threading.Thread(target=self._run_flusher, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self._own()
+            self._add(sample_key(name, **labels), value)
+            self._changed()
+
+    def observe_request(self, request, response, timing):
+        """Count one finished request from its ``RequestTiming``"""
+        if not self.enabled:
+            return
+        route = {'route': route_view(request), 'method': request.method}
+        with self._lock:
+            self._own()
+            self._add(sample_key('roadmap_http_requests_total', status=str(response.status_code), **route), 1)
+            name = 'roadmap_http_request_duration_seconds'
+            # Every bound is written, at 0 if need be, so a new series starts with all its buckets
+            for bound in self.buckets + (math.inf,):
+                self._add(sample_key(f'{name}_bucket', le=format_value(bound), **route), int(timing.total <= bound))
+            self._add(sample_key(f'{name}_sum', **route), timing.total)
+            self._add(sample_key(f'{name}_count', **route), 1)
+            self._add(sample_key('roadmap_db_queries_total', **route), timing.queries)
+            self._add(sample_key('roadmap_db_query_duration_seconds_total', **route), timing.sql)
+            self._changed()
+
+    def local(self):
+        """This process's samples, its collected counters included"""
+        with self._lock:
+            self._own()
+            samples = dict(self._samples)
+        samples.update(collect())
+        return samples
+
+    def flush(self):
+        """Atomically replace this process's file with its current samples"""
+        directory = self.directory
+        if not directory:
+            return
+        with self._flush_lock:
+            with self._lock:
+                self._own()
+                self._dirty = False
+                filename = self._filename
+            samples = self.local()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, filename)
+            with open(path + '.tmp', 'w') as fh:
+                json.dump([[name, labels, value] for (name, labels), value in samples.items()], fh)
+            os.replace(path + '.tmp', path)
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(_settings().get('FLUSH_INTERVAL', 1.0))
+            if self._pid != os.getpid():
+                return
+            try:
+                if self._dirty:
+                    self.flush()
+            except OSError:
+                self._dirty = True  # retried on the next pass
+
+    def flush_at_exit(self):
+        if self._pid == os.getpid() and self._dirty:
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def snapshot(self):
+        """Samples summed over every process that has written to ``DIRECTORY``"""
+        directory = self.directory
+        if not directory:
+            return self.local()
+        self.flush()
+        totals = {}
+        for entry in os.scandir(directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as fh:
+                    rows = json.load(fh)
+            except (OSError, ValueError):
+                continue  # removed while we listed, or not ours
+            for name, labels, value in rows:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self):
+        return render(self.snapshot())
+
+
+def family_of(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and FAMILIES.get(name[:-len(suffix)], ('',))[0] == 'histogram':
+            return name[:-len(suffix)]
+    return name
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _order(item):
+    (name, labels), _ = item
+    # Histogram series together, buckets in ascending bound, then _sum and _count
+    plain = tuple(pair for pair in labels if pair[0] != 'le')
+    bound = float(dict(labels).get('le', 'inf').replace('+Inf', 'inf'))
+    suffix = ('_bucket', '_sum', '_count').index(name[name.rindex('_'):]) if name != family_of(name) else 0
+    return plain, suffix, bound
+
+
+def render(samples):
+    """Samples in the Prometheus text exposition format (0.0.4)"""
+    families = {}
+    for item in samples.items():
+        families.setdefault(family_of(item[0][0]), []).append(item)
+    lines = []
+    for family in sorted(families):
+        kind, help_text = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for (name, labels), value in sorted(families[family], key=_order):
+            label_text = ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+            lines.append(f'{name}{{{label_text}}} {format_value(value)}' if label_text else f'{name} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+metrics_store = MetricsStore()
+atexit.register(metrics_store.flush_at_exit)
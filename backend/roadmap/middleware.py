@@ -0,0 +1,80 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import timing
+from .metrics import metrics_store
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can also run in an async middleware chain.
+
+    WhiteNoise itself is sync-only, which makes Django run everything below it
+    (async views included) through ``async_to_sync`` on a thread per request
+    under ASGI. The lookup is a dict access, so it is safe on the event loop;
+    only autorefresh (development) touches the filesystem.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """
+    Times each request (see roadmap.timing) and adds the ``Server-Timing``
+    header, then counts it in the Prometheus metrics (roadmap.metrics).
+    Placed first, so the total covers the whole middleware chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def enabled():
+        return timing.timing_registry.enabled or metrics_store.enabled
+
+    @staticmethod
+    def finish(token, request, response):
+        metrics_store.observe_request(request, response, timing.end(token, request, response))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled():
+            return self.get_response(request)
+        token = timing.begin()
+        response = self.get_response(request)
+        self.finish(token, request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled():
+            return await self.get_response(request)
+        token = timing.begin()
+        response = await self.get_response(request)
+        self.finish(token, request, response)
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    RoadmapItem = apps.get_model('roadmap', 'RoadmapItem')
+    Upvote = apps.get_model('roadmap', 'Upvote')
+    Comment = apps.get_model('roadmap', 'Comment')
+
+    def related_count(model):
+        counts = (
+            model.objects.filter(roadmap_item=OuterRef('pk'))
+            .order_by()
+            .values('roadmap_item')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    RoadmapItem.objects.update(
+        upvote_count=related_count(Upvote),
+        comment_count=related_count(Comment),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0002_remove_priority'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadmapitem',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='roadmapitem',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
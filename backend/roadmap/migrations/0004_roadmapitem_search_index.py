@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:02
+
+import django.db.models.deletion
+import roadmap.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0003_roadmapitem_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadmapItemSearchIndex',
+            fields=[
+                ('roadmap_item', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='roadmap.roadmapitem')),
+                ('title', models.TextField()),
+                ('description', models.TextField()),
+                ('document', roadmap.search.SearchDocumentField(db_column='roadmap_roadmapitem_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'roadmap_roadmapitem_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(roadmap.search.create_search_index, roadmap.search.drop_search_index),
+    ]
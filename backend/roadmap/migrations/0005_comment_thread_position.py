@@ -0,0 +1,54 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def populate_thread_position(apps, schema_editor):
+    Comment = apps.get_model('roadmap', 'Comment')
+    # Top-down, one UPDATE per nesting level: direct replies first, then
+    # replies of replies inherit their parent's root.
+    Comment.objects.filter(parent_comment__isnull=False).update(
+        depth=1, root_comment=F('parent_comment')
+    )
+    level = 1
+    while True:
+        parent_root = Comment.objects.filter(pk=OuterRef('parent_comment')).values('root_comment')
+        updated = Comment.objects.filter(parent_comment__depth=level).update(
+            depth=level + 1, root_comment=Subquery(parent_root)
+        )
+        if not updated:
+            break
+        level += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0004_roadmapitem_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='root_comment',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='roadmap.comment'),
+        ),
+        migrations.RunPython(populate_thread_position, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['root_comment', 'created_at'], name='roadmap_comment_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['roadmap_item', 'depth'], name='roadmap_comment_depth_idx'),
+        ),
+    ]
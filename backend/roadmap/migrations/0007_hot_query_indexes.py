@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0006_contentversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='parent_comment',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='roadmap.comment'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='roadmap_item',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='roadmap.roadmapitem'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['roadmap_item', 'created_at'], name='roadmap_comment_item_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent_comment', 'created_at'], name='roadmap_comment_replies_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['created_at'], name='roadmap_item_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['upvote_count', 'created_at'], name='roadmap_item_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['status', 'created_at'], name='roadmap_item_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['status', 'upvote_count', 'created_at'], name='roadmap_item_status_pop_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['category', 'created_at'], name='roadmap_item_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['category', 'upvote_count', 'created_at'], name='roadmap_item_category_pop_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['status', 'category', 'created_at'], name='roadmap_item_filter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['status', 'category', 'upvote_count', 'created_at'], name='roadmap_item_filter_pop_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('upvote', 'Upvote'), ('comment_created', 'Comment created'), ('comment_updated', 'Comment updated'), ('comment_deleted', 'Comment deleted')], max_length=20)),
+                ('roadmap_item_id', models.PositiveIntegerField(db_index=True)),
+                ('upvote_count', models.PositiveIntegerField()),
+                ('comment_count', models.PositiveIntegerField()),
+                ('comment_ids', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
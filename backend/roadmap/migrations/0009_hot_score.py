@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:53
+
+from django.db import migrations, models
+
+import roadmap.search
+from roadmap.ranking import hot_score_expression
+
+
+def populate_hot_scores(apps, schema_editor):
+    RoadmapItem = apps.get_model('roadmap', 'RoadmapItem')
+    RoadmapItem.objects.update(hot_score=hot_score_expression())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0008_live_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roadmapitem',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['hot_score', 'created_at'], name='roadmap_item_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['status', 'hot_score', 'created_at'], name='roadmap_item_status_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['category', 'hot_score', 'created_at'], name='roadmap_item_category_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roadmapitem',
+            index=models.Index(fields=['status', 'category', 'hot_score', 'created_at'], name='roadmap_item_filter_hot_idx'),
+        ),
+        migrations.RunPython(populate_hot_scores, migrations.RunPython.noop),
+        # Adding the column remade the table, which drops the FTS sync triggers
+        migrations.RunPython(roadmap.search.install_search_triggers, migrations.RunPython.noop),
+    ]
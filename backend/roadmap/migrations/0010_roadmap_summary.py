@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:01
+
+import roadmap.summary
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roadmap', '0009_hot_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadmapSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=20)),
+                ('items', models.IntegerField(default=0)),
+                ('upvotes', models.BigIntegerField(default=0)),
+                ('comments', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'value'), name='roadmap_summary_key')],
+            },
+        ),
+        migrations.RunPython(roadmap.summary.install_summary_triggers, roadmap.summary.drop_summary_triggers),
+    ]
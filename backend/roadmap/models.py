@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.core.validators import MaxLengthValidator
+from .ranking import hot_score_expression
+from .search import SEARCH_TABLE, SearchDocumentField
 
 
 class RoadmapItem(models.Model):
@@ -26,16 +31,87 @@ class RoadmapItem(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='feature')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in step by the write paths (see adjust_counters)
+    # and repaired in bulk by the reconcile_counters management command.
+    upvote_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Time-decayed ranking for sort_by=hot, recomputed along with the counters
+    # (see roadmap.ranking)
+    hot_score = models.FloatField(default=0, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        # One index per list filter combination (none, status, category, both)
+        # and sort (newest/oldest, most/least upvoted), so every list page is an
+        # index walk that stops at the page size. Ties fall back to the rowid,
+        # which SQLite appends to every index, matching the keyset cursors.
+        indexes = [
+            models.Index(fields=['created_at'], name='roadmap_item_created_idx'),
+            models.Index(fields=['upvote_count', 'created_at'], name='roadmap_item_popular_idx'),
+            models.Index(fields=['status', 'created_at'], name='roadmap_item_status_idx'),
+            models.Index(fields=['status', 'upvote_count', 'created_at'], name='roadmap_item_status_pop_idx'),
+            models.Index(fields=['category', 'created_at'], name='roadmap_item_category_idx'),
+            models.Index(fields=['category', 'upvote_count', 'created_at'], name='roadmap_item_category_pop_idx'),
+            models.Index(fields=['status', 'category', 'created_at'], name='roadmap_item_filter_idx'),
+            models.Index(
+                fields=['status', 'category', 'upvote_count', 'created_at'], name='roadmap_item_filter_pop_idx'
+            ),
+            models.Index(fields=['hot_score', 'created_at'], name='roadmap_item_hot_idx'),
+            models.Index(fields=['status', 'hot_score', 'created_at'], name='roadmap_item_status_hot_idx'),
+            models.Index(fields=['category', 'hot_score', 'created_at'], name='roadmap_item_category_hot_idx'),
+            models.Index(
+                fields=['status', 'category', 'hot_score', 'created_at'], name='roadmap_item_filter_hot_idx'
+            ),
+        ]
     
     def __str__(self):
         return self.title
     
-    @property
-    def upvote_count(self):
-        return self.upvotes.count()
+    # Written only by adjust_counters and the bulk repair paths, so saving an
+    # instance loaded before an upvote or comment never rolls them back
+    STORED_AGGREGATES = ('upvote_count', 'comment_count', 'hot_score')
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in self.STORED_AGGREGATES
+            ]
+        super().save(*args, **kwargs)
+        if adding:
+            # The score's age term needs created_at, which auto_now_add sets during the insert
+            RoadmapItem.objects.filter(pk=self.pk).update(hot_score=hot_score_expression())
+            self.refresh_from_db(fields=['hot_score'])
+    
+    def adjust_counters(self, upvotes=0, comments=0):
+        """Atomically apply counter deltas (and the hot score) in the database and refresh this instance"""
+        upvote_count = Greatest(F('upvote_count') + upvotes, 0)
+        comment_count = Greatest(F('comment_count') + comments, 0)
+        RoadmapItem.objects.filter(pk=self.pk).update(
+            upvote_count=upvote_count,
+            comment_count=comment_count,
+            hot_score=hot_score_expression(upvote_count, comment_count),
+        )
+        self.refresh_from_db(fields=['upvote_count', 'comment_count', 'hot_score'])
+
+
+class RoadmapItemSearchIndex(models.Model):
+    """Read-only mapping of the FTS5 index kept in sync by triggers (see search.py)"""
+    roadmap_item = models.OneToOneField(
+        RoadmapItem, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', related_name='search_index'
+    )
+    title = models.TextField()
+    description = models.TextField()
+    document = SearchDocumentField(db_column=SEARCH_TABLE)
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = SEARCH_TABLE
 
 
 class Upvote(models.Model):
@@ -51,37 +127,166 @@ class Upvote(models.Model):
 
 
 class Comment(models.Model):
+    MAX_DEPTH = 2  # 0-based, so three levels of nesting
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    roadmap_item = models.ForeignKey(RoadmapItem, on_delete=models.CASCADE, related_name='comments')
-    parent_comment = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    # Plain FK indexes are replaced by the (fk, created_at) indexes below, which
+    # also serve the chronological ordering of an item's comments and replies
+    roadmap_item = models.ForeignKey(
+        RoadmapItem, on_delete=models.CASCADE, related_name='comments', db_index=False
+    )
+    parent_comment = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies', db_index=False
+    )
+    # Stored on creation so depth checks and whole-thread lookups never walk parents.
+    # root_comment is the top-level comment of the thread (None for top-level comments).
+    root_comment = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, editable=False,
+        related_name='thread_comments', db_index=False
+    )
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     content = models.TextField(validators=[MaxLengthValidator(300)])  # 300 character limit
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['root_comment', 'created_at'], name='roadmap_comment_thread_idx'),
+            models.Index(fields=['roadmap_item', 'depth'], name='roadmap_comment_depth_idx'),
+            models.Index(fields=['roadmap_item', 'created_at'], name='roadmap_comment_item_idx'),
+            models.Index(fields=['parent_comment', 'created_at'], name='roadmap_comment_replies_idx'),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user.username} on {self.roadmap_item.title}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.set_thread_position(self.parent_comment)
+        super().save(*args, **kwargs)
+    
+    def set_thread_position(self, parent):
+        """Derive depth and root_comment from an already-loaded parent"""
+        if parent is None:
+            self.depth = 0
+            self.root_comment_id = None
+        else:
+            self.depth = parent.depth + 1
+            self.root_comment_id = parent.root_comment_id or parent.pk
+    
     @property
     def is_reply(self):
-        return self.parent_comment is not None
+        return self.parent_comment_id is not None
     
     @property
     def depth_level(self):
-        """Calculate the depth level of the comment (0 for top-level, max 2 for 3-level depth)"""
-        if self.parent_comment is None:
-            return 0
-        elif self.parent_comment.parent_comment is None:
-            return 1
-        else:
-            return 2
+        """Depth level of the comment (0 for top-level, max 2 for 3-level depth)"""
+        return self.depth
     
     def can_have_replies(self):
         """Check if this comment can have replies (max 3 levels)"""
-        return self.depth_level < 2
+        return self.depth < self.MAX_DEPTH
     
     def get_replies(self):
         """Get all replies to this comment"""
         return self.replies.all()
+    
+    def thread_queryset(self):
+        """This comment plus every reply that would be deleted along with it"""
+        if self.depth == 0:
+            subtree = models.Q(root_comment=self.pk)
+        else:
+            subtree = models.Q(parent_comment=self.pk)
+        return Comment.objects.filter(models.Q(pk=self.pk) | subtree)
+    
+    def thread_size(self):
+        return self.thread_queryset().count()
+    
+    def thread_comment_ids(self):
+        return sorted(self.thread_queryset().values_list('pk', flat=True))
+
+
+class RoadmapSummary(models.Model):
+    """
+    Item, upvote and comment totals for the whole roadmap (dimension "total")
+    and per status and category value. Kept current by triggers on the item
+    table (see summary.py); never written by application code.
+    """
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=20, blank=True)
+    items = models.IntegerField(default=0)
+    upvotes = models.BigIntegerField(default=0)
+    comments = models.BigIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            # The triggers' ON CONFLICT target
+            models.UniqueConstraint(fields=['dimension', 'value'], name='roadmap_summary_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.dimension}={self.value}: {self.items} items"
+
+
+class ContentVersion(models.Model):
+    """
+    Change counter for a slice of API content ("list" or "item:<pk>"), bumped on
+    every write that affects it. Serves as a cheap, durable validator for
+    conditional GETs: one primary-key lookup instead of rebuilding a response.
+    """
+    scope = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.scope} v{self.version}"
+    
+    @classmethod
+    def bump(cls, *scopes):
+        updated = cls.objects.filter(scope__in=scopes).update(
+            version=F('version') + 1, updated_at=timezone.now()
+        )
+        if updated < len(scopes):
+            existing = set(cls.objects.filter(scope__in=scopes).values_list('scope', flat=True))
+            cls.objects.bulk_create(
+                [cls(scope=scope, version=1) for scope in scopes if scope not in existing],
+                ignore_conflicts=True
+            )
+    
+    @classmethod
+    def current(cls, scope):
+        """(version, updated_at) for ``scope``; (0, None) if it never changed"""
+        row = cls.objects.filter(scope=scope).values_list('version', 'updated_at').first()
+        return row or (0, None)
+    
+    @classmethod
+    async def acurrent(cls, scope):
+        row = await cls.objects.filter(scope=scope).values_list('version', 'updated_at').afirst()
+        return row or (0, None)
+
+
+class LiveEvent(models.Model):
+    """
+    One change pushed to the live event stream (see events.py). The
+    auto-increment id is the SSE event id; every worker tails this table, so
+    it doubles as the cross-worker fan-out and the replay log for Last-Event-ID.
+    """
+    KIND_CHOICES = [
+        ('upvote', 'Upvote'),
+        ('comment_created', 'Comment created'),
+        ('comment_updated', 'Comment updated'),
+        ('comment_deleted', 'Comment deleted'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Not a foreign key: events outlive deleted items until pruned
+    roadmap_item_id = models.PositiveIntegerField(db_index=True)
+    upvote_count = models.PositiveIntegerField()
+    comment_count = models.PositiveIntegerField()
+    comment_ids = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"#{self.pk} {self.kind} item {self.roadmap_item_id}"
@@ -0,0 +1,216 @@
+import base64
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _cursor_value(value):
+    # Full-precision encoding: DjangoJSONEncoder truncates datetimes to
+    # milliseconds, which would make the cursor skip or repeat rows.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    """DRF's page-number pagination plus an async ORM variant for the async views"""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # primes the cached_property
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+
+        self.page.object_list = [row async for row in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the queryset's own ordering.
+
+    Unlike DRF's CursorPagination, which positions on the first ordering field
+    and falls back to an offset for ties, the cursor stores the last row's value
+    for every ordering field plus the primary key as a tiebreaker. Each page is
+    then a plain ``WHERE (ordering) > (cursor) LIMIT n`` with no COUNT(*) and no
+    OFFSET, so deep pages cost the same as the first one.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    mode = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode or cls.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated slice holding this page plus one row to detect more"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        position, self.reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+        ordering = self.invert(self.ordering) if self.reverse else self.ordering
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, self.to_python(queryset, position)))
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Walking backwards means there is always a following page to return to
+        self.has_next = has_more if not self.reverse else self.has_cursor
+        self.has_previous = has_more if self.reverse else self.has_cursor
+        self.first = self.position(rows[0]) if rows else None
+        self.last = self.position(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """The queryset's ordering with the primary key appended as a tiebreaker"""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        names = [field.lstrip('-') for field in ordering]
+        if not any(name in ('pk', queryset.model._meta.pk.name) for name in names):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    @staticmethod
+    def invert(ordering):
+        return [field[1:] if field.startswith('-') else '-' + field for field in ordering]
+
+    @staticmethod
+    def after(ordering, values):
+        """Lexicographic "row comes after ``values``" condition for ``ordering``"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def position(self, row):
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    def to_python(self, queryset, position):
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for field, value in zip(self.ordering, position):
+            output_field = queryset.query.resolve_ref(field.lstrip('-')).output_field
+            try:
+                values.append(output_field.to_python(value))
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return list(payload['p']), bool(payload.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = True
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, default=_cursor_value, separators=(',', ':')).encode('ascii')
+        ).decode('ascii')
+        url = replace_query_param(self.base_url, self.cursor_query_param, encoded)
+        return remove_query_param(url, self.mode_query_param)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self.first, reverse=True)
+
+
+class CursorPaginationOptInMixin:
+    """
+    Serve keyset pages when the client asks for them (``?pagination=cursor`` or
+    a ``cursor`` parameter) and the default page-number pages otherwise.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.cursor_pagination_class.requested(self.request):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
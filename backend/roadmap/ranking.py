@@ -0,0 +1,52 @@
+"""
+Time-decayed "hot" score behind ``sort_by=hot``.
+
+    hot_score = log2(1 + upvotes + COMMENT_WEIGHT * comments)
+                + (created_at - EPOCH) / HALF_LIFE
+
+Ordering by this is the same as ordering by
+``(1 + engagement) * 2 ** (-age / HALF_LIFE)``. An item's weight halves every
+``HALF_LIFE`` seconds, so an item one half-life older needs twice the
+engagement to rank level with a newer one. Age is measured from a fixed epoch
+rather than from "now" (the Reddit formulation). Stored scores therefore
+never go stale as time passes, and a score only changes when its item's
+counters change. Every write path that adjusts the counters recomputes the
+score in the same UPDATE, and the list sorts by walking an index on the
+column.
+
+``manage.py rescore_hot`` recomputes every stored score. Run it after changing
+``ROADMAP_HOT_RANKING`` and after bulk writes that set counters directly. It
+only rewrites rows whose score differs, so it is also safe on a schedule.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.functions import Log
+
+# Scores count half-lives from here; any fixed instant works
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_HOT_RANKING', {})
+
+
+class EpochSeconds(Func):
+    """Seconds since the Unix epoch of a datetime column"""
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # julianday() parses the stored UTC text; 2440587.5 is the Unix epoch
+        return self.as_sql(compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)')
+
+    def as_sql(self, compiler, connection, template='EXTRACT(EPOCH FROM %(expressions)s)', **extra_context):
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+def hot_score_expression(upvotes=F('upvote_count'), comments=F('comment_count')):
+    """The score as a database expression over the given counter expressions"""
+    config = _settings()
+    engagement = Value(1.0) + upvotes + Value(float(config.get('COMMENT_WEIGHT', 2))) * comments
+    age = (EpochSeconds('created_at') - Value(EPOCH)) / Value(float(config.get('HALF_LIFE', 7 * 24 * 3600)))
+    return Log(Value(2.0), engagement) + age
@@ -0,0 +1,32 @@
+"""
+Read/write routing over the one SQLite file.
+
+``settings.ROADMAP_READ_DATABASE`` names a second alias for the same database,
+opened with ``PRAGMA query_only``. Plain reads go there and writes go to the
+primary. In WAL mode the readers never queue behind the writer, and a read
+connection can't take the write lock by accident.
+
+Reads issued inside a transaction on the primary stay on the primary, so a
+write path sees its own uncommitted rows. Tests always run inside a
+transaction, so they only ever touch ``default``.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class ReadWriteRouter:
+    def db_for_read(self, model, **hints):
+        read_alias = getattr(settings, 'ROADMAP_READ_DATABASE', None)
+        if read_alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return read_alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
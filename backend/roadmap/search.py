@@ -0,0 +1,119 @@
+"""
+SQLite FTS5 full-text index over RoadmapItem title and description.
+
+The index is an external-content FTS5 table: it stores only the inverted index
+and reads column values back from ``roadmap_roadmapitem``. Triggers keep it in
+step with every INSERT, UPDATE and DELETE, including bulk operations that skip
+model signals. SQLite drops triggers when a migration remakes the base table,
+so such migrations must call ``install_search_triggers`` again.
+"""
+import re
+from functools import lru_cache
+
+from django.db import connections, models, router
+
+SEARCH_TABLE = 'roadmap_roadmapitem_fts'
+CONTENT_TABLE = 'roadmap_roadmapitem'
+
+CREATE_SEARCH_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    title, description,
+    content='{CONTENT_TABLE}', content_rowid='id',
+    tokenize='porter unicode61'
+)
+"""
+
+SEARCH_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF title, description ON {CONTENT_TABLE} BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+REBUILD_SEARCH_INDEX = f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+
+
+def install_search_triggers(apps, schema_editor):
+    """(Re)create the sync triggers; safe to run from any later migration"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in SEARCH_TRIGGERS:
+        schema_editor.execute(statement)
+    schema_editor.execute(REBUILD_SEARCH_INDEX)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SEARCH_TABLE)
+    install_search_triggers(apps, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+@lru_cache(maxsize=None)
+def search_index_available(alias='default'):
+    """Whether the FTS5 table exists on this connection (cached per process)"""
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        return SEARCH_TABLE in connection.introspection.table_names(cursor)
+
+
+def search_index_available_for(queryset):
+    """
+    ``search_index_available`` on the write database. The index is part of the
+    schema, and unlike ``queryset.db`` the answer doesn't depend on which read
+    alias the router picks for the calling thread.
+    """
+    return search_index_available(router.db_for_write(queryset.model))
+
+
+def build_match_expression(terms):
+    """
+    Turn user search terms into an FTS5 query: every term must match, each as
+    a quoted prefix so operators and punctuation in user input are inert.
+    """
+    quoted = []
+    for term in terms:
+        term = re.sub(r'\s+', ' ', term).strip()
+        if term:
+            quoted.append('"%s"*' % term.replace('"', '""'))
+    return ' '.join(quoted)
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after the table, used as the MATCH target"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
@@ -0,0 +1,184 @@
+"""
+Reproducible synthetic datasets for benchmarks and load testing.
+
+Everything is written with batched ``bulk_create`` calls (upvotes, by far the
+largest table, with a raw ``executemany``) and derived fields (counters, hot
+scores, comment depth/root) are filled in directly, because bulk inserts bypass
+``save()`` and signals. The FTS index stays in sync through its
+triggers.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import Comment, RoadmapItem, Upvote
+from .ranking import hot_score_expression
+
+SEED_PASSWORD = 'benchpass123'
+
+WORDS = (
+    'search dashboard export import mobile dark mode theme notifications api rate limit '
+    'login password reset analytics billing invoices webhooks sync offline cache speed '
+    'accessibility keyboard shortcuts comments replies upvotes roadmap filters tags '
+    'integration slack github calendar email digest onboarding profile avatar settings'
+).split()
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def zipf_counts(n, total, exponent, cap, rng):
+    """
+    Split ``total`` over ``n`` slots following a Zipf-like law: the slot of
+    rank ``r`` gets a share proportional to ``1 / r ** exponent``. Slots are
+    capped at ``cap`` and the overflow goes to the remaining slots, so the sum
+    only falls short when ``n * cap < total``. Ranks are shuffled so popularity
+    is unrelated to insertion order; an exponent of 0 gives a uniform split.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, n + 1)]
+    counts = [0] * n
+    remaining, open_slots = min(total, n * cap), list(range(n))
+    while open_slots and remaining > 0:
+        scale = remaining / sum(weights[i] for i in open_slots)
+        capped = [i for i in open_slots if weights[i] * scale >= cap]
+        if not capped:
+            for i in open_slots:
+                counts[i] = min(cap, int(weights[i] * scale + rng.random()))
+            break
+        for i in capped:
+            counts[i] = cap
+        remaining -= cap * len(capped)
+        open_slots = [i for i in open_slots if counts[i] < cap]
+    rng.shuffle(counts)
+    return counts
+
+
+def _insert_rows(model, fields, rows, batch_size):
+    """
+    ``executemany`` INSERT of pre-adapted value tuples. Skips model
+    instantiation entirely, which dominates ``bulk_create`` at a million rows.
+    """
+    opts = model._meta
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(opts.get_field(name).column) for name in fields)
+    sql = (
+        f'INSERT INTO {quote(opts.db_table)} ({columns}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})'
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+    return len(rows)
+
+
+def seed_dataset(items=100, users=50, upvotes_per_item=5, comments_per_item=3,
+                 reply_depth=2, seed=0, zipf_exponent=1.0, batch_size=5000, stdout=None):
+    """
+    Insert a dataset and return a summary dict with the created row counts and
+    the username shared by the bench/admin tooling (``<prefix>0``).
+
+    Upvotes average ``upvotes_per_item`` and are spread over the items with
+    ``zipf_counts`` (a few very popular items, a long tail of quiet ones).
+    ``reply_depth`` caps comment nesting (0 means top-level comments only).
+    """
+    rng = random.Random(seed)
+    reply_depth = max(0, min(reply_depth, Comment.MAX_DEPTH))
+    prefix = f'seed{seed}_user'
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    with transaction.atomic():
+        password = make_password(SEED_PASSWORD)  # hashed once, shared by every seeded user
+        user_rows = User.objects.bulk_create(
+            [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+             for i in range(users)],
+            batch_size=batch_size
+        )
+        Token.objects.bulk_create(
+            [Token(key=Token.generate_key(), user=user) for user in user_rows],
+            batch_size=batch_size
+        )
+        log(f'Created {len(user_rows)} users with tokens')
+
+        statuses = [choice for choice, _ in RoadmapItem.STATUS_CHOICES]
+        categories = [choice for choice, _ in RoadmapItem.CATEGORY_CHOICES]
+        item_rows = RoadmapItem.objects.bulk_create(
+            [RoadmapItem(
+                title=_sentence(rng, rng.randint(2, 5)),
+                description=_sentence(rng, rng.randint(10, 30)),
+                status=rng.choice(statuses),
+                category=rng.choice(categories),
+            ) for _ in range(items)],
+            batch_size=batch_size
+        )
+        log(f'Created {len(item_rows)} roadmap items')
+
+        counts = zipf_counts(len(item_rows), upvotes_per_item * len(item_rows), zipf_exponent, len(user_rows), rng)
+        upvote_counts = {}
+        user_ids = [user.pk for user in user_rows]
+        created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        pending = []
+        total_upvotes = 0
+        for item, count in zip(item_rows, counts):
+            upvote_counts[item.pk] = count
+            pending.extend((user_id, item.pk, created_at) for user_id in rng.sample(user_ids, count))
+            if len(pending) >= batch_size:
+                total_upvotes += _insert_rows(Upvote, ['user', 'roadmap_item', 'created_at'], pending, batch_size)
+                pending = []
+        total_upvotes += _insert_rows(Upvote, ['user', 'roadmap_item', 'created_at'], pending, batch_size)
+        log(f'Created {total_upvotes} upvotes')
+
+        comment_counts = {item.pk: 0 for item in item_rows}
+        parents = []
+        for depth in range(reply_depth + 1):
+            level = []
+            if depth == 0:
+                for item in item_rows:
+                    for _ in range(rng.randint(0, 2 * comments_per_item)):
+                        level.append(Comment(
+                            user=rng.choice(user_rows), roadmap_item=item,
+                            content=_sentence(rng, rng.randint(3, 20)), depth=0
+                        ))
+            else:
+                for parent in parents:
+                    for _ in range(rng.randint(0, 2)):
+                        level.append(Comment(
+                            user=rng.choice(user_rows), roadmap_item_id=parent.roadmap_item_id,
+                            parent_comment=parent, content=_sentence(rng, rng.randint(3, 20)),
+                            depth=depth, root_comment_id=parent.root_comment_id or parent.pk
+                        ))
+            parents = Comment.objects.bulk_create(level, batch_size=batch_size)
+            for comment in parents:
+                comment_counts[comment.roadmap_item_id] += 1
+        total_comments = sum(comment_counts.values())
+        log(f'Created {total_comments} comments')
+
+        for item in item_rows:
+            item.upvote_count = upvote_counts[item.pk]
+            item.comment_count = comment_counts[item.pk]
+        RoadmapItem.objects.bulk_update(item_rows, ['upvote_count', 'comment_count'], batch_size=batch_size)
+        # Only the rows seeded here; existing items keep their stored scores
+        item_ids = [item.pk for item in item_rows]
+        for start in range(0, len(item_ids), batch_size):
+            RoadmapItem.objects.filter(pk__in=item_ids[start:start + batch_size]).update(
+                hot_score=hot_score_expression()
+            )
+
+    # Bulk writes skip the signals that bump cache versions and validators
+    from .signals import record_change
+    record_change(None)
+
+    return {
+        'users': len(user_rows),
+        'items': len(item_rows),
+        'upvotes': total_upvotes,
+        'comments': total_comments,
+        'username': f'{prefix}0',
+    }
@@ -1,6 +1,69 @@
-from rest_framework import serializers
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from django.contrib.auth.models import User
+from .hashing import hash_password
 from .models import RoadmapItem, Upvote, Comment
+from .timing import TimedSerializerMixin
+
+
+# Unbound DRF field the fast paths fall back to for anything but the common
+# aware-datetime/ISO 8601 case, so output always matches the declared fields.
+_datetime_field = serializers.DateTimeField()
+
+
+def fast_datetime(value, tz):
+    """DateTimeField.to_representation with the current timezone resolved once by the caller"""
+    if tz is None or not timezone.is_aware(value) or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return _datetime_field.to_representation(value)
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class SparseFieldsMixin:
+    """
+    Accepts ``fields=<names>`` to serialize only those declared fields (see
+    fieldsets.py). Each kept field is rendered exactly as in the full output.
+    """
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selected_fields = fields
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selected_fields is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in self.selected_fields}
+
+
+class FastRepresentationMixin:
+    """
+    Optional fast path that builds the representation as a plain dict from
+    already-loaded rows, bypassing per-field ``to_representation`` dispatch.
+    Enabled with ``settings.ROADMAP_FAST_SERIALIZATION``; ``fast_representation``
+    must produce exactly what the declared fields produce (see the parity tests).
+    Sparse fieldsets take the per-field path, which only touches loaded columns.
+    """
+    
+    def to_representation(self, instance):
+        if getattr(settings, 'ROADMAP_FAST_SERIALIZATION', False) and getattr(self, 'selected_fields', None) is None:
+            return self.fast_representation(instance)
+        return super().to_representation(instance)
+    
+    @cached_property
+    def fast_timezone(self):
+        # Looked up once per serializer instead of once per datetime value
+        return timezone.get_current_timezone() if settings.USE_TZ else None
+    
+    def fast_representation(self, instance):
+        raise NotImplementedError
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -24,11 +87,29 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
+        # create_user() without the inline hash; see roadmap.hashing
+        password = hash_password(validated_data.pop('password'))
+        validated_data['username'] = User.normalize_username(validated_data['username'])
+        validated_data['email'] = User.objects.normalize_email(validated_data.get('email', ''))
+        user = User(**validated_data)
+        user.password = password
+        user.save()
         return user
 
 
-class CommentSerializer(serializers.ModelSerializer):
+def fast_user_representation(user, tz):
+    """UserSerializer output for an already-loaded user"""
+    return {
+        'id': user.pk,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'date_joined': fast_datetime(user.date_joined, tz),
+    }
+
+
+class CommentSerializer(TimedSerializerMixin, SparseFieldsMixin, FastRepresentationMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     can_edit = serializers.SerializerMethodField()
     can_reply = serializers.SerializerMethodField()
@@ -41,11 +122,26 @@ class CommentSerializer(serializers.ModelSerializer):
     
     def get_can_edit(self, obj):
         request = self.context.get('request')
-        return request and request.user == obj.user
+        # Compared by id so a fieldset without ``user`` never loads the author
+        return request and request.user.is_authenticated and request.user.pk == obj.user_id
     
     def get_can_reply(self, obj):
         request = self.context.get('request')
         return request and request.user.is_authenticated and obj.can_have_replies()
+    
+    def fast_representation(self, instance):
+        return {
+            'id': instance.pk,
+            'user': fast_user_representation(instance.user, self.fast_timezone),
+            'content': instance.content,
+            'parent_comment': instance.parent_comment_id,
+            'created_at': fast_datetime(instance.created_at, self.fast_timezone),
+            'updated_at': fast_datetime(instance.updated_at, self.fast_timezone),
+            'can_edit': self.get_can_edit(instance),
+            'can_reply': self.get_can_reply(instance),
+            'depth_level': instance.depth_level,
+            'is_reply': instance.is_reply,
+        }
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -54,34 +150,72 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         fields = ['content', 'parent_comment']
     
     def validate_parent_comment(self, value):
-        if value and not value.can_have_replies():
-            raise serializers.ValidationError("Cannot reply to this comment (maximum depth reached)")
+        if self.instance is not None:
+            if (value.pk if value else None) != self.instance.parent_comment_id:
+                raise serializers.ValidationError("Cannot move a comment to a different thread")
+            return value
+        if value:
+            roadmap_item = self.context.get('roadmap_item')
+            if roadmap_item is not None and value.roadmap_item_id != roadmap_item.pk:
+                raise serializers.ValidationError("Cannot reply to a comment on a different roadmap item")
+            if not value.can_have_replies():
+                raise serializers.ValidationError("Cannot reply to this comment (maximum depth reached)")
         return value
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         validated_data['roadmap_item'] = self.context['roadmap_item']
-        return super().create(validated_data)
+        with transaction.atomic():
+            comment = super().create(validated_data)
+            comment.roadmap_item.adjust_counters(comments=1)
+        return comment
 
 
-class RoadmapItemSerializer(serializers.ModelSerializer):
+class RoadmapItemSerializer(TimedSerializerMixin, SparseFieldsMixin, FastRepresentationMixin, serializers.ModelSerializer):
     upvote_count = serializers.ReadOnlyField()
     user_upvoted = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
+    comments_count = serializers.ReadOnlyField(source='comment_count')
     
     class Meta:
         model = RoadmapItem
         fields = ['id', 'title', 'description', 'status', 'category', 
                  'created_at', 'updated_at', 'upvote_count', 'user_upvoted', 'comments_count']
     
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only present on full-text search results requested with ?highlight=true
+        snippet = getattr(instance, 'search_snippet', None)
+        if snippet is not None:
+            data['search_snippet'] = snippet
+        return data
+    
+    # The view passes the user's cached upvote set as upvoted_item_ids, or sets
+    # user_upvoted_annotated via views.annotate_engagement; fall back to a
+    # per-object query when serializing an unannotated instance.
     def get_user_upvoted(self, obj):
+        upvoted_item_ids = self.context.get('upvoted_item_ids')
+        if upvoted_item_ids is not None:
+            return obj.pk in upvoted_item_ids
+        if hasattr(obj, 'user_upvoted_annotated'):
+            return obj.user_upvoted_annotated
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.upvotes.filter(user=request.user).exists()
         return False
     
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+    def fast_representation(self, instance):
+        return {
+            'id': instance.pk,
+            'title': instance.title,
+            'description': instance.description,
+            'status': instance.status,
+            'category': instance.category,
+            'created_at': fast_datetime(instance.created_at, self.fast_timezone),
+            'updated_at': fast_datetime(instance.updated_at, self.fast_timezone),
+            'upvote_count': instance.upvote_count,
+            'user_upvoted': self.get_user_upvoted(instance),
+            'comments_count': instance.comment_count,
+        }
 
 
 class RoadmapItemDetailSerializer(RoadmapItemSerializer):
@@ -90,10 +224,38 @@ class RoadmapItemDetailSerializer(RoadmapItemSerializer):
     class Meta(RoadmapItemSerializer.Meta):
         fields = RoadmapItemSerializer.Meta.fields + ['comments']
     
+    def fast_representation(self, instance):
+        data = super().fast_representation(instance)
+        data['comments'] = self.get_comments(instance)
+        return data
+    
+    @staticmethod
+    def comment_queryset(obj):
+        return obj.comments.select_related('user').order_by('created_at', 'pk')
+    
     def get_comments(self, obj):
-        # Only get top-level comments, replies will be nested
-        top_comments = obj.comments.filter(parent_comment=None)
-        return CommentSerializer(top_comments, many=True, context=self.context).data
+        """
+        Top-level comments with their replies nested under ``replies``, built
+        in memory from one comments+users query regardless of thread size.
+        Views that already loaded ``comment_queryset`` set it as ``comment_thread``.
+        """
+        comments = getattr(obj, 'comment_thread', None)
+        if comments is None:
+            comments = list(self.comment_queryset(obj))
+        replies = defaultdict(list)
+        for comment in comments:
+            if comment.parent_comment_id is not None:
+                replies[comment.parent_comment_id].append(comment)
+        
+        serializer = CommentSerializer(context=self.context)
+        
+        def build(comment):
+            data = serializer.to_representation(comment)
+            children = replies[comment.pk] if comment.can_have_replies() else []
+            data['replies'] = [build(child) for child in children]
+            return data
+        
+        return [build(comment) for comment in comments if comment.parent_comment_id is None]
 
 
 class UpvoteSerializer(serializers.ModelSerializer):
@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import change_scopes, response_cache
+from .metrics import metrics_store
+from .models import Comment, ContentVersion, RoadmapItem, Upvote
+from .upvote_sets import upvote_sets
+
+
+def record_change(item_id):
+    """Bump the conditional-GET validators and the response cache versions"""
+    ContentVersion.bump(*change_scopes(item_id))
+    response_cache.invalidate(item_id)
+
+
+# Signals rather than explicit calls so admin edits, admin deletes and
+# cascading deletes invalidate cached responses as well as the API paths.
+@receiver(post_save, sender=RoadmapItem)
+@receiver(post_delete, sender=RoadmapItem)
+def invalidate_item_responses(sender, instance, **kwargs):
+    record_change(instance.pk)
+
+
+@receiver(post_save, sender=Upvote)
+@receiver(post_delete, sender=Upvote)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_parent_item_responses(sender, instance, **kwargs):
+    record_change(instance.roadmap_item_id)
+
+
+@receiver(post_save, sender=Upvote)
+@receiver(post_delete, sender=Upvote)
+def evict_upvote_set(sender, instance, **kwargs):
+    upvote_sets.evict(instance.user_id)
+
+
+# Counted on commit, so rolled-back writes never show up in the rates
+@receiver(post_save, sender=Upvote)
+@receiver(post_save, sender=Comment)
+def count_created_write(sender, instance, created, **kwargs):
+    if created:
+        name = 'roadmap_upvote_writes_total' if sender is Upvote else 'roadmap_comment_writes_total'
+        transaction.on_commit(lambda: metrics_store.inc(name, action='create'))
+
+
+@receiver(post_delete, sender=Upvote)
+@receiver(post_delete, sender=Comment)
+def count_deleted_write(sender, instance, **kwargs):
+    name = 'roadmap_upvote_writes_total' if sender is Upvote else 'roadmap_comment_writes_total'
+    transaction.on_commit(lambda: metrics_store.inc(name, action='delete'))
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.evict(instance.key)
+
+
+# Any change to the user row (deactivation included) drops the cached copy
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created, **kwargs):
+    if created:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        token_cache.evict(key)
@@ -0,0 +1,165 @@
+"""
+Precomputed roadmap statistics behind ``GET /api/roadmap/stats/``.
+
+``roadmap_roadmapsummary`` holds one row for the whole roadmap and one per
+``status`` and ``category`` value. Each row stores item, upvote and comment
+totals. Triggers on ``roadmap_roadmapitem`` keep the rows in step with every
+INSERT, DELETE and UPDATE of status, category or the stored counters. Every
+upvote toggle and comment create or delete already adjusts those counters,
+so the summary follows them too, bulk writes included. Reading the stats is
+then a scan of about a dozen rows, however many items and upvotes exist.
+
+As with the search index, SQLite drops the triggers when a migration remakes
+the item table, so such migrations must call ``install_summary_triggers``
+again. ``rebuild_summary`` recomputes every row from the item table, and
+``reconcile_counters`` runs it when the rows have drifted. On databases other
+than SQLite no triggers are installed, and the summary is only as fresh as
+the last rebuild.
+"""
+from django.db import connections, router
+from django.db.models import Count, Sum
+
+from .models import RoadmapItem, RoadmapSummary
+
+ITEM_TABLE = 'roadmap_roadmapitem'
+SUMMARY_TABLE = 'roadmap_roadmapsummary'
+TOTAL = ('total', '')
+DIMENSIONS = ('status', 'category')
+
+
+def _values(row, counts):
+    """VALUES tuples applying ``counts`` to the total row and to ``row``'s status and category rows"""
+    return [f"('total', '', {counts})"] + [f"('{name}', {row}.{name}, {counts})" for name in DIMENSIONS]
+
+
+def _upsert(*rows):
+    return f"""
+        INSERT INTO {SUMMARY_TABLE}(dimension, value, items, upvotes, comments) VALUES {', '.join(rows)}
+        ON CONFLICT(dimension, value) DO UPDATE SET
+            items = items + excluded.items,
+            upvotes = upvotes + excluded.upvotes,
+            comments = comments + excluded.comments;
+    """
+
+
+ADD_NEW = _values('new', '1, new.upvote_count, new.comment_count')
+REMOVE_OLD = _values('old', '-1, -old.upvote_count, -old.comment_count')
+COUNTER_DELTAS = _values('new', '0, new.upvote_count - old.upvote_count, new.comment_count - old.comment_count')
+
+SUMMARY_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_ai AFTER INSERT ON {ITEM_TABLE} BEGIN
+        {_upsert(*ADD_NEW)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_ad AFTER DELETE ON {ITEM_TABLE} BEGIN
+        {_upsert(*REMOVE_OLD)}
+    END
+    """,
+    # An upvote or comment only moves the counters: one delta per row
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_au_counts
+    AFTER UPDATE OF upvote_count, comment_count ON {ITEM_TABLE}
+    WHEN old.status IS new.status AND old.category IS new.category
+        AND (old.upvote_count != new.upvote_count OR old.comment_count != new.comment_count)
+    BEGIN
+        {_upsert(*COUNTER_DELTAS)}
+    END
+    """,
+    # A status or category change moves the whole item between rows
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SUMMARY_TABLE}_au_move
+    AFTER UPDATE OF status, category, upvote_count, comment_count ON {ITEM_TABLE}
+    WHEN old.status IS NOT new.status OR old.category IS NOT new.category
+    BEGIN
+        {_upsert(*REMOVE_OLD, *ADD_NEW)}
+    END
+    """,
+]
+
+TRIGGER_SUFFIXES = ('ai', 'ad', 'au_counts', 'au_move')
+
+REBUILD_SUMMARY = [
+    f'DELETE FROM {SUMMARY_TABLE}',
+    f"""
+    INSERT INTO {SUMMARY_TABLE}(dimension, value, items, upvotes, comments)
+    SELECT 'total', '', COUNT(*), COALESCE(SUM(upvote_count), 0), COALESCE(SUM(comment_count), 0)
+    FROM {ITEM_TABLE}
+    """,
+] + [
+    f"""
+    INSERT INTO {SUMMARY_TABLE}(dimension, value, items, upvotes, comments)
+    SELECT '{name}', {name}, COUNT(*), SUM(upvote_count), SUM(comment_count)
+    FROM {ITEM_TABLE} GROUP BY {name}
+    """
+    for name in DIMENSIONS
+]
+
+
+def install_summary_triggers(apps, schema_editor):
+    """(Re)create the triggers and rebuild the rows; safe to run from any later migration"""
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SUMMARY_TRIGGERS:
+            schema_editor.execute(statement)
+    for statement in REBUILD_SUMMARY:
+        schema_editor.execute(statement)
+
+
+def drop_summary_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in TRIGGER_SUFFIXES:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {SUMMARY_TABLE}_{suffix}")
+
+
+def rebuild_summary():
+    """Recompute every summary row from the item table"""
+    with connections[router.db_for_write(RoadmapSummary)].cursor() as cursor:
+        for statement in REBUILD_SUMMARY:
+            cursor.execute(statement)
+
+
+def expected_summary():
+    """The rows the summary should hold, computed from the items (one grouped query)"""
+    expected = {}
+    grouped = RoadmapItem.objects.order_by().values(*DIMENSIONS).annotate(
+        items=Count('pk'), upvotes=Sum('upvote_count'), comments=Sum('comment_count')
+    )
+    for row in grouped:
+        counts = (row['items'], row['upvotes'], row['comments'])
+        for key in [TOTAL] + [(name, row[name]) for name in DIMENSIONS]:
+            expected[key] = tuple(a + b for a, b in zip(expected.get(key, (0, 0, 0)), counts))
+    return expected
+
+
+def summary_drifted():
+    """Whether any non-empty summary row disagrees with the item table"""
+    stored = {
+        (dimension, value): (items, upvotes, comments)
+        for dimension, value, items, upvotes, comments in RoadmapSummary.objects.values_list(
+            'dimension', 'value', 'items', 'upvotes', 'comments'
+        )
+        if items or upvotes or comments
+    }
+    expected = expected_summary()
+    expected.setdefault(TOTAL, (0, 0, 0))
+    stored.setdefault(TOTAL, (0, 0, 0))
+    return stored != expected
+
+
+def roadmap_stats():
+    """The stats payload: totals plus per-status and per-category breakdowns"""
+    rows = {
+        (dimension, value): {'items': items, 'upvotes': upvotes, 'comments': comments}
+        for dimension, value, items, upvotes, comments in RoadmapSummary.objects.values_list(
+            'dimension', 'value', 'items', 'upvotes', 'comments'
+        )
+    }
+    empty = {'items': 0, 'upvotes': 0, 'comments': 0}
+    stats = dict(rows.get(TOTAL, empty))
+    for name in DIMENSIONS:
+        choices = [value for value, _ in RoadmapItem._meta.get_field(name).choices]
+        extra = sorted(value for dimension, value in rows if dimension == name and value not in choices)
+        stats[name] = {value: rows.get((name, value), empty) for value in choices + extra}
+    return stats
@@ -1,3 +1,7 @@
+from io import StringIO
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
@@ -6,11 +10,14 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
+from .authentication import token_cache
+from .cache import response_cache
 from .models import RoadmapItem, Upvote, Comment
 from .serializers import (
     UserRegistrationSerializer, RoadmapItemSerializer, 
     CommentSerializer, CommentCreateSerializer
 )
+from .upvote_sets import upvote_sets
 
 
 class RoadmapItemModelTestCase(TestCase):
@@ -628,3 +635,2272 @@ class IntegrationTestCase(APITestCase):
         # 7. Logout
         logout_response = self.client.post(reverse('roadmap:logout'))
         self.assertEqual(logout_response.status_code, status.HTTP_200_OK)
+
+
+class RoadmapListQueryCountTestCase(APITestCase):
+    """Regression tests keeping the roadmap list at a constant number of queries"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other_user = User.objects.create_user(username='otheruser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.list_url = reverse('roadmap:roadmap_list')
+    
+    def seed_items(self, count):
+        RoadmapItem.objects.all().delete()
+        RoadmapItem.objects.bulk_create([
+            RoadmapItem(title=f"Item {i}", description=f"Description {i}")
+            for i in range(count)
+        ])
+        items = list(RoadmapItem.objects.all()[:20])
+        Upvote.objects.bulk_create(
+            [Upvote(user=self.user, roadmap_item=item) for item in items[::2]] +
+            [Upvote(user=self.other_user, roadmap_item=item) for item in items]
+        )
+        Comment.objects.bulk_create([
+            Comment(user=self.other_user, roadmap_item=item, content="Comment")
+            for item in items
+        ])
+        call_command('reconcile_counters', stdout=StringIO())
+    
+    def count_list_queries(self, item_count, **params):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.seed_items(item_count)
+        token_cache.clear()  # measure every request with a cold token lookup
+        upvote_sets.evict(self.user.pk)  # and a cold upvote set; the seed rows send no signals
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+    
+    def test_anonymous_list_query_count_is_constant(self):
+        """Test anonymous list costs the same queries for 10 and 1,000 items"""
+        small, _ = self.count_list_queries(10)
+        large, _ = self.count_list_queries(1000)
+        self.assertEqual(small, large)
+    
+    def test_authenticated_list_query_count_is_constant(self):
+        """Test authenticated list costs the same queries for 10 and 1,000 items"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        small, _ = self.count_list_queries(10)
+        large, response = self.count_list_queries(1000)
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['results']), 20)
+    
+    def test_list_counts_and_upvote_flag_are_batched_correctly(self):
+        """Test annotated counts and user_upvoted match the stored rows"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        _, response = self.count_list_queries(10)
+        for row in response.data['results']:
+            item = RoadmapItem.objects.get(pk=row['id'])
+            self.assertEqual(row['upvote_count'], item.upvotes.count())
+            self.assertEqual(row['comments_count'], item.comments.count())
+            self.assertEqual(
+                row['user_upvoted'],
+                item.upvotes.filter(user=self.user).exists()
+            )
+
+
+class DenormalizedCounterTestCase(APITestCase):
+    """Test cases for the stored upvote and comment counters"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+        self.roadmap_item = RoadmapItem.objects.create(
+            title="Test Feature",
+            description="Test description"
+        )
+        self.upvote_url = reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.roadmap_item.pk})
+        self.comments_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk})
+    
+    def test_toggle_upvote_updates_counter(self):
+        """Test upvote toggling increments and decrements upvote_count"""
+        response = self.client.post(self.upvote_url)
+        self.assertEqual(response.data['upvote_count'], 1)
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 1)
+        
+        response = self.client.post(self.upvote_url)
+        self.assertEqual(response.data['upvote_count'], 0)
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 0)
+    
+    def test_comment_create_and_thread_delete_update_counter(self):
+        """Test comment_count follows creates and cascading thread deletes"""
+        self.client.post(self.comments_url, {'content': 'Parent'})
+        parent_id = Comment.objects.get(content='Parent').pk
+        self.client.post(self.comments_url, {'content': 'Reply', 'parent_comment': parent_id})
+        reply_id = Comment.objects.get(parent_comment=parent_id).pk
+        self.client.post(self.comments_url, {'content': 'Nested', 'parent_comment': reply_id})
+        self.client.post(self.comments_url, {'content': 'Other'})
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.comment_count, 4)
+        
+        response = self.client.delete(reverse('roadmap:comment_detail', kwargs={'pk': parent_id}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.comment_count, 1)
+        self.assertEqual(self.roadmap_item.comments.count(), 1)
+    
+    def test_saving_a_stale_instance_keeps_the_counters(self):
+        """Test an edit saved from an instance loaded before an upvote or comment does not roll the counters back"""
+        stale = RoadmapItem.objects.get(pk=self.roadmap_item.pk)
+        self.client.post(self.upvote_url)
+        self.client.post(self.comments_url, {'content': 'First'})
+        
+        # What the admin's list_editable status column and any other full save do
+        stale.status = 'in_progress'
+        stale.save()
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.status, 'in_progress')
+        self.assertEqual((self.roadmap_item.upvote_count, self.roadmap_item.comment_count), (1, 1))
+    
+    def test_list_popularity_sort_uses_counter(self):
+        """Test sort_by=popularity orders by the stored upvote counter"""
+        popular = RoadmapItem.objects.create(title="Popular", description="Popular item")
+        popular.adjust_counters(upvotes=5)
+        response = self.client.get(reverse('roadmap:roadmap_list'), {'sort_by': 'popularity'})
+        self.assertEqual(response.data['results'][0]['id'], popular.pk)
+        self.assertEqual(response.data['results'][0]['upvote_count'], 5)
+    
+    def test_reconcile_counters_fixes_drift(self):
+        """Test reconcile_counters repairs counters changed outside the write paths"""
+        Upvote.objects.create(user=self.user, roadmap_item=self.roadmap_item)
+        Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content="Direct")
+        
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('1 roadmap items have drifted', out.getvalue())
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 0)
+        
+        call_command('reconcile_counters', stdout=StringIO())
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 1)
+        self.assertEqual(self.roadmap_item.comment_count, 1)
+
+
+class FullTextSearchTestCase(APITestCase):
+    """Test cases for the FTS5-backed roadmap search"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.list_url = reverse('roadmap:roadmap_list')
+        self.dark_mode = RoadmapItem.objects.create(
+            title="Dark Mode Support",
+            description="Add a dark theme option",
+            status="in_progress"
+        )
+        self.search = RoadmapItem.objects.create(
+            title="Advanced Search",
+            description="Search filters that also work in dark mode",
+            status="planning"
+        )
+        self.other = RoadmapItem.objects.create(
+            title="Rate Limiting",
+            description="Throttle abusive clients",
+            status="planning"
+        )
+    
+    def search_ids(self, **params):
+        response = self.client.get(self.list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+    
+    def test_search_ranks_by_relevance(self):
+        """Test results are ranked with the best title match first"""
+        self.assertEqual(self.search_ids(search='dark mode'), [self.dark_mode.pk, self.search.pk])
+    
+    def test_search_matches_prefixes_and_ignores_operators(self):
+        """Test partial words match and FTS syntax in input is treated literally"""
+        self.assertEqual(self.search_ids(search='throt'), [self.other.pk])
+        self.assertEqual(self.search_ids(search='"rate" OR NEAR('), [])
+    
+    def test_search_index_follows_save_and_delete(self):
+        """Test the index is updated when items are edited or removed"""
+        self.other.title = "Quantum Scheduler"
+        self.other.save()
+        self.assertEqual(self.search_ids(search='quantum'), [self.other.pk])
+        self.assertEqual(self.search_ids(search='rate limiting'), [])
+        
+        self.other.delete()
+        self.assertEqual(self.search_ids(search='quantum'), [])
+    
+    def test_search_combines_with_filters_and_popularity(self):
+        """Test search works with status filtering and the popularity sort"""
+        self.assertEqual(self.search_ids(search='dark', status='planning'), [self.search.pk])
+        self.search.adjust_counters(upvotes=3)
+        self.assertEqual(
+            self.search_ids(search='dark', sort_by='popularity'),
+            [self.search.pk, self.dark_mode.pk]
+        )
+    
+    def test_search_highlight_snippets(self):
+        """Test highlighted snippets are only returned when requested"""
+        response = self.client.get(self.list_url, {'search': 'theme'})
+        self.assertNotIn('search_snippet', response.data['results'][0])
+        
+        response = self.client.get(self.list_url, {'search': 'theme', 'highlight': 'true'})
+        self.assertIn('<mark>theme</mark>', response.data['results'][0]['search_snippet'])
+
+
+class CursorPaginationTestCase(APITestCase):
+    """Test cases for opt-in keyset pagination on list and comment endpoints"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.list_url = reverse('roadmap:roadmap_list')
+        self.items = RoadmapItem.objects.bulk_create([
+            RoadmapItem(title=f"Item {i}", description="Description")
+            for i in range(25)
+        ])
+        # Many ties on both the upvote counter and created_at
+        RoadmapItem.objects.filter(pk__in=[item.pk for item in self.items[::3]]).update(upvote_count=2)
+        # Bulk writes skip the signals that invalidate cached anonymous responses
+        response_cache.invalidate()
+    
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, dict(params, pagination='cursor'))
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+    
+    def test_cursor_walk_matches_offset_ordering(self):
+        """Test cursor pages cover every item once, in the page-number order"""
+        for params in ({}, {'sort_by': 'popularity'}, {'ordering': 'upvote_count_annotated'}):
+            ids, _ = self.walk(self.list_url, dict(params, page_size=7))
+            expected = [
+                row['id']
+                for page in (1, 2)
+                for row in self.client.get(self.list_url, dict(params, page=page)).data['results']
+            ]
+            self.assertEqual(len(set(ids)), 25)
+            self.assertEqual(ids, expected)
+    
+    def test_previous_link_returns_previous_page(self):
+        """Test following previous returns the page before the current one"""
+        first = self.client.get(self.list_url, {'pagination': 'cursor', 'page_size': 10})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']]
+        )
+    
+    def test_popularity_scroll_has_no_duplicates_when_votes_change(self):
+        """Test items voted up mid-scroll do not push earlier rows onto later pages"""
+        first = self.client.get(self.list_url, {'pagination': 'cursor', 'sort_by': 'popularity'})
+        seen = {row['id'] for row in first.data['results']}
+        late = RoadmapItem.objects.exclude(pk__in=seen).first()
+        late.adjust_counters(upvotes=10)
+        second = self.client.get(first.data['next'])
+        self.assertFalse(seen & {row['id'] for row in second.data['results']})
+    
+    def test_page_number_pagination_is_default(self):
+        """Test responses without the opt-in keep the page-number shape"""
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data['count'], 25)
+    
+    def test_invalid_cursor_returns_404(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get(self.list_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_comment_cursor_pagination(self):
+        """Test comments can be walked with cursors in creation order"""
+        item = self.items[0]
+        Comment.objects.bulk_create([
+            Comment(user=self.user, roadmap_item=item, content=f"Comment {i}")
+            for i in range(30)
+        ])
+        url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': item.pk})
+        ids, _ = self.walk(url, {})
+        self.assertEqual(ids, list(item.comments.order_by('created_at', 'pk').values_list('id', flat=True)))
+
+
+class CommentTreeTestCase(APITestCase):
+    """Test cases for the nested comment tree on the roadmap detail endpoint"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.roadmap_item = RoadmapItem.objects.create(title="Test Feature", description="Test")
+        self.detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk})
+    
+    def add_thread(self, replies):
+        root = Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content="Root")
+        for i in range(replies):
+            reply = Comment.objects.create(
+                user=User.objects.create_user(username=f'user{root.pk}-{i}'),
+                roadmap_item=self.roadmap_item, content="Reply", parent_comment=root
+            )
+            Comment.objects.create(
+                user=self.user, roadmap_item=self.roadmap_item,
+                content="Nested", parent_comment=reply
+            )
+        return root
+    
+    def count_detail_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        token_cache.clear()  # measure every request with a cold token lookup
+        upvote_sets.evict(self.user.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+    
+    def test_detail_returns_nested_reply_tree(self):
+        """Test replies are nested under their parents with depth metadata"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        root = self.add_thread(replies=2)
+        _, response = self.count_detail_queries()
+        
+        comments = response.data['comments']
+        self.assertEqual([c['id'] for c in comments], [root.pk])
+        self.assertEqual(len(comments[0]['replies']), 2)
+        reply = comments[0]['replies'][0]
+        self.assertEqual(reply['depth_level'], 1)
+        self.assertTrue(reply['can_reply'])
+        nested = reply['replies'][0]
+        self.assertEqual(nested['depth_level'], 2)
+        self.assertFalse(nested['can_reply'])
+        self.assertTrue(nested['can_edit'])
+        self.assertEqual(nested['replies'], [])
+    
+    def test_detail_query_count_independent_of_comment_count(self):
+        """Test detail queries stay constant as comments and replies grow"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.add_thread(replies=1)
+        small, _ = self.count_detail_queries()
+        for _ in range(5):
+            self.add_thread(replies=4)
+        large, response = self.count_detail_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['comments']), 6)
+
+
+class CommentThreadPositionTestCase(APITestCase):
+    """Test cases for the stored depth and root_comment columns"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.roadmap_item = RoadmapItem.objects.create(title="Test Feature", description="Test")
+        self.other_item = RoadmapItem.objects.create(title="Other Feature", description="Other")
+        self.root = Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content="Root")
+        self.reply = Comment.objects.create(
+            user=self.user, roadmap_item=self.roadmap_item, content="Reply", parent_comment=self.root
+        )
+        self.nested = Comment.objects.create(
+            user=self.user, roadmap_item=self.roadmap_item, content="Nested", parent_comment=self.reply
+        )
+        self.comments_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk})
+    
+    def test_depth_and_root_are_stored_on_create(self):
+        """Test depth and root_comment are derived from the parent on save"""
+        self.assertEqual((self.root.depth, self.root.root_comment_id), (0, None))
+        self.assertEqual((self.reply.depth, self.reply.root_comment_id), (1, self.root.pk))
+        self.assertEqual((self.nested.depth, self.nested.root_comment_id), (2, self.root.pk))
+        self.assertEqual(
+            set(self.root.thread_comments.values_list('id', flat=True)),
+            {self.reply.pk, self.nested.pk}
+        )
+    
+    def test_depth_checks_do_not_walk_parents(self):
+        """Test depth_level and can_have_replies are answered without queries"""
+        nested = Comment.objects.get(pk=self.nested.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(nested.depth_level, 2)
+            self.assertFalse(nested.can_have_replies())
+            self.assertTrue(nested.is_reply)
+    
+    def test_reply_to_comment_on_other_item_is_rejected(self):
+        """Test a parent comment from a different roadmap item is rejected"""
+        other_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.other_item.pk})
+        response = self.client.post(other_url, {'content': 'Sneaky', 'parent_comment': self.root.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('different roadmap item', str(response.data))
+    
+    def test_reply_through_api_sets_thread_position(self):
+        """Test replies created through the API carry depth and root"""
+        response = self.client.post(self.comments_url, {'content': 'Another', 'parent_comment': self.reply.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        comment = Comment.objects.get(content='Another')
+        self.assertEqual((comment.depth, comment.root_comment_id), (2, self.root.pk))
+    
+    def test_deleting_thread_root_updates_counter(self):
+        """Test deleting a top-level comment removes its whole thread from the counter"""
+        call_command('reconcile_counters', stdout=StringIO())
+        response = self.client.delete(reverse('roadmap:comment_detail', kwargs={'pk': self.root.pk}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.comment_count, 0)
+
+
+class ResponseCacheTestCase(APITestCase):
+    """Test cases for the versioned anonymous response cache"""
+    
+    def setUp(self):
+        from django.core.cache import caches
+        from .cache import response_cache
+        
+        caches['responses'].clear()
+        response_cache.reset_stats()
+        self.response_cache = response_cache
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.roadmap_item = RoadmapItem.objects.create(title="Test Feature", description="Test")
+        self.list_url = reverse('roadmap:roadmap_list')
+        self.detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk})
+    
+    def test_anonymous_list_is_served_from_cache(self):
+        """Test a repeated anonymous list request is a cache hit"""
+        first = self.client.get(self.list_url, {'status': 'planning'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        # Only the conditional-GET version lookup remains
+        with self.assertNumQueries(1):
+            second = self.client.get(self.list_url, {'status': 'planning'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.response_cache.stats()['hits'], 1)
+        self.assertEqual(self.response_cache.stats()['misses'], 1)
+    
+    def test_cached_links_follow_the_requested_origin(self):
+        """Test each host and scheme gets its own entry, with its own pagination links"""
+        for index in range(25):
+            RoadmapItem.objects.create(title=f"Paged {index}", description="Test")
+        first = self.client.get(self.list_url, HTTP_HOST='localhost')
+        self.assertTrue(first.data['next'].startswith('http://localhost/'))
+        
+        for extra, origin in (({'HTTP_HOST': '127.0.0.1'}, 'http://127.0.0.1/'),
+                              ({'HTTP_HOST': 'localhost', 'secure': True}, 'https://localhost/')):
+            with self.subTest(origin=origin):
+                response = self.client.get(self.list_url, **extra)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertTrue(response.json()['next'].startswith(origin))
+        self.assertEqual(self.client.get(self.list_url, HTTP_HOST='localhost')['X-Cache'], 'HIT')
+    
+    def test_upvote_and_comment_invalidate_cached_responses(self):
+        """Test writes bump the versions so the next read is fresh"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.roadmap_item.pk}))
+        self.client.post(
+            reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk}),
+            {'content': 'Fresh comment'}
+        )
+        self.client.credentials()
+        
+        listed = self.client.get(self.list_url)
+        self.assertEqual(listed['X-Cache'], 'MISS')
+        self.assertEqual(listed.data['results'][0]['upvote_count'], 1)
+        detail = self.client.get(self.detail_url)
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        self.assertEqual(len(detail.data['comments']), 1)
+    
+    def test_item_edit_only_invalidates_that_item(self):
+        """Test editing one item leaves other items' detail caches intact"""
+        other = RoadmapItem.objects.create(title="Other", description="Other")
+        other_url = reverse('roadmap:roadmap_detail', kwargs={'pk': other.pk})
+        self.client.get(self.detail_url)
+        self.client.get(other_url)
+        
+        self.roadmap_item.title = "Renamed"
+        self.roadmap_item.save()
+        
+        self.assertEqual(self.client.get(other_url)['X-Cache'], 'HIT')
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], "Renamed")
+    
+    def test_authenticated_requests_bypass_cache(self):
+        """Test per-user responses are never cached or served from cache"""
+        self.client.get(self.list_url)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = self.client.get(self.list_url)
+        self.assertNotIn('X-Cache', response)
+    
+    def test_file_based_backend(self):
+        """Test the cache works on the file-based backend"""
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as location:
+            caches_setting = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'responses': {
+                    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location,
+                },
+            }
+            with self.settings(CACHES=caches_setting):
+                self.assertEqual(self.client.get(self.list_url)['X-Cache'], 'MISS')
+                self.assertEqual(self.client.get(self.list_url)['X-Cache'], 'HIT')
+                RoadmapItem.objects.create(title="New", description="New")
+                response = self.client.get(self.list_url)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertEqual(response.data['count'], 2)
+
+
+class ConditionalGetTestCase(APITestCase):
+    """Test cases for ETag / Last-Modified handling on read endpoints"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.token2 = Token.objects.create(user=self.user2)
+        self.roadmap_item = RoadmapItem.objects.create(title="Test Feature", description="Test")
+        self.list_url = reverse('roadmap:roadmap_list')
+        self.detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk})
+        self.comments_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk})
+        self.upvote_url = reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.roadmap_item.pk})
+    
+    def test_matching_etag_returns_304_without_building_response(self):
+        """Test a revalidation costs only the version lookup"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        for url in (self.list_url, self.detail_url, self.comments_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('Last-Modified', response)
+            
+            # Version lookup only (the token lookup is cached)
+            with self.assertNumQueries(1):
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(revalidated['ETag'], response['ETag'])
+    
+    def test_writes_change_the_etag(self):
+        """Test upvotes and comments invalidate list, detail and comment ETags"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        etags = {url: self.client.get(url)['ETag'] for url in (self.list_url, self.detail_url, self.comments_url)}
+        self.client.post(self.upvote_url)
+        self.client.post(self.comments_url, {'content': 'New comment'})
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_etag_is_not_shared_between_users(self):
+        """Test one user's ETag never revalidates another user's upvote state"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.client.post(self.upvote_url)
+        etag = self.client.get(self.detail_url)['ETag']
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token2.key}')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['user_upvoted'])
+        
+        self.client.credentials()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_etag_depends_on_query_string(self):
+        """Test filtered list responses get their own validators"""
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, {'status': 'completed'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_missing_item_has_no_etag(self):
+        """Test 404 responses are not given validators"""
+        response = self.client.get(reverse('roadmap:roadmap_detail', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+
+class FastSerializationParityTestCase(APITestCase):
+    """Test the fast serialization path renders byte-identical JSON"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser', password='testpass123',
+            email='test@example.com', first_name='Test', last_name='User'
+        )
+        self.user2 = User.objects.create_user(username='testuser2', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.roadmap_item = RoadmapItem.objects.create(
+            title="Dark Mode", description="Add a dark theme", status="in_progress", category="improvement"
+        )
+        RoadmapItem.objects.create(title="Search", description="Dark search results")
+        Upvote.objects.create(user=self.user, roadmap_item=self.roadmap_item)
+        call_command('reconcile_counters', stdout=StringIO())
+        root = Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content="Root")
+        reply = Comment.objects.create(
+            user=self.user2, roadmap_item=self.roadmap_item, content="Reply", parent_comment=root
+        )
+        Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content="Nested", parent_comment=reply)
+        
+        item_id = self.roadmap_item.pk
+        self.requests = [
+            (reverse('roadmap:roadmap_list'), {}),
+            (reverse('roadmap:roadmap_list'), {'search': 'dark', 'highlight': 'true'}),
+            (reverse('roadmap:roadmap_list'), {'pagination': 'cursor', 'sort_by': 'popularity'}),
+            (reverse('roadmap:roadmap_detail', kwargs={'pk': item_id}), {}),
+            (reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': item_id}), {}),
+            (reverse('roadmap:comment_detail', kwargs={'pk': root.pk}), {}),
+        ]
+    
+    def render_all(self, fast):
+        with self.settings(ROADMAP_FAST_SERIALIZATION=fast, ROADMAP_RESPONSE_CACHE={'ENABLED': False}):
+            return [self.client.get(url, params).content for url, params in self.requests]
+    
+    def assert_parity(self):
+        for slow, fast in zip(self.render_all(False), self.render_all(True)):
+            self.assertEqual(slow, fast)
+    
+    def test_parity_authenticated(self):
+        """Test authenticated payloads (user_upvoted, can_edit) are identical"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assert_parity()
+    
+    def test_parity_anonymous(self):
+        """Test anonymous payloads are identical (comment detail needs auth)"""
+        self.requests = self.requests[:-1]
+        self.assert_parity()
+    
+    def test_parity_in_other_timezone(self):
+        """Test datetimes convert to the active timezone exactly as DRF does"""
+        from django.utils import timezone
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with timezone.override('Asia/Kolkata'):
+            self.assert_parity()
+    
+    def test_unannotated_instance_parity(self):
+        """Test serializing a plain instance outside the views also matches"""
+        from rest_framework.renderers import JSONRenderer
+        
+        item = RoadmapItem.objects.get(pk=self.roadmap_item.pk)
+        outputs = []
+        for fast in (False, True):
+            with self.settings(ROADMAP_FAST_SERIALIZATION=fast):
+                outputs.append(JSONRenderer().render(RoadmapItemSerializer(item).data))
+        self.assertEqual(outputs[0], outputs[1])
+
+
+
+class BenchApiCommandTestCase(APITestCase):
+    """Test the bench_api management command on a tiny dataset"""
+    
+    def run_bench(self, *args):
+        out = StringIO()
+        call_command(
+            'bench_api', '--use-database', '--items', '5', '--users', '4',
+            '--requests', '3', '--warmup', '0', *args, stdout=out
+        )
+        return out.getvalue()
+    
+    def test_reports_every_endpoint(self):
+        """Test each endpoint gets a latency and query row"""
+        output = self.run_bench()
+        for name in ('roadmap_list', 'roadmap_detail', 'toggle_upvote', 'roadmap_comments'):
+            self.assertIn(name, output)
+    
+    def test_json_output_and_compare(self):
+        """Test results are written as JSON and can be compared against"""
+        import json
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.json')
+            self.run_bench('--endpoint', 'roadmap_list', '--output', path)
+            with open(path) as fh:
+                results = json.load(fh)
+            self.assertEqual(results['dataset']['items'], 5)
+            row = results['endpoints']['roadmap_list']
+            self.assertEqual(row['requests'], 3)
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['mean_queries'], 0)
+            
+            output = self.run_bench('--seed', '1', '--endpoint', 'roadmap_list', '--compare', path)
+            self.assertIn('Change against', output)
+    
+    def test_seeded_dataset_is_reproducible(self):
+        """Test the same seed produces the same dataset"""
+        from .seeding import seed_dataset
+        
+        first = seed_dataset(items=6, users=5, seed=3)
+        RoadmapItem.objects.all().delete()
+        User.objects.all().delete()
+        second = seed_dataset(items=6, users=5, seed=3)
+        self.assertEqual(first, second)
+        for item in RoadmapItem.objects.all():
+            self.assertEqual(item.upvote_count, item.upvotes.count())
+            self.assertEqual(item.comment_count, item.comments.count())
+
+
+
+class PopulateDataCommandTestCase(APITestCase):
+    """Test populate_data's synthetic dataset options"""
+    
+    def test_sample_items_without_options(self):
+        """Test the default run still creates the hard-coded sample items"""
+        call_command('populate_data', stdout=StringIO())
+        self.assertEqual(RoadmapItem.objects.count(), 10)
+    
+    def test_synthetic_dataset(self):
+        """Test a synthetic dataset is created with consistent counters and tokens"""
+        call_command(
+            'populate_data', '--items', '20', '--users', '15', '--upvotes-per-item', '5',
+            '--comments-per-item', '2', '--seed', '4', '--batch-size', '7', stdout=StringIO()
+        )
+        self.assertEqual(RoadmapItem.objects.count(), 20)
+        self.assertEqual(Token.objects.filter(user__username__startswith='seed4_user').count(), 15)
+        self.assertAlmostEqual(Upvote.objects.count(), 100, delta=10)
+        self.assertEqual(Comment.objects.filter(depth__gt=Comment.MAX_DEPTH).count(), 0)
+        self.assertTrue(Comment.objects.filter(depth=Comment.MAX_DEPTH).exists())
+        for item in RoadmapItem.objects.all():
+            self.assertEqual(item.upvote_count, item.upvotes.count())
+            self.assertEqual(item.comment_count, item.comments.count())
+        
+        # Seeded usernames are reserved per seed
+        with self.assertRaises(CommandError):
+            call_command('populate_data', '--items', '1', '--seed', '4', stdout=StringIO())
+    
+    def test_seeding_only_scores_the_seeded_items(self):
+        """Test seeding into an existing database leaves the other items' rows alone"""
+        from .ranking import hot_score_expression
+        from .seeding import seed_dataset
+        
+        existing = RoadmapItem.objects.create(title='Existing', description='Kept', category='feature')
+        RoadmapItem.objects.filter(pk=existing.pk).update(hot_score=-1.0)
+        seed_dataset(items=5, users=4, upvotes_per_item=2, seed=8, batch_size=2)
+        existing.refresh_from_db()
+        self.assertEqual(existing.hot_score, -1.0)
+        self.assertFalse(
+            RoadmapItem.objects.exclude(pk=existing.pk).exclude(hot_score=hot_score_expression()).exists()
+        )
+    
+    def test_zipf_counts(self):
+        """Test upvotes follow a skewed split that keeps the total under the cap"""
+        import random
+        from .seeding import zipf_counts
+        
+        counts = zipf_counts(100, 2000, 1.0, 60, random.Random(0))
+        self.assertEqual(len(counts), 100)
+        self.assertAlmostEqual(sum(counts), 2000, delta=100)
+        self.assertEqual(max(counts), 60)
+        self.assertLess(sorted(counts)[50], 20)
+        
+        uniform = zipf_counts(10, 100, 0, 60, random.Random(0))
+        self.assertTrue(all(9 <= count <= 11 for count in uniform))
+
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """Test token lookups are cached and evicted on logout and user changes"""
+    
+    def setUp(self):
+        token_cache.clear()
+        token_cache.reset_stats()
+        self.user = User.objects.create_user(username='cached', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.profile_url = reverse('roadmap:user_profile')
+    
+    def test_repeat_requests_skip_token_query(self):
+        """Test only the first authenticated request looks the token up"""
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url)
+        self.assertEqual(response.data['username'], 'cached')
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+    
+    def test_logout_evicts_token(self):
+        """Test a logged out token is rejected straight away"""
+        self.client.get(self.profile_url)
+        self.assertEqual(self.client.post(reverse('roadmap:logout')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_deactivation_evicts_token(self):
+        """Test a deactivated user's cached token stops working"""
+        self.client.get(self.profile_url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.profile_url).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_profile_change_is_not_served_stale(self):
+        """Test user edits are visible on the next request"""
+        self.client.get(self.profile_url)
+        self.user.email = 'new@example.com'
+        self.user.save()
+        self.assertEqual(self.client.get(self.profile_url).data['email'], 'new@example.com')
+    
+    def test_eviction_reaches_other_workers(self):
+        """Test an eviction in one process invalidates another process's entry"""
+        from .authentication import TokenCache
+        
+        other_worker = TokenCache()
+        other_worker.set(self.token.key, self.user, self.token)
+        self.assertIsNotNone(other_worker.get(self.token.key))
+        token_cache.evict(self.token.key)
+        self.assertIsNone(other_worker.get(self.token.key))
+    
+    def test_eviction_survives_another_worker_recaching(self):
+        """Test a worker re-caching the token after an eviction does not revive stale copies elsewhere"""
+        from .authentication import TokenCache
+        
+        stale_worker = TokenCache()
+        stale_worker.set(self.token.key, self.user, self.token)
+        token_cache.evict(self.token.key)
+        token_cache.set(self.token.key, self.user, self.token)
+        self.assertIsNone(stale_worker.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(self.token.key))
+    
+    def test_lru_bound_and_ttl(self):
+        """Test the cache keeps at most MAX_SIZE entries and honours the TTL"""
+        from .authentication import TokenCache
+        
+        cache = TokenCache()
+        with self.settings(ROADMAP_TOKEN_CACHE={'MAX_SIZE': 2, 'TTL': 60}):
+            for key in ('a', 'b', 'c'):
+                cache.set(key, self.user, self.token)
+            self.assertEqual(len(cache), 2)
+            self.assertIsNone(cache.get('a'))
+            self.assertIsNotNone(cache.get('c'))
+        with self.settings(ROADMAP_TOKEN_CACHE={'MAX_SIZE': 2, 'TTL': 0}):
+            cache.set('d', self.user, self.token)
+            self.assertIsNone(cache.get('d'))
+    
+    def test_cache_stats_endpoint(self):
+        """Test cache stats are visible to staff only"""
+        url = reverse('roadmap:cache_stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_rate', response.data['token_cache'])
+        self.assertIn('hit_rate', response.data['response_cache'])
+
+
+
+class PasswordHashingPoolTestCase(APITestCase):
+    """Test login and register hash passwords on the bounded pool"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='hasher', password='testpass123')
+        self.login_url = reverse('roadmap:login')
+        self.register_url = reverse('roadmap:register')
+    
+    def saturate_pool(self):
+        """Occupy the only slot of a WORKERS=1, MAX_QUEUE=0 pool until the returned event is set"""
+        import threading
+        from .hashing import hashing_pool
+        
+        release = threading.Event()
+        started = threading.Event()
+        
+        def block():
+            started.set()
+            release.wait(5)
+        
+        future = hashing_pool.submit(block)
+        started.wait(5)
+        self.addCleanup(future.result)
+        self.addCleanup(release.set)
+        return release
+    
+    def test_login_and_register_use_the_pool(self):
+        """Test credentials are checked and hashed through the pool"""
+        from .hashing import hashing_pool
+        
+        completed = hashing_pool.stats()['completed']
+        response = self.client.post(self.login_url, {'username': 'hasher', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(self.register_url, {
+            'username': 'newbie', 'email': 'New@EXAMPLE.com',
+            'password': 'testpassword123', 'password_confirm': 'testpassword123',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(hashing_pool.stats()['completed'], completed + 2)
+        
+        user = User.objects.get(username='newbie')
+        self.assertTrue(user.check_password('testpassword123'))
+        self.assertEqual(user.email, 'New@example.com')
+    
+    def test_wrong_password_and_inactive_user_are_rejected(self):
+        """Test the offloaded check keeps ModelBackend's semantics"""
+        response = self.client.post(self.login_url, {'username': 'hasher', 'password': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post(self.login_url, {'username': 'hasher', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_login_goes_through_authenticate(self):
+        """Test failed logins send user_login_failed and other configured backends still run"""
+        from django.contrib.auth.signals import user_login_failed
+        
+        failures = []
+        
+        def record(sender, credentials, **kwargs):
+            failures.append(credentials)
+        
+        user_login_failed.connect(record)
+        self.addCleanup(user_login_failed.disconnect, record)
+        self.client.post(self.login_url, {'username': 'hasher', 'password': 'wrong'})
+        self.client.post(self.login_url, {'username': 'nobody', 'password': 'testpass123'})
+        self.assertEqual([credentials['username'] for credentials in failures], ['hasher', 'nobody'])
+        self.assertNotIn('testpass123', str(failures))
+        
+        self.user.is_active = False
+        self.user.save()
+        with self.settings(AUTHENTICATION_BACKENDS=[
+            'roadmap.hashing.PooledModelBackend', 'django.contrib.auth.backends.AllowAllUsersModelBackend',
+        ]):
+            response = self.client.post(self.login_url, {'username': 'hasher', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_full_pool_returns_503(self):
+        """Test logins are shed with a 503 while every slot is busy"""
+        from .hashing import hashing_pool
+        
+        with self.settings(ROADMAP_PASSWORD_HASHING={'WORKERS': 1, 'MAX_QUEUE': 0, 'RETRY_AFTER': 2}):
+            self.saturate_pool()
+            rejected = hashing_pool.stats()['rejected']
+            response = self.client.post(self.login_url, {'username': 'hasher', 'password': 'testpass123'})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '2')
+            self.assertIn('error', response.data)
+            self.assertEqual(hashing_pool.stats()['rejected'], rejected + 1)
+            
+            response = self.client.post(self.register_url, {
+                'username': 'newbie', 'password': 'testpassword123', 'password_confirm': 'testpassword123',
+            })
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertFalse(User.objects.filter(username='newbie').exists())
+
+
+class AsyncReadViewTestCase(APITestCase):
+    """Test the async read views return exactly what the sync views return"""
+    
+    def setUp(self):
+        from rest_framework.test import APIRequestFactory
+        
+        response_cache.invalidate()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='asyncuser', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.items = [
+            RoadmapItem.objects.create(title=f"Async search item {i}", description=f"Description {i}",
+                                       status='planning' if i % 2 else 'completed')
+            for i in range(25)
+        ]
+        self.item = self.items[0]
+        root = Comment.objects.create(user=self.user, roadmap_item=self.item, content="Root")
+        reply = Comment.objects.create(user=self.user, roadmap_item=self.item, content="Reply", parent_comment=root)
+        Comment.objects.create(user=self.user, roadmap_item=self.item, content="Nested", parent_comment=reply)
+        Upvote.objects.create(user=self.user, roadmap_item=self.items[3])
+        self.items[3].adjust_counters(upvotes=1)
+    
+    def views(self):
+        from . import async_views, views
+        
+        return [
+            (views.RoadmapItemListView.as_view(), async_views.roadmap_list, '/api/roadmap/', {}),
+            (views.RoadmapItemDetailView.as_view(), async_views.roadmap_detail,
+             f'/api/roadmap/{self.item.pk}/', {'pk': self.item.pk}),
+            (views.RoadmapCommentsView.as_view(), async_views.roadmap_comments,
+             f'/api/roadmap/{self.item.pk}/comments/', {'roadmap_id': self.item.pk}),
+            (views.user_profile, async_views.user_profile, '/api/auth/profile/', {}),
+        ]
+    
+    def call(self, view, path, params=None, authenticated=True, **kwargs):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'} if authenticated else {}
+        extra = {key: kwargs.pop(key) for key in list(kwargs) if key.startswith('HTTP_')}
+        request = self.factory.get(path, params or {}, **headers, **extra)
+        if asyncio.iscoroutinefunction(view):
+            response = async_to_sync(view)(request, **kwargs)
+        else:
+            response = view(request, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+    
+    def assert_same(self, sync_view, async_view, path, kwargs, params=None, authenticated=True, **headers):
+        with self.settings(ROADMAP_RESPONSE_CACHE={'ENABLED': False}):
+            expected = self.call(sync_view, path, params, authenticated, **kwargs, **headers)
+            actual = self.call(async_view, path, params, authenticated, **kwargs, **headers)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        self.assertEqual(actual.get('ETag'), expected.get('ETag'))
+        return actual
+    
+    def test_outputs_match(self):
+        """Test every read endpoint matches for authenticated and anonymous users"""
+        for sync_view, async_view, path, kwargs in self.views():
+            for authenticated in (True, False):
+                with self.subTest(path=path, authenticated=authenticated):
+                    self.assert_same(sync_view, async_view, path, kwargs, authenticated=authenticated)
+    
+    def test_list_filtering_ordering_search_and_paging_match(self):
+        """Test query parameters behave identically on the async list"""
+        sync_view, async_view, path, kwargs = self.views()[0]
+        for params in (
+            {'status': 'planning'},
+            {'sort_by': 'popularity'},
+            {'ordering': 'created_at'},
+            {'search': 'async item', 'highlight': 'true'},
+            {'page': 2},
+            {'page': 9},
+            {'pagination': 'cursor', 'page_size': 7},
+        ):
+            with self.subTest(params=params):
+                self.assert_same(sync_view, async_view, path, kwargs, params)
+        
+        first = self.call(async_view, path, {'pagination': 'cursor', 'page_size': 7})
+        from urllib.parse import parse_qs, urlparse
+        cursor = parse_qs(urlparse(first.data['next']).query)['cursor'][0]
+        self.assert_same(sync_view, async_view, path, kwargs, {'cursor': cursor, 'page_size': 7})
+    
+    def test_missing_item_and_revalidation(self):
+        """Test 404s and 304s match as well"""
+        sync_view, async_view, _, _ = self.views()[1]
+        self.assert_same(sync_view, async_view, '/api/roadmap/999999/', {'pk': 999999})
+        
+        _, _, path, kwargs = self.views()[1]
+        etag = self.call(async_view, path, **kwargs)['ETag']
+        response = self.assert_same(sync_view, async_view, path, kwargs, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_anonymous_response_cache_is_shared(self):
+        """Test the async list stores and serves the same cached responses"""
+        sync_view, async_view, path, kwargs = self.views()[0]
+        miss = self.call(sync_view, path, authenticated=False)
+        hit = self.call(async_view, path, authenticated=False)
+        self.assertEqual(miss['X-Cache'], 'MISS')
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit.content, miss.content)
+    
+    def test_writes_fall_through_to_sync_view(self):
+        """Test POSTing a comment through the async route still works"""
+        from asgiref.sync import async_to_sync
+        from . import async_views
+        
+        request = self.factory.post(
+            f'/api/roadmap/{self.item.pk}/comments/', {'content': 'Via async route'},
+            format='json', HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        response = async_to_sync(async_views.roadmap_comments)(request, roadmap_id=self.item.pk)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Comment.objects.filter(content='Via async route').exists())
+
+
+class UpvoteBufferTestCase(APITestCase):
+    """Test the write-behind upvote buffer and its crash replay"""
+    
+    def setUp(self):
+        import shutil
+        import tempfile
+        from .upvote_buffer import upvote_buffer
+        
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir, True)
+        settings_override = self.settings(ROADMAP_UPVOTE_BUFFER={
+            'ENABLED': True, 'DIRECTORY': self.journal_dir, 'ALIAS': 'default',
+            'FLUSH_INTERVAL': 0, 'FSYNC': False,
+        })
+        settings_override.enable()
+        self.addCleanup(caches['default'].clear)
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(upvote_buffer.reset)
+        
+        self.user = User.objects.create_user(username='voter', password='testpass123')
+        self.other = User.objects.create_user(username='voter2', password='testpass123')
+        self.roadmap_item = RoadmapItem.objects.create(title='Popular', description='Launch day')
+        self.upvote_url = reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.roadmap_item.pk})
+    
+    def toggle(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.upvote_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_toggle_answers_without_writing_upvotes(self):
+        """Test toggles report the resulting state and an estimated count before any flush"""
+        data = self.toggle(self.user)
+        self.assertTrue(data['upvoted'])
+        self.assertTrue(data['pending'])
+        self.assertEqual(data['upvote_count'], 1)
+        self.assertEqual(self.toggle(self.other)['upvote_count'], 2)
+        
+        data = self.toggle(self.user)
+        self.assertFalse(data['upvoted'])
+        self.assertEqual(data['upvote_count'], 1)
+        
+        self.assertFalse(Upvote.objects.exists())
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 0)
+    
+    def test_flush_merges_toggles_per_user_and_item(self):
+        """Test the flusher applies only the last state of each (user, item)"""
+        from .upvote_buffer import upvote_buffer
+        
+        Upvote.objects.create(user=self.other, roadmap_item=self.roadmap_item)
+        self.roadmap_item.adjust_counters(upvotes=1)
+        for _ in range(3):
+            self.toggle(self.user)
+        self.assertFalse(self.toggle(self.other)['upvoted'])
+        
+        summary = upvote_buffer.flush()
+        self.assertEqual(summary, {'segments': 1, 'toggles': 4, 'carried': 0, 'added': 1, 'removed': 1})
+        self.assertEqual(
+            list(Upvote.objects.values_list('user__username', flat=True)), ['voter']
+        )
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 1)
+        self.assertEqual(upvote_buffer.stats()['pending_items'], 0)
+        
+        # Flushed state is what the next toggle starts from
+        self.assertFalse(self.toggle(self.user)['upvoted'])
+    
+    def test_crashed_worker_segments_are_replayed_once(self):
+        """Test journal segments left behind are applied, and replaying them again changes nothing"""
+        import fcntl
+        import os
+        from .upvote_buffer import apply_states, merge_entries, parse_segment
+        
+        item, user, other = self.roadmap_item.pk, self.user.pk, self.other.pk
+        journal = (
+            f'1 {user} {item} 1\n2 {other} {item} 1\n3 {other} {item} 0\n4 {other} {item} 1\n'
+            f'5 {user} 999999 1\n6 {other} {item}'  # deleted item, then a torn write
+        ).encode('ascii')
+        with open(os.path.join(self.journal_dir, '00000000000000000001-4242.journal'), 'wb') as fh:
+            fh.write(journal)
+        # A live worker's segment (opened at 10) stays locked and must be left alone
+        live_path = os.path.join(self.journal_dir, '00000000000000000010-4343.journal')
+        live = open(live_path, 'wb')
+        self.addCleanup(live.close)
+        fcntl.flock(live, fcntl.LOCK_EX)
+        live.write(f'11 {user} {item} 0\n'.encode('ascii'))
+        live.flush()
+        
+        out = StringIO()
+        call_command('flush_upvotes', stdout=out)
+        self.assertIn('Applied 5 toggles from 1 journal segments (2 upvotes added, 0 removed)', out.getvalue())
+        self.assertEqual(Upvote.objects.filter(roadmap_item=self.roadmap_item).count(), 2)
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 2)
+        self.assertTrue(os.path.exists(live_path))
+        
+        # A crash between commit and unlink replays the segment: a no-op
+        self.assertEqual(apply_states(merge_entries(parse_segment(journal))), (0, 0))
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 2)
+        
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+        
+        # Once its writer is gone, the live segment is picked up too
+        live.close()
+        call_command('flush_upvotes', stdout=StringIO())
+        self.assertFalse(Upvote.objects.filter(user=self.user).exists())
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 1)
+    
+    def test_toggles_newer_than_a_live_segment_wait(self):
+        """Test a closed segment's newer toggles are carried over until overlapping segments close"""
+        import fcntl
+        import os
+        from .upvote_buffer import upvote_buffer
+        
+        item, user = self.roadmap_item.pk, self.user.pk
+        # Worker A closed its segment: on at 1, off at 30. Worker B is still
+        # writing a segment opened at 20 that holds an "on" at 25.
+        with open(os.path.join(self.journal_dir, '00000000000000000001-100.journal'), 'wb') as fh:
+            fh.write(f'1 {user} {item} 1\n30 {user} {item} 0\n'.encode('ascii'))
+        live = open(os.path.join(self.journal_dir, '00000000000000000020-200.journal'), 'wb')
+        self.addCleanup(live.close)
+        fcntl.flock(live, fcntl.LOCK_EX)
+        live.write(f'25 {user} {item} 1\n'.encode('ascii'))
+        live.flush()
+        
+        summary = upvote_buffer.flush()
+        self.assertEqual((summary['toggles'], summary['carried']), (1, 1))
+        self.assertTrue(Upvote.objects.filter(user=self.user).exists())
+        
+        live.close()
+        summary = upvote_buffer.flush()
+        self.assertEqual((summary['segments'], summary['toggles']), (2, 2))
+        # The newest state (off at 30) wins over B's older "on"
+        self.assertFalse(Upvote.objects.filter(user=self.user).exists())
+        self.roadmap_item.refresh_from_db()
+        self.assertEqual(self.roadmap_item.upvote_count, 0)
+        self.assertEqual(os.listdir(self.journal_dir).count('flush.lock'), 1)
+        self.assertFalse([name for name in os.listdir(self.journal_dir) if name.endswith('.journal')])
+    
+    def test_background_flush_failures_are_logged_and_counted(self):
+        """Test a failing background flush is logged and shows in the stats, and its segments are kept"""
+        import os
+        from unittest import mock
+        from . import upvote_buffer as buffer_module
+        from .upvote_buffer import upvote_buffer
+        
+        self.toggle(self.user)
+        upvote_buffer.reset()
+        failures = upvote_buffer.stats()['flush_failures']
+        # The test transaction must survive the flusher's connection cleanup
+        with mock.patch.object(upvote_buffer, 'flush', side_effect=RuntimeError('database is locked')), \
+                mock.patch.object(buffer_module, 'close_old_connections'), \
+                mock.patch.object(buffer_module.connections, 'close_all'), \
+                self.assertLogs('roadmap.upvote_buffer', level='ERROR') as logs:
+            upvote_buffer._flush_in_background()
+        self.assertIn('flush failed', logs.output[0])
+        stats = upvote_buffer.stats()
+        self.assertEqual(stats['flush_failures'], failures + 1)
+        self.assertEqual(stats['last_flush_error'], 'RuntimeError: database is locked')
+        self.assertTrue([name for name in os.listdir(self.journal_dir) if name.endswith('.journal')])
+        
+        upvote_buffer.flush()
+        self.assertTrue(Upvote.objects.filter(user=self.user).exists())
+    
+    def test_disabled_by_default(self):
+        """Test toggles write straight to the database when the buffer is off"""
+        with self.settings(ROADMAP_UPVOTE_BUFFER={'ENABLED': False}):
+            data = self.toggle(self.user)
+        self.assertNotIn('pending', data)
+        self.assertTrue(Upvote.objects.filter(user=self.user).exists())
+
+
+class DatabaseProfileTestCase(APITestCase):
+    """Test the SQLite connection profile and read/write routing"""
+    
+    def test_pragmas_applied_on_connect(self):
+        """Test new connections get the busy timeout, cache size and synchronous level"""
+        from django.conf import settings
+        from django.db import connection
+        
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['cache_size'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+    
+    def test_reads_routed_to_read_only_alias_outside_transactions(self):
+        """Test plain reads use the read alias and reads inside a transaction stay on the primary"""
+        from unittest import mock
+        from django.db import connections, router
+        
+        self.assertEqual(router.db_for_write(RoadmapItem), 'default')
+        # Every test runs inside a transaction on default
+        self.assertEqual(router.db_for_read(RoadmapItem), 'default')
+        with mock.patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(RoadmapItem), 'readonly')
+        with self.settings(ROADMAP_READ_DATABASE=None), \
+                mock.patch.object(connections['default'], 'in_atomic_block', False):
+            self.assertEqual(router.db_for_read(RoadmapItem), 'default')
+        self.assertFalse(router.allow_migrate('readonly', 'roadmap'))
+    
+    def test_stress_has_no_lock_errors(self):
+        """Test concurrent upvote writers and list readers never see 'database is locked'"""
+        import json
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'stress.json')
+            call_command(
+                'stress_db', '--profile', 'configured', '--writers', '4', '--readers', '4',
+                '--duration', '1', '--output', output, stdout=StringIO()
+            )
+            with open(output) as fh:
+                result = json.load(fh)['configured']
+        self.assertGreater(result['writes'], 0)
+        self.assertGreater(result['reads'], 0)
+        self.assertEqual(result['write_lock_errors'], 0)
+        self.assertEqual(result['read_lock_errors'], 0)
+        self.assertEqual(result['other_errors'], [])
+        self.assertTrue(result['consistent'])
+
+
+class QueryPlanTestCase(APITestCase):
+    """Test the hot read paths are served from indexes, not table scans or temp sorts"""
+    
+    LIST_FILTERS = ['', 'status=planning', 'category=feature', 'status=planning&category=feature']
+    LIST_ORDERINGS = [
+        '', 'sort_by=popularity', 'sort_by=hot', 'ordering=created_at', 'ordering=-created_at',
+        'ordering=upvote_count_annotated', 'ordering=-upvote_count_annotated', 'ordering=-hot_score',
+    ]
+    
+    def setUp(self):
+        from roadmap.seeding import seed_dataset
+        
+        summary = seed_dataset(items=30, users=10, upvotes_per_item=3, comments_per_item=3, reply_depth=2)
+        self.user = User.objects.get(username=summary['username'])
+        self.item = RoadmapItem.objects.order_by('-comment_count', 'pk').first()
+        self.comment = Comment.objects.filter(roadmap_item=self.item).order_by('-depth', 'pk').first()
+    
+    def hot_paths(self):
+        paths = []
+        for filters in self.LIST_FILTERS:
+            for ordering in self.LIST_ORDERINGS:
+                query = '&'.join(part for part in (filters, ordering) if part)
+                paths.append(f'/api/roadmap/?{query}')
+        paths += [
+            '/api/roadmap/?page=2',
+            '/api/roadmap/?pagination=cursor',
+            '/api/roadmap/?pagination=cursor&sort_by=popularity&status=planning',
+            '/api/roadmap/?pagination=cursor&sort_by=hot&category=feature',
+            '/api/roadmap/?search=feature',
+            f'/api/roadmap/{self.item.pk}/',
+            f'/api/roadmap/{self.item.pk}/comments/',
+            f'/api/roadmap/{self.item.pk}/comments/?pagination=cursor',
+        ]
+        return paths
+    
+    def capture(self, client, path):
+        """The SQL a GET (and, for cursor pages, the following page) runs"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(path)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, path)
+            if 'cursor' in path and response.data.get('next'):
+                self.assertEqual(client.get(response.data['next']).status_code, status.HTTP_200_OK)
+        return [query['sql'] for query in context.captured_queries]
+    
+    def plan_problems(self, sql):
+        from django.db import connection
+        
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            steps = [row[3] for row in cursor.fetchall()]
+        return [
+            step for step in steps
+            if 'TEMP B-TREE' in step
+            or (step.startswith('SCAN ') and ' USING ' not in step and 'VIRTUAL TABLE' not in step)
+        ]
+    
+    def assert_indexed(self, client, paths):
+        problems = {}
+        for path in paths:
+            for sql in self.capture(client, path):
+                if sql.startswith(('SAVEPOINT', 'RELEASE')) or 'sqlite_master' in sql:
+                    continue
+                bad_steps = self.plan_problems(sql)
+                if bad_steps:
+                    problems.setdefault(path, []).append((bad_steps, sql))
+        self.assertEqual(problems, {})
+    
+    def test_anonymous_hot_paths_use_indexes(self):
+        """Test list, detail and comment reads for anonymous users avoid scans and temp sorts"""
+        self.assert_indexed(self.client, self.hot_paths())
+    
+    def test_authenticated_hot_paths_use_indexes(self):
+        """Test authenticated reads (with the user_upvoted subquery) avoid scans and temp sorts"""
+        self.client.force_authenticate(user=self.user)
+        self.assert_indexed(self.client, self.hot_paths() + [f'/api/comments/{self.comment.pk}/'])
+    
+    def test_reply_lookup_uses_parent_index(self):
+        """Test loading a comment's replies in thread order reads the replies index"""
+        from django.db import connection
+        
+        queryset = self.comment.parent_comment.get_replies().order_by('created_at')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            steps = [row[3] for row in cursor.fetchall()]
+        self.assertTrue(any('roadmap_comment_replies_idx' in step for step in steps), steps)
+        self.assertFalse(any('TEMP B-TREE' in step for step in steps), steps)
+
+
+class LiveEventsTestCase(APITestCase):
+    """Test the Server-Sent Events stream and the events published by write paths"""
+    
+    def setUp(self):
+        from .events import event_hub
+        
+        settings_override = self.settings(ROADMAP_LIVE_EVENTS={
+            'POLL_INTERVAL': 0, 'HEARTBEAT': 15, 'MAX_DURATION': 0, 'RETRY': 1000,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        event_hub.reset()
+        self.addCleanup(event_hub.reset)
+        
+        self.user = User.objects.create_user(username='watcher', password='testpass123')
+        self.roadmap_item = RoadmapItem.objects.create(title='Live', description='Pushed to clients')
+        self.other_item = RoadmapItem.objects.create(title='Other', description='Also pushed')
+        self.client.force_authenticate(user=self.user)
+    
+    def stream(self, query='', **extra):
+        """(id, event, data) for every event frame of one stream"""
+        import json
+        
+        response = self.client.get(reverse('roadmap:live_events') + query, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = []
+        for block in b''.join(response.streaming_content).decode().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+            if 'event' in fields:
+                events.append((int(fields.get('id', 0)), fields['event'], json.loads(fields['data'])))
+        return events
+    
+    def test_write_paths_publish_events(self):
+        """Test upvotes and comment create, update and delete each record an event with fresh counters"""
+        from .models import LiveEvent
+        
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.roadmap_item.pk}))
+        comments_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk})
+        self.client.post(comments_url, {'content': 'First'})
+        parent = Comment.objects.get()
+        self.client.post(comments_url, {'content': 'Reply', 'parent_comment': parent.pk})
+        reply = Comment.objects.exclude(pk=parent.pk).get()
+        detail_url = reverse('roadmap:comment_detail', kwargs={'pk': parent.pk})
+        self.client.patch(detail_url, {'content': 'Edited'})
+        self.client.delete(detail_url)
+        
+        events = list(LiveEvent.objects.order_by('pk').values_list(
+            'kind', 'roadmap_item_id', 'upvote_count', 'comment_count', 'comment_ids'
+        ))
+        item_id = self.roadmap_item.pk
+        self.assertEqual(events, [
+            ('upvote', item_id, 1, 0, []),
+            ('comment_created', item_id, 1, 1, [parent.pk]),
+            ('comment_created', item_id, 1, 2, [reply.pk]),
+            ('comment_updated', item_id, 1, 2, [parent.pk]),
+            ('comment_deleted', item_id, 1, 0, [parent.pk, reply.pk]),
+        ])
+    
+    def test_stream_resumes_after_last_event_id(self):
+        """Test a reconnecting client receives only later events, optionally for one item"""
+        from .events import publish
+        
+        first = publish('upvote', self.roadmap_item)
+        second = publish('upvote', self.other_item)
+        third = publish('comment_created', self.roadmap_item, [7])
+        
+        self.assertEqual([event[0] for event in self.stream(HTTP_LAST_EVENT_ID=str(first.pk))], [second.pk, third.pk])
+        self.assertEqual(
+            self.stream(f'?item={self.roadmap_item.pk}&last_event_id=0'),
+            [
+                (first.pk, 'upvote', {'item': self.roadmap_item.pk, 'upvote_count': 0,
+                                      'comments_count': 0, 'comment_ids': []}),
+                (third.pk, 'comment_created', {'item': self.roadmap_item.pk, 'upvote_count': 0,
+                                               'comments_count': 0, 'comment_ids': [7]}),
+            ]
+        )
+        # A fresh connection starts at the newest event
+        self.assertEqual(self.stream(), [])
+        response = self.client.get(reverse('roadmap:live_events') + '?item=latest')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_hub_fans_out_to_every_subscriber(self):
+        """Test one poll of the event table wakes every subscriber with the same frames"""
+        from .events import event_hub, publish
+        
+        subscriptions = [event_hub.subscribe() for _ in range(2)]
+        for subscription, _ in subscriptions:
+            self.addCleanup(event_hub.unsubscribe, subscription)
+        head = subscriptions[0][1]
+        self.assertEqual(event_hub.events_after(head), [])
+        
+        event = publish('upvote', self.roadmap_item)
+        self.assertEqual(event_hub.poll(), 1)
+        for subscription, _ in subscriptions:
+            self.assertTrue(subscription.wait(0))
+        (event_id, item_id, frame), = event_hub.events_after(head)
+        self.assertEqual((event_id, item_id), (event.pk, self.roadmap_item.pk))
+        self.assertIn(f'id: {event.pk}\nevent: upvote\n'.encode(), frame)
+        self.assertEqual(event_hub.stats()['subscribers'], 2)
+    
+    def test_resume_past_retention_sends_reset(self):
+        """Test a client whose missed events were pruned is told to refetch"""
+        from .events import publish
+        
+        with self.settings(ROADMAP_LIVE_EVENTS={'POLL_INTERVAL': 0, 'MAX_DURATION': 0,
+                                                'RETENTION': 2, 'PRUNE_EVERY': 1}):
+            events = [publish('upvote', self.roadmap_item) for _ in range(5)]
+            self.assertEqual(
+                [kind for _, kind, _ in self.stream(HTTP_LAST_EVENT_ID=str(events[0].pk))], ['reset']
+            )
+            self.assertEqual(
+                [event_id for event_id, _, _ in self.stream(HTTP_LAST_EVENT_ID=str(events[2].pk))],
+                [events[3].pk, events[4].pk]
+            )
+    
+    def test_sync_streams_are_capped_per_worker(self):
+        """Test WSGI streams beyond MAX_SYNC_STREAMS get a 503 until a held one is closed"""
+        from .events import event_hub
+        
+        url = reverse('roadmap:live_events')
+        with self.settings(ROADMAP_LIVE_EVENTS={'POLL_INTERVAL': 0, 'MAX_DURATION': 0,
+                                                'RETRY': 2000, 'MAX_SYNC_STREAMS': 1}):
+            held = self.client.get(url)
+            self.assertEqual(held.status_code, status.HTTP_200_OK)
+            refused = self.client.get(url)
+            self.assertEqual(refused.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(refused['Retry-After'], '2')
+            self.assertEqual(event_hub.stats()['sync_streams'], 1)
+            
+            # Closing frees the slot, even though the stream was never read
+            held.close()
+            self.assertEqual(event_hub.stats()['sync_streams'], 0)
+            self.assertEqual(self.stream(), [])
+            self.assertEqual(event_hub.stats()['sync_streams'], 0)
+        self.assertEqual(event_hub.stats()['rejected'], 1)
+    
+    def test_async_stream_matches_sync_stream(self):
+        """Test the ASGI stream yields the same frames as the WSGI one"""
+        from asgiref.sync import async_to_sync
+        from .events import EventStream, publish
+        
+        publish('upvote', self.roadmap_item)
+        publish('comment_deleted', self.other_item, [3, 4])
+        
+        async def collect(stream):
+            return [frame async for frame in stream.aframes()]
+        
+        stream = EventStream(item_id=self.other_item.pk, last_event_id=0)
+        sync_frames = list(stream.frames())
+        self.assertEqual(async_to_sync(collect)(stream), sync_frames)
+        self.assertIn(b'event: comment_deleted', b''.join(sync_frames))
+        self.assertNotIn(b'event: upvote', b''.join(sync_frames))
+
+
+class BatchRequestTestCase(APITestCase):
+    """Test the batch endpoint dispatches GET sub-requests in-process"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='batcher', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.roadmap_item = RoadmapItem.objects.create(title='Batched', description='One round trip')
+        Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content='Hello')
+        self.batch_url = reverse('roadmap:batch')
+    
+    def batch(self, requests, authenticated=True):
+        import json
+        
+        if authenticated:
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = self.client.post(self.batch_url, {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)['responses']
+    
+    def test_results_match_standalone_requests(self):
+        """Test each sub-response carries the same status and body as calling the route directly"""
+        import json
+        
+        paths = [
+            reverse('roadmap:user_profile'),
+            reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk}),
+            reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk}) + '?pagination=cursor',
+        ]
+        responses = self.batch([paths[0], {'id': 'item', 'path': paths[1]}, paths[2]])
+        self.assertEqual([part['id'] for part in responses], [0, 'item', 2])
+        for path, part in zip(paths, responses):
+            standalone = self.client.get(path)
+            self.assertEqual(part['status'], standalone.status_code)
+            self.assertEqual(part['body'], json.loads(standalone.content))
+        self.assertIn('ETag', responses[1]['headers'])
+    
+    def test_sub_requests_keep_their_permissions(self):
+        """Test an anonymous batch gets 401 for the profile but still reads public routes"""
+        responses = self.batch([reverse('roadmap:user_profile'), reverse('roadmap:roadmap_list')], authenticated=False)
+        self.assertEqual([part['status'] for part in responses], [401, 200])
+        self.assertEqual(responses[1]['body']['count'], 1)
+    
+    def test_authenticates_once(self):
+        """Test the token is resolved by the batch request only, not by every sub-request"""
+        from unittest import mock
+        from .authentication import CachedTokenAuthentication
+        
+        with mock.patch.object(
+            CachedTokenAuthentication, 'authenticate', autospec=True,
+            side_effect=CachedTokenAuthentication.authenticate
+        ) as authenticate:
+            responses = self.batch([reverse('roadmap:user_profile')] * 3)
+        self.assertEqual([part['body']['username'] for part in responses], ['batcher'] * 3)
+        self.assertEqual(authenticate.call_count, 1)
+    
+    def test_rejected_sub_requests(self):
+        """Test unknown, non-GET, streaming and foreign routes fail individually"""
+        responses = self.batch([
+            '/api/unknown/',
+            {'path': reverse('roadmap:roadmap_list'), 'method': 'POST'},
+            reverse('roadmap:live_events'),
+            self.batch_url,
+            '/admin/',
+            'https://example.com/api/roadmap/',
+            '/api/metrics',
+            reverse('roadmap:cache_stats'),
+            reverse('roadmap:roadmap_list'),
+        ])
+        self.assertEqual([part['status'] for part in responses], [404, 405, 400, 400, 400, 400, 400, 400, 200])
+    
+    def test_failing_sub_request_is_a_500_entry(self):
+        """Test a view that raises fails its own entry and the rest of the batch still runs"""
+        from unittest import mock
+        from . import views
+        
+        with mock.patch.object(views.RoadmapStatsView, 'retrieve', side_effect=RuntimeError('boom')), \
+                self.assertLogs('roadmap.batch', 'ERROR'):
+            responses = self.batch([reverse('roadmap:roadmap_stats'), reverse('roadmap:roadmap_list')])
+        self.assertEqual([part['status'] for part in responses], [500, 200])
+        self.assertEqual(responses[0]['body'], {'error': 'Internal server error'})
+    
+    def test_request_count_limit(self):
+        """Test oversized, empty and malformed batches are refused outright"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        for payload in (
+            {'requests': [reverse('roadmap:roadmap_list')] * 11},
+            {'requests': []},
+            {'requests': [{'id': 1}]},
+            {},
+        ):
+            response = self.client.post(self.batch_url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(ROADMAP_BATCH={'MAX_REQUESTS': 2}):
+            response = self.client.post(self.batch_url, {'requests': ['/api/roadmap/'] * 3}, format='json')
+            self.assertIn('at most 2', response.data['error'])
+
+
+class SparseFieldsetTestCase(APITestCase):
+    """Test fields= / omit= trim both the payload and the queries behind it"""
+    
+    def setUp(self):
+        response_cache.invalidate()
+        self.user = User.objects.create_user(username='sparse', password='testpass123')
+        self.roadmap_item = RoadmapItem.objects.create(title='Sidebar', description='Long text ' * 50)
+        RoadmapItem.objects.create(title='Second', description='More text', status='completed')
+        root = Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content='Root')
+        Comment.objects.create(user=self.user, roadmap_item=self.roadmap_item, content='Reply', parent_comment=root)
+        Upvote.objects.create(user=self.user, roadmap_item=self.roadmap_item)
+        self.roadmap_item.adjust_counters(upvotes=1, comments=2)
+        self.client.force_authenticate(user=self.user)
+    
+    def get_with_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ' '.join(query['sql'] for query in context.captured_queries)
+    
+    def test_selected_fields_match_full_representation(self):
+        """Test requested fields keep exactly their full-response values, on both serializer paths"""
+        urls = [
+            (reverse('roadmap:roadmap_list'), 'id,title,status,upvote_count,user_upvoted'),
+            (reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk}), 'id,comments,comments_count'),
+            (reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk}),
+             'id,user,can_edit,is_reply'),
+        ]
+        for fast in (False, True):
+            with self.settings(ROADMAP_FAST_SERIALIZATION=fast):
+                for url, fields in urls:
+                    full = self.client.get(url).data
+                    sparse = self.client.get(f'{url}?fields={fields}').data
+                    full_rows = full['results'] if 'results' in full else [full]
+                    sparse_rows = sparse['results'] if 'results' in sparse else [sparse]
+                    names = fields.split(',')
+                    self.assertEqual(
+                        sparse_rows, [{name: row[name] for name in names} for row in full_rows]
+                    )
+    
+    def test_list_skips_description_and_upvote_lookup(self):
+        """Test unrequested columns and the user_upvoted subquery are left out of the SQL"""
+        response, sql = self.get_with_queries(
+            reverse('roadmap:roadmap_list') + '?fields=id,title,status,upvote_count&sort_by=popularity'
+        )
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'status', 'upvote_count'})
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('roadmap_upvote', sql)
+        
+        response, sql = self.get_with_queries(reverse('roadmap:roadmap_list') + '?omit=description')
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertNotIn('"description"', sql)
+        self.assertIn('roadmap_upvote', sql)
+        self.assertTrue(response.data['results'][-1]['user_upvoted'])
+    
+    def test_detail_and_comments_skip_unrequested_queries(self):
+        """Test the comment thread and the author join only run when those fields are asked for"""
+        detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk})
+        response, sql = self.get_with_queries(detail_url + '?omit=comments,description')
+        self.assertNotIn('comments', response.data)
+        self.assertNotIn('roadmap_comment', sql)
+        self.assertNotIn('"description"', sql)
+        
+        comments_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk})
+        response, sql = self.get_with_queries(comments_url + '?fields=id,content,can_edit&pagination=cursor')
+        self.assertEqual(response.data['results'][0], {'id': response.data['results'][0]['id'],
+                                                       'content': 'Root', 'can_edit': True})
+        self.assertNotIn('auth_user', sql)
+    
+    def test_unknown_fields_are_rejected(self):
+        """Test unknown field names get a 400 listing the available ones"""
+        response = self.client.get(reverse('roadmap:roadmap_list') + '?fields=id,secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', str(response.data['fields']))
+        response = self.client.get(
+            reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.roadmap_item.pk}) + '?omit=replies'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_blank_field_lists_return_full_rows(self):
+        """Test ?fields= and ?omit= with no names behave like the plain request"""
+        list_url = reverse('roadmap:roadmap_list')
+        detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk})
+        for url in (list_url, detail_url):
+            full = self.client.get(url).data
+            for query in ('?fields=', '?omit=', '?fields=,'):
+                with self.subTest(url=url, query=query):
+                    self.assertEqual(self.client.get(url + query).data, full)
+    
+    def test_blank_field_list_does_not_share_the_plain_cache_entry(self):
+        """Test a blank parameter is part of the cache key, not dropped from it"""
+        from .cache import normalized_query
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        
+        factory = APIRequestFactory()
+        self.assertEqual(normalized_query(Request(factory.get('/', {'fields': ''}))), 'fields=')
+        self.assertEqual(normalized_query(Request(factory.get('/'))), '')
+        
+        self.client.force_authenticate(user=None)
+        list_url = reverse('roadmap:roadmap_list')
+        detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.roadmap_item.pk})
+        for url in (list_url, detail_url):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url + '?fields=')['X-Cache'], 'MISS')
+                plain = self.client.get(url)
+                self.assertEqual(plain['X-Cache'], 'MISS')
+                self.assertIn('title', plain.data['results'][0] if url == list_url else plain.data)
+
+
+class UpvoteSetCacheTestCase(APITestCase):
+    """Test the my-upvotes endpoint and the per-user upvote set behind user_upvoted"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='voter', password='testpass123')
+        self.items = [RoadmapItem.objects.create(title=f'Item {i}', description='Text') for i in range(3)]
+        upvote_sets.evict(self.user.pk)
+        self.client.force_authenticate(user=self.user)
+        self.upvoted_url = reverse('roadmap:my_upvotes')
+    
+    def toggle(self, item):
+        response = self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': item.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_my_upvotes_lists_upvoted_item_ids(self):
+        """Test the endpoint returns the user's upvoted ids and requires authentication"""
+        self.toggle(self.items[2])
+        self.toggle(self.items[0])
+        Upvote.objects.create(user=User.objects.create_user(username='other'), roadmap_item=self.items[1])
+        response = self.client.get(self.upvoted_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'item_ids': [self.items[0].pk, self.items[2].pk]})
+        
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.upvoted_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_toggles_evict_the_cached_set(self):
+        """Test a toggle after the set is cached makes the next read reload it once"""
+        self.toggle(self.items[0])
+        self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [self.items[0].pk])
+        self.toggle(self.items[1])
+        self.toggle(self.items[0])
+        with self.assertNumQueries(1):
+            response = self.client.get(self.upvoted_url)
+        self.assertEqual(response.data['item_ids'], [self.items[1].pk])
+        with self.assertNumQueries(0):
+            self.client.get(self.upvoted_url)
+        
+        # Deletes that cascade from the item reach the set through signals too
+        self.items[1].delete()
+        self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [])
+    
+    def test_list_and_detail_flags_come_from_the_set(self):
+        """Test user_upvoted is read from the cached set instead of an Upvote subquery"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        self.toggle(self.items[1])
+        self.client.get(self.upvoted_url)
+        list_url = reverse('roadmap:roadmap_list')
+        detail_url = reverse('roadmap:roadmap_detail', kwargs={'pk': self.items[1].pk})
+        for fast in (False, True):
+            with self.settings(ROADMAP_FAST_SERIALIZATION=fast):
+                with CaptureQueriesContext(connection) as context:
+                    rows = self.client.get(list_url).data['results']
+                    detail = self.client.get(detail_url).data
+                self.assertEqual({row['id']: row['user_upvoted'] for row in rows},
+                                 {item.pk: item == self.items[1] for item in self.items})
+                self.assertTrue(detail['user_upvoted'])
+                self.assertNotIn('roadmap_upvote', ' '.join(query['sql'] for query in context.captured_queries))
+        
+        with self.settings(ROADMAP_UPVOTE_SET_CACHE={'ENABLED': False}):
+            rows = self.client.get(list_url).data['results']
+            self.assertEqual([row['id'] for row in rows if row['user_upvoted']], [self.items[1].pk])
+            self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [self.items[1].pk])
+    
+    def test_set_loaded_before_a_write_committed_is_not_served(self):
+        """Test a reader that cached the pre-commit set in between is invalidated by the commit"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.toggle(self.items[0])
+        # Another worker reads the set before the toggle commits
+        stale = (upvote_sets.owner(self.user), frozenset())
+        upvote_sets.cache.set(upvote_sets.key(self.user.pk), stale)
+        self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [])
+        
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [self.items[0].pk])
+    
+    def test_set_cached_for_a_previous_owner_of_the_id_is_ignored(self):
+        """Test an entry written for a deleted user is not served to a new user with the same id"""
+        upvote_sets.cache.set(upvote_sets.key(self.user.pk), (0.0, frozenset([self.items[0].pk])))
+        self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [])
+        self.toggle(self.items[2])
+        self.assertEqual(self.client.get(self.upvoted_url).data['item_ids'], [self.items[2].pk])
+
+
+class HotRankingTestCase(APITestCase):
+    """Test the stored time-decayed score behind sort_by=hot"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='ranker', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('roadmap:roadmap_list')
+    
+    def make_item(self, title, days_old=0, upvotes=0, comments=0):
+        import datetime
+        from django.utils import timezone
+        
+        item = RoadmapItem.objects.create(title=title, description='Text')
+        RoadmapItem.objects.filter(pk=item.pk).update(
+            created_at=timezone.now() - datetime.timedelta(days=days_old),
+            upvote_count=upvotes, comment_count=comments,
+        )
+        return item
+    
+    def expected_score(self, item):
+        import math
+        from .ranking import EPOCH
+        
+        item.refresh_from_db()
+        engagement = 1 + item.upvote_count + 2 * item.comment_count
+        return math.log2(engagement) + (item.created_at.timestamp() - EPOCH) / (7 * 24 * 3600)
+    
+    def hot_ids(self, query=''):
+        response = self.client.get(f'{self.list_url}?sort_by=hot{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+    
+    def test_score_follows_upvotes_and_comments(self):
+        """Test creating, upvoting and commenting each keep the stored score current"""
+        item = RoadmapItem.objects.create(title='Fresh', description='Text')
+        self.assertAlmostEqual(item.hot_score, self.expected_score(item), places=6)
+        
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': item.pk}))
+        self.client.post(
+            reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': item.pk}), {'content': 'Agreed'}
+        )
+        item.refresh_from_db()
+        self.assertEqual((item.upvote_count, item.comment_count), (1, 1))
+        self.assertAlmostEqual(item.hot_score, self.expected_score(item), places=6)
+        
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': item.pk}))
+        item.refresh_from_db()
+        self.assertAlmostEqual(item.hot_score, self.expected_score(item), places=6)
+    
+    def test_hot_sort_decays_with_age(self):
+        """Test older items need proportionally more engagement to stay ahead"""
+        stale = self.make_item('Stale favourite', days_old=28, upvotes=10)
+        fresh = self.make_item('Fresh', upvotes=1)
+        # Two half-lives old, so its weight of 1 + 100 + 2 * 2 counts as about 26, against 2
+        strong = self.make_item('Still hot', days_old=14, upvotes=100, comments=2)
+        call_command('rescore_hot', stdout=StringIO())
+        self.assertEqual(self.hot_ids(), [strong.pk, fresh.pk, stale.pk])
+        self.assertEqual(self.hot_ids('&pagination=cursor&page_size=1')[:1], [strong.pk])
+        # The all-time sort is unchanged
+        response = self.client.get(f'{self.list_url}?sort_by=popularity')
+        self.assertEqual([row['id'] for row in response.data['results']], [strong.pk, stale.pk, fresh.pk])
+    
+    def test_rescore_hot_repairs_bulk_written_scores(self):
+        """Test rescore_hot reports and fixes scores that bypassed the write paths"""
+        items = [self.make_item(f'Item {i}', days_old=i, upvotes=i) for i in range(3)]
+        out = StringIO()
+        call_command('rescore_hot', '--dry-run', stdout=out)
+        self.assertIn('3 of 3', out.getvalue())
+        
+        call_command('rescore_hot', stdout=StringIO())
+        for item in items:
+            item.refresh_from_db()
+            self.assertAlmostEqual(item.hot_score, self.expected_score(item), places=6)
+        out = StringIO()
+        call_command('rescore_hot', stdout=out)
+        self.assertIn('Rescored 0 of 3', out.getvalue())
+    
+    def test_reconcile_counters_rescores_repaired_items(self):
+        """Test repaired counters carry a recomputed score"""
+        item = RoadmapItem.objects.create(title='Drifted', description='Text')
+        Upvote.objects.bulk_create([Upvote(user=self.user, roadmap_item=item)])
+        call_command('reconcile_counters', stdout=StringIO())
+        item.refresh_from_db()
+        self.assertEqual(item.upvote_count, 1)
+        self.assertAlmostEqual(item.hot_score, self.expected_score(item), places=6)
+
+
+class RoadmapStatsTestCase(APITestCase):
+    """Test the trigger-maintained stats summary and the list's facet counts"""
+    
+    def setUp(self):
+        response_cache.invalidate()
+        self.user = User.objects.create_user(username='counter', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.dark_mode = RoadmapItem.objects.create(title='Dark mode', description='Theme', category='feature')
+        self.export = RoadmapItem.objects.create(
+            title='Export to CSV', description='Data export', status='in_progress', category='feature'
+        )
+        self.crash = RoadmapItem.objects.create(title='Fix crash', description='On export', category='bug_fix')
+        self.stats_url = reverse('roadmap:roadmap_stats')
+    
+    def assert_stats_match_items(self):
+        from django.db.models import Sum
+        
+        stats = self.client.get(self.stats_url).data
+        totals = RoadmapItem.objects.aggregate(upvotes=Sum('upvote_count'), comments=Sum('comment_count'))
+        self.assertEqual(
+            (stats['items'], stats['upvotes'], stats['comments']),
+            (RoadmapItem.objects.count(), totals['upvotes'] or 0, totals['comments'] or 0),
+        )
+        for name in ('status', 'category'):
+            for value, counts in stats[name].items():
+                items = RoadmapItem.objects.filter(**{name: value})
+                self.assertEqual(counts, {
+                    'items': items.count(),
+                    'upvotes': Upvote.objects.filter(roadmap_item__in=items).count(),
+                    'comments': Comment.objects.filter(roadmap_item__in=items).count(),
+                }, f'{name}={value}')
+        return stats
+    
+    def test_stats_follow_item_upvote_and_comment_changes(self):
+        """Test the summary tracks saves, toggles, comments and deletes"""
+        stats = self.assert_stats_match_items()
+        self.assertEqual(stats['status']['planning']['items'], 2)
+        self.assertEqual(stats['status']['cancelled'], {'items': 0, 'upvotes': 0, 'comments': 0})
+        
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.export.pk}))
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.crash.pk}))
+        self.client.post(reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.crash.pk}))
+        comments_url = reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.export.pk})
+        self.client.post(comments_url, {'content': 'When?'})
+        root = Comment.objects.get(content='When?').pk
+        self.client.post(comments_url, {'content': 'Soon', 'parent_comment': root})
+        stats = self.assert_stats_match_items()
+        self.assertEqual((stats['upvotes'], stats['comments']), (1, 2))
+        
+        self.export.status = 'completed'
+        self.export.save()
+        self.assertEqual(self.assert_stats_match_items()['status']['completed']['comments'], 2)
+        self.client.delete(reverse('roadmap:comment_detail', kwargs={'pk': root}))
+        self.dark_mode.delete()
+        self.assertEqual(self.assert_stats_match_items()['items'], 2)
+    
+    def test_stats_cost_does_not_grow_with_upvotes(self):
+        """Test the stats read only the summary rows, however many upvotes exist"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        def stats_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.stats_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [query['sql'] for query in context.captured_queries]
+        
+        small = stats_queries()
+        voters = User.objects.bulk_create([User(username=f'voter{i}') for i in range(200)])
+        Upvote.objects.bulk_create([
+            Upvote(user=voter, roadmap_item=item) for voter in voters for item in (self.dark_mode, self.export)
+        ])
+        call_command('reconcile_counters', stdout=StringIO())
+        large = stats_queries()
+        self.assertEqual(len(small), len(large))
+        self.assertFalse([sql for sql in large if 'roadmap_upvote' in sql or 'roadmap_roadmapitem' in sql])
+        self.assertEqual(self.assert_stats_match_items()['upvotes'], 400)
+    
+    def test_list_facets_count_the_filtered_results(self):
+        """Test ?facets=true adds per-status and per-category counts for the current search and filters"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        list_url = reverse('roadmap:roadmap_list')
+        self.assertNotIn('facets', self.client.get(list_url).data)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(list_url, {'facets': 'true', 'search': 'export'})
+        self.assertEqual(response.data['facets'], {
+            'status': {'in_progress': 1, 'planning': 1},
+            'category': {'feature': 1, 'bug_fix': 1},
+        })
+        self.assertEqual(len([sql for sql in (q['sql'] for q in context.captured_queries) if 'GROUP BY' in sql]), 1)
+        
+        response = self.client.get(list_url, {'facets': 'true', 'category': 'feature', 'pagination': 'cursor'})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['facets'], {
+            'status': {'in_progress': 1, 'planning': 1}, 'category': {'feature': 2},
+        })
+    
+    def test_reconcile_counters_rebuilds_a_drifted_summary(self):
+        """Test a summary left stale (e.g. by missing triggers) is rebuilt"""
+        from .models import RoadmapSummary
+        
+        RoadmapSummary.objects.filter(dimension='status').update(items=0)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('summary has drifted', out.getvalue())
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Rebuilt the roadmap stats summary', out.getvalue())
+        self.assert_stats_match_items()
+
+
+class RequestTimingTestCase(APITestCase):
+    """Test the Server-Timing header, the timing log line and the per-route histograms"""
+    
+    def setUp(self):
+        from .timing import timing_registry
+        
+        response_cache.invalidate()
+        token_cache.clear()
+        timing_registry.reset()
+        self.user = User.objects.create_user(username='timer', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        RoadmapItem.objects.create(title='Dark mode', description='Theme', category='feature')
+        self.list_url = reverse('roadmap:roadmap_list')
+    
+    def server_timing(self, response):
+        """{metric: (duration_ms, desc)} parsed from the Server-Timing header"""
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            params = dict(param.split('=', 1) for param in params)
+            metrics[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+        return metrics
+    
+    def test_server_timing_header_breaks_down_the_request(self):
+        """Test the header reports the request's queries and each component's time"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = self.server_timing(response)
+        self.assertEqual(set(metrics), {'db', 'auth', 'serialize', 'render', 'total'})
+        self.assertEqual(metrics['db'][1], f'{len(context.captured_queries)} queries')
+        self.assertGreater(metrics['auth'][0], 0)
+        self.assertGreater(metrics['serialize'][0], 0)
+        self.assertGreater(metrics['render'][0], 0)
+        parts = metrics['db'][0] + metrics['auth'][0] + metrics['serialize'][0] + metrics['render'][0]
+        self.assertLessEqual(parts, metrics['total'][0] + 0.05)
+    
+    def test_each_request_logs_one_json_line(self):
+        """Test the log line carries the route, status and the same breakdown"""
+        import json
+        
+        with self.assertLogs('roadmap.timing', level='INFO') as logs:
+            self.client.get(reverse('roadmap:roadmap_detail', kwargs={'pk': RoadmapItem.objects.get().pk}))
+            self.client.get(reverse('roadmap:roadmap_detail', kwargs={'pk': 0}))
+        lines = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([line['route'] for line in lines], ['GET roadmap:roadmap_detail'] * 2)
+        self.assertEqual([line['status'] for line in lines], [200, 404])
+        self.assertGreater(lines[0]['queries'], 0)
+        self.assertEqual(
+            set(lines[0]), {'event', 'route', 'path', 'status', 'total_ms', 'queries', 'db_ms', 'auth_ms', 'serialize_ms', 'render_ms'}
+        )
+        
+        with self.settings(ROADMAP_REQUEST_TIMING={'SLOW_MS': 0}):
+            with self.assertLogs('roadmap.timing', level='WARNING'):
+                self.client.get(self.list_url)
+    
+    def test_timing_stats_endpoint_is_staff_only(self):
+        """Test the per-route histograms are readable by staff"""
+        url = reverse('roadmap:timing_stats')
+        for _ in range(3):
+            self.client.get(self.list_url)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        route = response.data['routes']['GET roadmap:roadmap_list']
+        self.assertEqual(route['requests'], 3)
+        self.assertEqual(sum(route['buckets'].values()), 3)
+        self.assertIn('db_ms', route['mean'])
+    
+    def test_rolling_histogram_percentiles_and_expiry(self):
+        """Test percentiles come from the bucket bounds and old slots age out"""
+        from .timing import RollingHistogram
+        
+        histogram = RollingHistogram(buckets=(10, 100), window=60, slot=10)
+        record = {'queries': 1, 'db_ms': 1.0, 'auth_ms': 0.0, 'serialize_ms': 0.0, 'render_ms': 0.0}
+        for total in [5] * 90 + [50] * 9 + [500]:
+            histogram.record(dict(record, total_ms=total), now=1000)
+        snapshot = histogram.snapshot(now=1000)
+        self.assertEqual(snapshot['buckets'], {'le_10': 90, 'le_100': 9, 'inf': 1})
+        self.assertEqual((snapshot['p50_ms'], snapshot['p95_ms'], snapshot['p99_ms']), (10, 100, 100))
+        self.assertEqual(snapshot['mean']['queries'], 1)
+        
+        histogram.record(dict(record, total_ms=500), now=1055)
+        self.assertEqual(histogram.snapshot(now=1055)['requests'], 101)
+        self.assertEqual(histogram.snapshot(now=1065)['buckets'], {'le_10': 0, 'le_100': 0, 'inf': 1})
+        self.assertIsNone(histogram.snapshot(now=1200))
+
+
+class PrometheusMetricsTestCase(APITestCase):
+    """Test the Prometheus endpoint's access, request and write metrics, and cross-process totals"""
+    
+    def setUp(self):
+        response_cache.invalidate()
+        self.user = User.objects.create_user(username='scraper', password='testpass123')
+        self.item = RoadmapItem.objects.create(title='Dark mode', description='Theme', category='feature')
+        self.url = reverse('roadmap:metrics')
+    
+    def scrape(self, **headers):
+        """{series: value} from the endpoint, scraping as staff unless headers are given"""
+        if not headers:
+            self.client.force_login(User.objects.create_user(username=f'staff{User.objects.count()}', is_staff=True))
+        response = self.client.get(self.url, **headers)
+        self.client.logout()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = [line for line in response.content.decode().splitlines() if not line.startswith('#')]
+        return {series: float(value) for series, value in (line.rsplit(' ', 1) for line in lines)}
+    
+    def test_scrapes_need_the_token_or_a_staff_session(self):
+        """Test anonymous scrapes are refused and the bearer token is accepted"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, status.HTTP_403_FORBIDDEN)
+        with self.settings(ROADMAP_METRICS={'TOKEN': 's3cret'}):
+            self.assertEqual(
+                self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong').status_code, status.HTTP_403_FORBIDDEN
+            )
+            metrics = self.scrape(HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertIn('roadmap_cache_requests_total{cache="response",result="hit"}', metrics)
+    
+    def test_requests_are_counted_by_route_status_and_latency(self):
+        """Test request counts, the latency histogram and the query counters move per request"""
+        series = '{method="GET",route="roadmap:roadmap_detail"'
+        before = self.scrape()
+        self.client.get(reverse('roadmap:roadmap_detail', kwargs={'pk': self.item.pk}))
+        self.client.get(reverse('roadmap:roadmap_detail', kwargs={'pk': self.item.pk}))
+        self.client.get(reverse('roadmap:roadmap_detail', kwargs={'pk': 0}))
+        after = self.scrape()
+        
+        def delta(name):
+            return after.get(name, 0) - before.get(name, 0)
+        
+        self.assertEqual(delta(f'roadmap_http_requests_total{series},status="200"}}'), 2)
+        self.assertEqual(delta(f'roadmap_http_requests_total{series},status="404"}}'), 1)
+        self.assertEqual(delta(f'roadmap_http_request_duration_seconds_count{series}}}'), 3)
+        self.assertEqual(delta('roadmap_http_request_duration_seconds_bucket{le="+Inf",' + series[1:] + '}'), 3)
+        self.assertGreater(delta(f'roadmap_http_request_duration_seconds_sum{series}}}'), 0)
+        self.assertGreaterEqual(delta(f'roadmap_db_queries_total{series}}}'), 3)
+        buckets = [
+            value for name, value in after.items()
+            if name.startswith('roadmap_http_request_duration_seconds_bucket') and series[1:] in name
+        ]
+        self.assertEqual(buckets, sorted(buckets))
+    
+    def test_first_request_of_a_route_writes_every_bucket(self):
+        """Test a slow first request still exposes the lower buckets, at 0"""
+        from types import SimpleNamespace
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .metrics import MetricsStore, render
+        
+        store = MetricsStore()
+        with self.settings(ROADMAP_METRICS={'BUCKETS': (0.1, 1.0)}):
+            slow = SimpleNamespace(total=2.0, queries=0, sql=0.0)
+            store.observe_request(RequestFactory().get('/'), HttpResponse(), slow)
+            text = render(store.local())
+        series = 'method="GET",route="unmatched"'
+        for bound, count in (('0.1', 0), ('1.0', 0), ('+Inf', 1)):
+            self.assertIn(f'roadmap_http_request_duration_seconds_bucket{{le="{bound}",{series}}} {count}.0', text)
+    
+    def test_upvote_and_comment_writes_are_counted(self):
+        """Test toggles and comment creates and deletes feed the write counters"""
+        before = self.scrape()
+        self.client.force_authenticate(user=self.user)
+        toggle_url = reverse('roadmap:toggle_upvote', kwargs={'roadmap_id': self.item.pk})
+        # Writes are counted on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(toggle_url)
+            self.client.post(toggle_url)
+            self.client.post(toggle_url)
+            self.client.post(reverse('roadmap:roadmap_comments', kwargs={'roadmap_id': self.item.pk}), {'content': 'Yes'})
+            self.client.delete(reverse('roadmap:comment_detail', kwargs={'pk': Comment.objects.get().pk}))
+        self.client.force_authenticate(user=None)
+        after = self.scrape()
+        
+        def delta(name):
+            return after.get(name, 0) - before.get(name, 0)
+        
+        self.assertEqual(delta('roadmap_upvote_writes_total{action="create"}'), 2)
+        self.assertEqual(delta('roadmap_upvote_writes_total{action="delete"}'), 1)
+        self.assertEqual(delta('roadmap_comment_writes_total{action="create"}'), 1)
+        self.assertEqual(delta('roadmap_comment_writes_total{action="delete"}'), 1)
+    
+    def test_counts_are_summed_across_worker_processes(self):
+        """Test a scrape adds up the files of every worker, including ones that have exited"""
+        import multiprocessing
+        import os
+        import tempfile
+        from .metrics import metrics_store
+        
+        def worker():
+            metrics_store.inc('roadmap_comment_writes_total', 5, action='create')
+            metrics_store.flush()
+        
+        series = 'roadmap_comment_writes_total{action="create"}'
+        own = self.scrape().get(series, 0)
+        with tempfile.TemporaryDirectory() as directory, self.settings(ROADMAP_METRICS={'DIRECTORY': directory}):
+            for _ in range(2):
+                process = multiprocessing.get_context('fork').Process(target=worker)
+                process.start()
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+            self.assertEqual(self.scrape()[series], own + 10)
+            self.assertEqual(len([name for name in os.listdir(directory) if name.endswith('.json')]), 3)
@@ -0,0 +1,280 @@
+"""
+Per-request performance breakdown: SQL, authentication, serializers, rendering.
+
+``ServerTimingMiddleware`` (see middleware.py) opens a ``RequestTiming`` for
+each request in a context variable. Context variables follow the request
+into ``sync_to_async`` threads, so the async views are measured as well. The
+pieces are recorded where they happen:
+
+- every database connection gets ``record_query`` as an execute wrapper
+  when it connects, on every alias and thread;
+- the authentication classes, the roadmap serializers and the JSON renderer
+  wrap their work in ``span``. Spans don't nest, so a nested serializer
+  counts once.
+
+The totals are sent back as a ``Server-Timing`` header and logged as one
+JSON line on the ``roadmap.timing`` logger. Requests slower than
+``SLOW_MS`` are logged at WARNING, the rest at INFO. Each route also feeds a
+``RollingHistogram`` of the last ``WINDOW`` seconds, which staff can read at
+``/api/stats/timing/``. The histograms live in each worker's memory and
+describe that worker only.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger('roadmap.timing')
+
+# Milliseconds; the last bucket is everything slower
+DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SPANS = ('auth', 'serialize', 'render')
+
+current_timing = contextvars.ContextVar('roadmap_request_timing', default=None)
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_REQUEST_TIMING', {})
+
+
+class RequestTiming:
+    """Counters for one request; every duration is in seconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.spans = dict.fromkeys(SPANS, 0.0)
+        self._open = set()
+        self.total = None
+
+    @contextmanager
+    def span(self, name):
+        if name in self._open:
+            yield
+            return
+        self._open.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] += time.perf_counter() - start
+            self._open.discard(name)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self):
+        """Milliseconds, rounded for logging and the histograms"""
+        record = {'total_ms': round(self.total * 1000, 3), 'queries': self.queries, 'db_ms': round(self.sql * 1000, 3)}
+        for name in SPANS:
+            record[f'{name}_ms'] = round(self.spans[name] * 1000, 3)
+        return record
+
+    def header(self):
+        """The ``Server-Timing`` header value"""
+        parts = [f'db;dur={self.sql * 1000:.2f};desc="{self.queries} queries"']
+        parts += [f'{name};dur={self.spans[name] * 1000:.2f}' for name in SPANS]
+        parts.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def span(name):
+    """Attribute the enclosed work to ``name`` on the current request, if any"""
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    with timing.span(name):
+        yield
+
+
+def record_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries += 1
+        timing.sql += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='roadmap.timing.record_query')
+
+
+class TimedAuthenticationMixin:
+    """Counts an authentication class's work as ``auth``"""
+
+    def authenticate(self, request):
+        with span('auth'):
+            return super().authenticate(request)
+
+
+class TimedSerializerMixin:
+    """Counts building the representation as ``serialize``"""
+
+    def to_representation(self, instance):
+        with span('serialize'):
+            return super().to_representation(instance)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class RollingHistogram:
+    """
+    Latency histogram over the last ``window`` seconds, kept as one bucket
+    array per ``slot`` seconds so old requests age out a slot at a time
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=300, slot=10):
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.slot = slot
+        self._slots = deque()
+
+    def _current(self, now):
+        start = now - now % self.slot
+        while self._slots and self._slots[0]['start'] <= now - self.window:
+            self._slots.popleft()
+        if not self._slots or self._slots[-1]['start'] != start:
+            self._slots.append({
+                'start': start,
+                'counts': [0] * (len(self.buckets) + 1),
+                'sums': dict.fromkeys(('total_ms', 'queries', 'db_ms') + tuple(f'{n}_ms' for n in SPANS), 0.0),
+            })
+        return self._slots[-1]
+
+    def record(self, record, now=None):
+        slot = self._current(time.time() if now is None else now)
+        slot['counts'][bisect.bisect_left(self.buckets, record['total_ms'])] += 1
+        for key in slot['sums']:
+            slot['sums'][key] += record[key]
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        counts = [0] * (len(self.buckets) + 1)
+        sums = {}
+        for slot in self._slots:
+            if slot['start'] <= now - self.window:
+                continue
+            counts = [a + b for a, b in zip(counts, slot['counts'])]
+            for key, value in slot['sums'].items():
+                sums[key] = sums.get(key, 0.0) + value
+        requests = sum(counts)
+        if not requests:
+            return None
+        labels = [f'le_{bound}' for bound in self.buckets] + ['inf']
+        return {
+            'requests': requests,
+            'buckets': dict(zip(labels, counts)),
+            # Upper bound of the bucket holding each percentile
+            'p50_ms': self.percentile(counts, 0.50),
+            'p95_ms': self.percentile(counts, 0.95),
+            'p99_ms': self.percentile(counts, 0.99),
+            'mean': {key: round(value / requests, 3) for key, value in sums.items()},
+        }
+
+    def percentile(self, counts, fraction):
+        target = fraction * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets + (None,), counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+
+class TimingRegistry:
+    """This worker's per-route histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', True)
+
+    def histogram(self):
+        config = _settings()
+        return RollingHistogram(
+            config.get('BUCKETS', DEFAULT_BUCKETS), config.get('WINDOW', 300), config.get('SLOT', 10)
+        )
+
+    def record(self, route, record):
+        with self._lock:
+            if route not in self._routes:
+                self._routes[route] = self.histogram()
+            self._routes[route].record(record)
+
+    def snapshot(self):
+        with self._lock:
+            routes = {route: histogram.snapshot() for route, histogram in self._routes.items()}
+        return {route: data for route, data in sorted(routes.items()) if data is not None}
+
+    def stats(self):
+        return {'enabled': self.enabled, 'window': _settings().get('WINDOW', 300), 'routes': self.snapshot()}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+timing_registry = TimingRegistry()
+
+
+def route_view(request):
+    """The matched URL pattern's view name; one value per route, whatever the path"""
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match.route) if match is not None else 'unmatched'
+
+
+def route_name(request):
+    return f'{request.method} {route_view(request)}'
+
+
+def begin():
+    """Open the timing for a request; returns the context token for ``end``"""
+    return current_timing.set(RequestTiming())
+
+
+def end(token, request, response):
+    """Close the request's timing: header, log line and histogram"""
+    timing = current_timing.get().finish()
+    current_timing.reset(token)
+    if not timing_registry.enabled:
+        return timing
+    config = _settings()
+    if config.get('HEADER', True):
+        response['Server-Timing'] = timing.header()
+
+    route = route_name(request)
+    record = timing.as_dict()
+    timing_registry.record(route, record)
+
+    level = logging.WARNING if record['total_ms'] >= config.get('SLOW_MS', 500) else logging.INFO
+    if logger.isEnabledFor(level):
+        line = dict(event='request', route=route, path=request.path, status=response.status_code, **record)
+        logger.log(level, json.dumps(line, separators=(',', ':')), extra={'timing': line})
+    return timing
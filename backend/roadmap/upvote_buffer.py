@@ -0,0 +1,405 @@
+"""
+Write-behind buffer for upvote toggles.
+
+With ``ROADMAP_UPVOTE_BUFFER['ENABLED']`` on, ``toggle_upvote`` does not write
+to the database. It works out the user's new state, appends one line to an
+append-only journal segment on local disk (fsynced before the response), and
+answers with that state and an estimated count. A flusher thread in each
+worker periodically merges every closed segment, keeps only the last state
+per (user, item), and applies the result in batched transactions. A burst of
+toggles on a popular item then costs a handful of short write transactions
+instead of one per click.
+
+Journal lines record the resulting state ("user 7 now upvotes item 3"), not
+the toggle, and counter deltas are computed from the rows actually inserted
+or deleted. Applying a segment twice is therefore harmless, which is what
+makes crash recovery safe: a segment is only deleted after its transaction
+commits, and anything left behind is applied again by the next flush (or by
+``manage.py flush_upvotes``).
+
+Each process writes its own segment and holds an exclusive ``flock`` on it
+while it is open, so a flusher can tell live segments from closed ones and
+from those left by a crashed worker (the kernel drops the lock with the
+process). A ``flush.lock`` file keeps two processes from flushing at once.
+The state a user's next click toggles from is shared between workers through
+the ``ALIAS`` cache until it has been flushed.
+
+Reads lag by up to ``FLUSH_INTERVAL``: ``user_upvoted`` and ``upvote_count``
+on the list and detail endpoints reflect flushed toggles only.
+"""
+import glob
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+try:
+    import fcntl
+except ImportError:  # Windows: the buffer is unavailable, direct writes still work
+    fcntl = None
+
+from .events import publish_counts
+from .metrics import metrics_store
+from .models import RoadmapItem, Upvote
+from .ranking import hot_score_expression
+from .signals import record_change
+from .upvote_sets import upvote_sets
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.journal'
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_UPVOTE_BUFFER', {})
+
+
+def parse_segment(data):
+    """
+    ``(timestamp_ns, user_id, item_id, upvoted)`` for every complete line.
+    A torn final line from a crash mid-write is ignored; it was never fsynced,
+    so that toggle was never acknowledged either.
+    """
+    entries = []
+    for line in data.split(b'\n')[:-1]:
+        try:
+            timestamp, user_id, item_id, state = (int(field) for field in line.split())
+        except ValueError:
+            continue
+        entries.append((timestamp, user_id, item_id, bool(state)))
+    return entries
+
+
+def merge_entries(entries):
+    """Last state per (user_id, item_id), by timestamp"""
+    merged = {}
+    for timestamp, user_id, item_id, upvoted in sorted(entries):
+        merged[(user_id, item_id)] = upvoted
+    return merged
+
+
+def apply_states(states, batch_size=500):
+    """
+    Make the upvote table match ``states`` ({(user_id, item_id): upvoted}) and
+    adjust counters by the rows actually added or removed. Idempotent.
+    """
+    added = removed = 0
+    pairs = list(states.items())
+    for start in range(0, len(pairs), batch_size):
+        batch = dict(pairs[start:start + batch_size])
+        user_ids = {user_id for user_id, _ in batch}
+        item_ids = {item_id for _, item_id in batch}
+        with transaction.atomic():
+            live_items = set(RoadmapItem.objects.filter(pk__in=item_ids).values_list('pk', flat=True))
+            live_users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+            existing = {
+                (user_id, item_id): pk
+                for pk, user_id, item_id in Upvote.objects.filter(
+                    user_id__in=user_ids, roadmap_item_id__in=item_ids
+                ).values_list('pk', 'user_id', 'roadmap_item_id')
+            }
+
+            to_add = [
+                pair for pair, upvoted in batch.items()
+                if upvoted and pair not in existing and pair[0] in live_users and pair[1] in live_items
+            ]
+            to_remove = [pair for pair, upvoted in batch.items() if not upvoted and pair in existing]
+
+            Upvote.objects.bulk_create(
+                [Upvote(user_id=user_id, roadmap_item_id=item_id) for user_id, item_id in to_add]
+            )
+            if to_remove:
+                # Raw DELETE: QuerySet.delete() would fire a post_delete signal per row
+                ids = [existing[pair] for pair in to_remove]
+                placeholders = ', '.join(['%s'] * len(ids))
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {Upvote._meta.db_table} WHERE id IN ({placeholders})', ids
+                    )
+
+            # Bulk writes send no signals, so the cached upvote sets are evicted here
+            for user_id in {user_id for user_id, _ in to_add + to_remove}:
+                upvote_sets.evict(user_id)
+
+            deltas = Counter()
+            for _, item_id in to_add:
+                deltas[item_id] += 1
+            for _, item_id in to_remove:
+                deltas[item_id] -= 1
+            for item_id, delta in deltas.items():
+                if delta:
+                    upvote_count = Greatest(F('upvote_count') + delta, 0)
+                    RoadmapItem.objects.filter(pk=item_id).update(
+                        upvote_count=upvote_count,
+                        hot_score=hot_score_expression(upvote_count),
+                    )
+            changed = {item_id for _, item_id in to_add + to_remove}
+            for item_id in changed:
+                record_change(item_id)
+            # One live event per item per flush, carrying the applied count
+            publish_counts('upvote', changed)
+        added += len(to_add)
+        removed += len(to_remove)
+    # The bulk writes above send no signals to count them
+    metrics_store.inc('roadmap_upvote_writes_total', added, action='create')
+    metrics_store.inc('roadmap_upvote_writes_total', removed, action='delete')
+    return added, removed
+
+
+class UpvoteBuffer:
+    key_prefix = 'roadmap:upvote-state'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._segment = None
+        self._segment_path = None
+        # Counter deltas of toggles this process journalled, per segment path,
+        # until that segment has been flushed; feeds the estimated count
+        self._pending = OrderedDict()
+        self._flusher = None
+        self.buffered = 0
+        self.flushed = 0
+        self.last_flush = None
+        self.flush_failures = 0
+        self.last_flush_error = None
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', False)
+
+    @property
+    def directory(self):
+        return str(_settings().get('DIRECTORY', os.path.join(settings.BASE_DIR, '.upvote_journal')))
+
+    @property
+    def cache(self):
+        return caches[_settings().get('ALIAS', 'default')]
+
+    @property
+    def flush_interval(self):
+        return _settings().get('FLUSH_INTERVAL', 1.0)
+
+    @property
+    def batch_size(self):
+        return _settings().get('BATCH_SIZE', 500)
+
+    @property
+    def fsync(self):
+        return _settings().get('FSYNC', True)
+
+    def _check_platform(self):
+        if fcntl is None:
+            raise ImproperlyConfigured('ROADMAP_UPVOTE_BUFFER needs fcntl.flock (POSIX only)')
+
+    def _lock_file(self, name, operation):
+        os.makedirs(self.directory, exist_ok=True)
+        handle = open(os.path.join(self.directory, name), 'a')
+        try:
+            fcntl.flock(handle, operation)
+        except BlockingIOError:
+            handle.close()
+            return None
+        return handle
+
+    def _open_segment(self):
+        """Create and lock a new segment; called with ``_lock`` held"""
+        # Shared scan lock: a flusher listing the directory never sees the
+        # segment between its creation and its flock
+        scan_lock = self._lock_file('scan.lock', fcntl.LOCK_SH)
+        try:
+            path = os.path.join(self.directory, f'{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}')
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        finally:
+            scan_lock.close()
+        self._segment = fd
+        self._segment_path = path
+        self._pending[path] = Counter()
+
+    def _close_segment(self):
+        """Close the open segment so flushers may take it; called with ``_lock`` held"""
+        if self._segment is not None:
+            os.close(self._segment)  # releases the flock
+            self._segment = None
+            self._segment_path = None
+
+    def state_key(self, user_id, item_id):
+        return f'{self.key_prefix}:{user_id}:{item_id}'
+
+    def _prune(self):
+        """Drop deltas of segments a flusher (in any process) has applied; ``_lock`` held"""
+        for path in list(self._pending):
+            if path != self._segment_path and not os.path.exists(path):
+                del self._pending[path]
+
+    def pending_delta(self, item_id):
+        with self._lock:
+            self._prune()
+            return sum(deltas[item_id] for deltas in self._pending.values())
+
+    def toggle(self, user, roadmap_item):
+        """Record a toggle and return ``(upvoted, estimated_upvote_count)``"""
+        self._check_platform()
+        # Unflushed state is shared through the cache, so whichever worker
+        # gets the next click toggles from the state the user last saw
+        key = self.state_key(user.pk, roadmap_item.pk)
+        current = self.cache.get(key)
+        if current is None:
+            current = Upvote.objects.filter(user=user, roadmap_item=roadmap_item).exists()
+        upvoted = not current
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked after the parent opened a segment: that lock is not ours
+                self._pid = os.getpid()
+                self._segment = None
+                self._segment_path = None
+                self._pending.clear()
+                self._flusher = None
+            if self._segment is None:
+                self._open_segment()
+            line = f'{time.time_ns()} {user.pk} {roadmap_item.pk} {int(upvoted)}\n'
+            os.write(self._segment, line.encode('ascii'))
+            if self.fsync:
+                os.fsync(self._segment)
+            self._pending[self._segment_path][roadmap_item.pk] += 1 if upvoted else -1
+            self.buffered += 1
+            self._start_flusher()
+        self.cache.set(key, upvoted, timeout=max(60, 10 * (self.flush_interval or 0)))
+
+        estimate = max(roadmap_item.upvote_count + self.pending_delta(roadmap_item.pk), 0)
+        return upvoted, estimate
+
+    def _start_flusher(self):
+        if self._flusher is None and self.flush_interval:
+            self._flusher = threading.Thread(target=self._run_flusher, name='upvote-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self._flush_in_background()
+
+    def _flush_in_background(self):
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception as exc:
+            # Segments stay on disk and are retried on the next pass, but a
+            # flush that keeps failing lets the cached toggle states expire
+            logger.exception('Upvote buffer flush failed; segments kept for the next pass')
+            with self._lock:
+                self.flush_failures += 1
+                self.last_flush_error = f'{type(exc).__name__}: {exc}'
+        finally:
+            connections.close_all()
+
+    def _write_segment(self, entries):
+        """Durably write ``entries`` to a new closed segment (the flusher's carry-over)"""
+        name = f'{entries[0][0]:020d}-{os.getpid()}-{time.time_ns()}'
+        temporary = os.path.join(self.directory, name + '.tmp')
+        with open(temporary, 'wb') as fh:
+            fh.write(b''.join(
+                f'{timestamp} {user_id} {item_id} {int(upvoted)}\n'.encode('ascii')
+                for timestamp, user_id, item_id, upvoted in entries
+            ))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.rename(temporary, os.path.join(self.directory, name + SEGMENT_SUFFIX))
+
+    def flush(self):
+        """
+        Close this process's segment, then apply the closed segments in the
+        directory (including those left by crashed workers). Returns a summary,
+        or None if another process is flushing right now.
+
+        Segments from different workers overlap in time, so only toggles older
+        than the oldest segment still being written are applied; a later flush
+        could otherwise apply an older state over a newer one. The rest is
+        carried over into a new segment for the next pass.
+        """
+        self._check_platform()
+        with self._lock:
+            self._close_segment()
+
+        flush_lock = self._lock_file('flush.lock', fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if flush_lock is None:
+            return None
+        segments = []
+        try:
+            watermark = time.time_ns()
+            scan_lock = self._lock_file('scan.lock', fcntl.LOCK_EX)
+            try:
+                for path in sorted(glob.glob(os.path.join(self.directory, '*' + SEGMENT_SUFFIX))):
+                    handle = open(path, 'rb')
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # Still being written by a live process
+                        handle.close()
+                        watermark = min(watermark, int(os.path.basename(path).split('-')[0]))
+                        continue
+                    segments.append((path, handle))
+            finally:
+                scan_lock.close()
+
+            entries = []
+            for path, handle in segments:
+                entries.extend(parse_segment(handle.read()))
+            entries.sort(key=lambda entry: entry[0])
+            ready = [entry for entry in entries if entry[0] < watermark]
+            carried = entries[len(ready):]
+            if carried:
+                self._write_segment(carried)
+            added, removed = apply_states(merge_entries(ready), self.batch_size)
+
+            # Only now is it safe to forget them; a crash before this replays them
+            for path, handle in segments:
+                os.unlink(path)
+        finally:
+            for path, handle in segments:
+                handle.close()
+            flush_lock.close()
+
+        with self._lock:
+            self._prune()
+            self.flushed += len(ready)
+            self.last_flush = time.time()
+        return {
+            'segments': len(segments),
+            'toggles': len(ready),
+            'carried': len(carried),
+            'added': added,
+            'removed': removed,
+        }
+
+    def reset(self):
+        """Close the open segment and forget pending deltas (tests)"""
+        with self._lock:
+            self._close_segment()
+            self._pending.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending_items': len({item_id for deltas in self._pending.values() for item_id in deltas}),
+                'buffered': self.buffered,
+                'flushed': self.flushed,
+                'last_flush': self.last_flush,
+                'flush_failures': self.flush_failures,
+                'last_flush_error': self.last_flush_error,
+            }
+
+
+upvote_buffer = UpvoteBuffer()
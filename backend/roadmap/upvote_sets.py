@@ -0,0 +1,114 @@
+"""
+Per-user cache of the roadmap item ids a user has upvoted.
+
+``GET /api/roadmap/upvoted/`` answers from it in one cache read, and the
+list and detail views take ``user_upvoted`` from it instead of running an
+``Upvote`` subquery per row. A user's set is loaded from the database on
+first use (one query over the ``(user, roadmap_item)`` unique index) and
+kept until that user's upvotes change.
+
+Entries are keyed by a per-user version, like the response cache's. An
+upvote insert or delete bumps it with ``incr``, now and again on commit.
+Nothing is ever read, modified and written back, so two workers toggling
+for the same user can't overwrite each other. A reader that loaded the set
+before a write committed stores it under a version nobody asks for anymore.
+In buffered mode the toggle patches the current entry in place, so the
+endpoint reflects a click before the flusher applies it. The flush then
+bumps the version and the set is reloaded from the database.
+
+Entries carry the user's ``date_joined``, so a set cached for a deleted
+user is never served to a new user who reuses the id. The cache alias
+should be shared between workers (the file cache by default outside DEBUG),
+like the response cache's.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Upvote
+
+
+def _settings():
+    return getattr(settings, 'ROADMAP_UPVOTE_SET_CACHE', {})
+
+
+class UpvoteSetCache:
+    key_prefix = 'roadmap:upvote-set'
+
+    def __init__(self):
+        self.hits = 0
+        self.loads = 0
+        self.updates = 0
+
+    @property
+    def enabled(self):
+        return _settings().get('ENABLED', True)
+
+    @property
+    def cache(self):
+        return caches[_settings().get('ALIAS', 'default')]
+
+    @property
+    def timeout(self):
+        return _settings().get('TIMEOUT', 300)
+
+    def version_key(self, user_id):
+        return f'{self.key_prefix}:version:{user_id}'
+
+    def get_version(self, user_id):
+        key = self.version_key(user_id)
+        version = self.cache.get(key)
+        if version is None:
+            self.cache.add(key, 1, timeout=None)
+            version = self.cache.get(key, 1)
+        return version
+
+    def bump(self, user_id):
+        key = self.version_key(user_id)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, timeout=None)
+            self.cache.incr(key)
+
+    def key(self, user_id):
+        return f'{self.key_prefix}:{user_id}:v{self.get_version(user_id)}'
+
+    @staticmethod
+    def owner(user):
+        return user.date_joined.timestamp()
+
+    def get(self, user):
+        """Frozenset of the item ids ``user`` has upvoted"""
+        key = self.key(user.pk)
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] == self.owner(user):
+            self.hits += 1
+            return entry[1]
+        self.loads += 1
+        item_ids = frozenset(Upvote.objects.filter(user=user).values_list('roadmap_item_id', flat=True))
+        self.cache.set(key, (self.owner(user), item_ids), timeout=self.timeout)
+        return item_ids
+
+    def apply(self, user_id, item_id, upvoted):
+        """Patch a buffered toggle into ``user_id``'s cached set, until the flush evicts it"""
+        key = self.key(user_id)
+        entry = self.cache.get(key)
+        if entry is None:
+            return  # loaded from the database on next use
+        owner, item_ids = entry
+        updated = item_ids | {item_id} if upvoted else item_ids - {item_id}
+        if updated != item_ids:
+            self.cache.set(key, (owner, updated), timeout=self.timeout)
+            self.updates += 1
+
+    def evict(self, user_id):
+        """Drop ``user_id``'s cached set, now and again on commit"""
+        self.bump(user_id)
+        transaction.on_commit(lambda: self.bump(user_id))
+
+    def stats(self):
+        return {'enabled': self.enabled, 'hits': self.hits, 'loads': self.loads, 'updates': self.updates}
+
+
+upvote_sets = UpvoteSetCache()
@@ -1,23 +1,47 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'roadmap'
 
+# Read endpoints run on the async ORM when served under ASGI (see roadmap.async_views)
+if settings.ROADMAP_ASYNC_READS:
+    from . import async_views
+    roadmap_list = async_views.roadmap_list
+    roadmap_detail = async_views.roadmap_detail
+    roadmap_comments = async_views.roadmap_comments
+    user_profile = async_views.user_profile
+else:
+    roadmap_list = views.RoadmapItemListView.as_view()
+    roadmap_detail = views.RoadmapItemDetailView.as_view()
+    roadmap_comments = views.RoadmapCommentsView.as_view()
+    user_profile = views.user_profile
+
 urlpatterns = [
     # Authentication URLs
     path('auth/register/', views.register, name='register'),
     path('auth/login/', views.login, name='login'),
     path('auth/logout/', views.logout, name='logout'),
-    path('auth/profile/', views.user_profile, name='user_profile'),
+    path('auth/profile/', user_profile, name='user_profile'),
     
     # Roadmap URLs
-    path('roadmap/', views.RoadmapItemListView.as_view(), name='roadmap_list'),
-    path('roadmap/<int:pk>/', views.RoadmapItemDetailView.as_view(), name='roadmap_detail'),
+    path('roadmap/', roadmap_list, name='roadmap_list'),
+    path('roadmap/<int:pk>/', roadmap_detail, name='roadmap_detail'),
+    path('roadmap/stats/', views.RoadmapStatsView.as_view(), name='roadmap_stats'),
     
     # Upvote URLs
     path('roadmap/<int:roadmap_id>/upvote/', views.toggle_upvote, name='toggle_upvote'),
+    path('roadmap/upvoted/', views.my_upvotes, name='my_upvotes'),
     
     # Comment URLs
-    path('roadmap/<int:roadmap_id>/comments/', views.RoadmapCommentsView.as_view(), name='roadmap_comments'),
+    path('roadmap/<int:roadmap_id>/comments/', roadmap_comments, name='roadmap_comments'),
     path('comments/<int:pk>/', views.CommentDetailView.as_view(), name='comment_detail'),
+    
+    # Operational URLs
+    path('batch/', views.batch, name='batch'),
+    path('events/', views.live_events, name='live_events'),
+    path('stats/cache/', views.cache_stats, name='cache_stats'),
+    path('stats/timing/', views.timing_stats, name='timing_stats'),
+    path('metrics', views.metrics, name='metrics'),
+    path('metrics/', views.metrics),
 ] 
\ No newline at end of file
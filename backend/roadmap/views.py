@@ -1,24 +1,49 @@
-from rest_framework import generics, status, filters, permissions
+from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db import models
-from django.db.models import Count
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Exists, F, OuterRef, Value
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from .authentication import token_cache
+from .batch import BatchError, parse_batch, run_batch
+from .cache import AnonymousResponseCacheMixin, item_scope, response_cache
+from .conditional import ConditionalGetMixin
+from .events import EventStream, HeldStream, event_hub, parse_event_id, publish
+from .fieldsets import SparseFieldsetMixin
+from .filters import FullTextSearchFilter, RoadmapOrderingFilter
+from .hashing import HashingPoolFull, authenticate_credentials, hashing_pool
+from .metrics import metrics_store, scrape_allowed
 from .models import RoadmapItem, Upvote, Comment
+from .pagination import CursorPaginationOptInMixin
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, RoadmapItemSerializer,
     RoadmapItemDetailSerializer, UpvoteSerializer, CommentSerializer,
     CommentCreateSerializer
 )
+from .summary import roadmap_stats
+from .timing import timing_registry
+from .upvote_buffer import upvote_buffer
+from .upvote_sets import upvote_sets
 
 
 # Create your views here.
 
 # Authentication Views
+def hashing_unavailable():
+    """Fast rejection while the password hashing pool is saturated"""
+    response = Response({
+        'error': 'Too many sign-in attempts right now, please retry shortly'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(hashing_pool.retry_after)
+    return response
+
+
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -26,7 +51,10 @@ def register(request):
     """User registration endpoint"""
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
+        try:
+            user = serializer.save()
+        except (HashingPoolFull, TimeoutError):
+            return hashing_unavailable()
         token, created = Token.objects.get_or_create(user=user)
         return Response({
             'user': UserSerializer(user).data,
@@ -45,7 +73,10 @@ def login(request):
     password = request.data.get('password')
     
     if username and password:
-        user = authenticate(username=username, password=password)
+        try:
+            user = authenticate_credentials(request, username, password)
+        except (HashingPoolFull, TimeoutError):
+            return hashing_unavailable()
         if user:
             token, created = Token.objects.get_or_create(user=user)
             return Response({
@@ -75,35 +106,128 @@ def logout(request):
 
 
 # Roadmap Views
-class RoadmapItemListView(generics.ListAPIView):
+def annotate_engagement(queryset, user):
+    """
+    Annotate the requesting user's upvote flag so a whole page of roadmap items
+    is serialized without per-row queries. Counts are stored on the row itself.
+    """
+    if user is not None and user.is_authenticated:
+        user_upvoted = Exists(Upvote.objects.filter(roadmap_item=OuterRef('pk'), user=user))
+    else:
+        user_upvoted = Value(False)
+    return queryset.annotate(user_upvoted_annotated=user_upvoted)
+
+
+class RoadmapItemFieldsetMixin(SparseFieldsetMixin):
+    """Columns behind RoadmapItemSerializer fields; counters are stored, so no aggregates to skip"""
+    field_columns = {
+        'upvote_count': ['upvote_count'],
+        'user_upvoted': [],
+        'comments_count': ['comment_count'],
+        'comments': [],
+    }
+    # Sort keys, read back for cursor positions
+    always_load = ['created_at', 'upvote_count', 'hot_score']
+    
+    def get_item_queryset(self, queryset):
+        queryset = self.sparse_queryset(queryset)
+        if not self.wants_field('user_upvoted') or self.uses_upvote_set():
+            return queryset
+        return annotate_engagement(queryset, self.request.user)
+    
+    def uses_upvote_set(self):
+        return upvote_sets.enabled and self.request.user.is_authenticated
+    
+    def upvoted_item_ids(self):
+        """The requesting user's cached upvote set, or None when flags come from the query"""
+        if not hasattr(self, '_upvoted_item_ids'):
+            wanted = self.wants_field('user_upvoted') and self.uses_upvote_set()
+            self._upvoted_item_ids = upvote_sets.get(self.request.user) if wanted else None
+        return self._upvoted_item_ids
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['upvoted_item_ids'] = self.upvoted_item_ids()
+        return context
+
+
+class RoadmapItemListView(ConditionalGetMixin, AnonymousResponseCacheMixin, CursorPaginationOptInMixin, RoadmapItemFieldsetMixin, generics.ListAPIView):
     """List all roadmap items with filtering and sorting"""
-    queryset = RoadmapItem.objects.all().annotate(
-        upvote_count_annotated=models.Count('upvotes')
-    )
+    queryset = RoadmapItem.objects.all()
     serializer_class = RoadmapItemSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    # Search runs before ordering so relevance can be the default sort
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, RoadmapOrderingFilter]
     filterset_fields = ['status', 'category']
-    ordering_fields = ['created_at', 'upvote_count_annotated']
+    ordering_fields = ['created_at', 'upvote_count', 'upvote_count_annotated', 'hot_score']
     ordering = ['-created_at']
+    sort_by_orderings = {
+        'popularity': ['-upvote_count', '-created_at'],
+        # Stored time-decayed score (roadmap.ranking), read off an index
+        'hot': ['-hot_score', '-created_at'],
+    }
     search_fields = ['title', 'description']
+    response_cache_name = 'roadmap_list'
+    
+    facets_param = 'facets'
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
-        # Custom filtering for popularity (upvote count)
-        sort_by = self.request.query_params.get('sort_by')
-        if sort_by == 'popularity':
-            queryset = queryset.order_by('-upvote_count_annotated', '-created_at')
-        
-        return queryset
+        queryset = self.get_item_queryset(super().get_queryset())
+        # Kept as an alias of the stored counter for clients that still send
+        # ordering=upvote_count_annotated
+        return queryset.annotate(upvote_count_annotated=F('upvote_count'))
+    
+    def facet_queryset(self, queryset):
+        """
+        With ``?facets=true``, one grouped query counting the filtered (and
+        searched) items per status and category pair; otherwise None
+        """
+        if self.request.query_params.get(self.facets_param, '').lower() not in ('1', 'true'):
+            return None
+        return queryset.order_by().values_list('status', 'category').annotate(items=Count('pk'))
+    
+    @staticmethod
+    def facet_counts(rows):
+        facets = {'status': {}, 'category': {}}
+        for item_status, category, items in rows:
+            facets['status'][item_status] = facets['status'].get(item_status, 0) + items
+            facets['category'][category] = facets['category'].get(category, 0) + items
+        return facets
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        facets = self.facet_queryset(self.filter_queryset(self.get_queryset()))
+        if facets is not None:
+            response.data['facets'] = self.facet_counts(facets)
+        return response
 
 
-class RoadmapItemDetailView(generics.RetrieveAPIView):
+class RoadmapItemDetailView(ConditionalGetMixin, AnonymousResponseCacheMixin, RoadmapItemFieldsetMixin, generics.RetrieveAPIView):
     """Get detailed view of a roadmap item with comments"""
     queryset = RoadmapItem.objects.all()
     serializer_class = RoadmapItemDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    response_cache_name = 'roadmap_detail'
+    
+    def get_response_cache_scope(self):
+        return item_scope(self.kwargs['pk'])
+    
+    def get_version_scope(self):
+        return item_scope(self.kwargs['pk'])
+    
+    def get_queryset(self):
+        # Without ``comments`` in the fieldset the thread query never runs
+        return self.get_item_queryset(super().get_queryset())
+
+
+class RoadmapStatsView(ConditionalGetMixin, AnonymousResponseCacheMixin, generics.RetrieveAPIView):
+    """Item, upvote and comment totals, overall and per status and category"""
+    permission_classes = [permissions.AllowAny]
+    response_cache_name = 'roadmap_stats'
+    
+    def retrieve(self, request, *args, **kwargs):
+        # A read of the trigger-maintained summary rows, whatever the table sizes
+        return Response(roadmap_stats())
 
 
 # Upvoting Views
@@ -116,14 +240,29 @@ def toggle_upvote(request, roadmap_id):
     except RoadmapItem.DoesNotExist:
         return Response({'error': 'Roadmap item not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    upvote, created = Upvote.objects.get_or_create(
-        user=request.user,
-        roadmap_item=roadmap_item
-    )
+    if upvote_buffer.enabled:
+        # Write-behind: journalled now, applied to the database by the flusher
+        upvoted, upvote_count = upvote_buffer.toggle(request.user, roadmap_item)
+        upvote_sets.apply(request.user.pk, roadmap_item.pk, upvoted)
+        return Response({
+            'message': 'Upvote added' if upvoted else 'Upvote removed',
+            'upvoted': upvoted,
+            'upvote_count': upvote_count,
+            'pending': True
+        })
+    
+    with transaction.atomic():
+        upvote, created = Upvote.objects.get_or_create(
+            user=request.user,
+            roadmap_item=roadmap_item
+        )
+        if not created:
+            # If upvote already exists, remove it
+            upvote.delete()
+        roadmap_item.adjust_counters(upvotes=1 if created else -1)
+        publish('upvote', roadmap_item)
     
     if not created:
-        # If upvote already exists, remove it
-        upvote.delete()
         return Response({
             'message': 'Upvote removed',
             'upvoted': False,
@@ -138,16 +277,41 @@ def toggle_upvote(request, roadmap_id):
         })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def my_upvotes(request):
+    """Ids of every roadmap item the current user has upvoted"""
+    if upvote_sets.enabled:
+        item_ids = upvote_sets.get(request.user)
+    else:
+        item_ids = Upvote.objects.filter(user=request.user).values_list('roadmap_item_id', flat=True)
+    return Response({'item_ids': sorted(item_ids)})
+
+
 # Comment Views
-class RoadmapCommentsView(generics.ListCreateAPIView):
+class RoadmapCommentsView(ConditionalGetMixin, CursorPaginationOptInMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     """List and create comments for a roadmap item"""
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    field_columns = {
+        'parent_comment': ['parent_comment_id'],
+        'can_edit': ['user_id'],
+        'can_reply': ['depth'],
+        'depth_level': ['depth'],
+        'is_reply': ['parent_comment_id'],
+    }
+    always_load = ['created_at']
+    
+    def get_version_scope(self):
+        return item_scope(self.kwargs['roadmap_id'])
     
     def get_queryset(self):
         roadmap_id = self.kwargs['roadmap_id']
         # Return all comments for this roadmap item (flat structure for frontend to organize)
-        return Comment.objects.filter(roadmap_item_id=roadmap_id).order_by('created_at')
+        queryset = Comment.objects.filter(roadmap_item_id=roadmap_id).order_by('created_at')
+        if self.wants_field('user'):
+            queryset = queryset.select_related('user')
+        return self.sparse_queryset(queryset)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -163,6 +327,11 @@ class RoadmapCommentsView(generics.ListCreateAPIView):
             except RoadmapItem.DoesNotExist:
                 pass
         return context
+    
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            comment = serializer.save()
+            publish('comment_created', comment.roadmap_item, [comment.pk])
 
 
 class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -184,6 +353,20 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("You can only edit your own comments.")
         return obj
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            comment = serializer.save()
+            publish('comment_updated', comment.roadmap_item, [comment.pk])
+    
+    def perform_destroy(self, instance):
+        # Replies cascade with their parent, so the counter drops by the whole thread
+        with transaction.atomic():
+            removed = instance.thread_comment_ids()
+            roadmap_item = instance.roadmap_item
+            instance.delete()
+            roadmap_item.adjust_counters(comments=-len(removed))
+            publish('comment_deleted', roadmap_item, removed)
 
 
 @api_view(['GET'])
@@ -193,3 +376,85 @@ def user_profile(request):
     if request.user.is_authenticated:
         return Response(UserSerializer(request.user).data)
     return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def batch(request):
+    """
+    Run several GET requests to the API in one round trip. Credentials are
+    checked once here; each sub-request still applies its own permissions.
+    """
+    try:
+        entries = parse_batch(request.data)
+    except BatchError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return HttpResponse(run_batch(request, entries), content_type='application/json')
+
+
+@require_GET
+def live_events(request):
+    """
+    Server-Sent Events stream of upvote and comment changes, optionally for a
+    single item (``?item=<id>``). Resumes after the ``Last-Event-ID`` header,
+    or ``?last_event_id=`` for a client's first connection.
+    """
+    item_id = request.GET.get('item')
+    if item_id is not None:
+        item_id = parse_event_id(item_id)
+        if item_id is None:
+            return JsonResponse({'error': 'item must be a roadmap item id'}, status=status.HTTP_400_BAD_REQUEST)
+    last_event_id = parse_event_id(
+        request.headers.get('Last-Event-ID', request.GET.get('last_event_id'))
+    )
+    stream = EventStream(item_id=item_id, last_event_id=last_event_id)
+    # Under ASGI the stream waits on the event loop instead of a thread
+    if isinstance(request, ASGIRequest):
+        frames = stream.aframes()
+    elif event_hub.hold_thread():
+        frames = HeldStream(stream.frames())
+    else:
+        response = JsonResponse(
+            {'error': 'Too many live event streams on this worker'}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = max(1, round(stream.retry / 1000))
+        return response
+    response = StreamingHttpResponse(frames, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # keep reverse proxies from buffering events
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """Counters of this worker's caches, hashing pool, upvote buffer and event hub"""
+    return Response({
+        'token_cache': token_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'upvote_sets': upvote_sets.stats(),
+        'password_hashing': hashing_pool.stats(),
+        'upvote_buffer': upvote_buffer.stats(),
+        'live_events': event_hub.stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def timing_stats(request):
+    """This worker's per-route request timings over the rolling window (see roadmap.timing)"""
+    return Response(timing_registry.stats())
+
+
+@require_GET
+def metrics(request):
+    """
+    Prometheus text-format metrics summed over every worker (see roadmap.metrics).
+    Scrapers send ``Authorization: Bearer <METRICS_TOKEN>``; staff can also read
+    it with their session.
+    """
+    if not metrics_store.enabled:
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    if not scrape_allowed(request):
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(metrics_store.render(), content_type=metrics_store.content_type)
@@ -57,9 +57,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'roadmap.middleware.ServerTimingMiddleware',  # Server-Timing header and per-route timings
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
+    'roadmap.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise static files, async-capable for ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,7 +92,36 @@ WSGI_APPLICATION = 'roadmap_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-# Using SQLite3 for both development and production
+# Using SQLite3 for both development and production. The tuned profile
+# (SQLITE_TUNING=False for Django's stock behaviour) is aimed at several
+# gunicorn workers sharing one file:
+# - WAL lets readers run while a write commits.
+# - Writers wait up to busy_timeout for the lock instead of failing.
+# - IMMEDIATE transactions take the write lock at BEGIN, so two read-then-write
+#   transactions can't deadlock upgrading their locks.
+# Compare the profiles with `python manage.py stress_db`.
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'True').lower() == 'true'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # durable in WAL mode except across power loss
+    'busy_timeout': 20000,  # milliseconds
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,  # KiB per connection
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_options(transaction_mode='IMMEDIATE', **pragmas):
+    """OPTIONS running SQLITE_PRAGMAS (plus ``pragmas``) on every new connection"""
+    pragmas = {**SQLITE_PRAGMAS, **pragmas}
+    return {
+        'init_command': '; '.join(f'PRAGMA {name} = {value}' for name, value in pragmas.items()),
+        'timeout': pragmas['busy_timeout'] / 1000,
+        'transaction_mode': transaction_mode,
+    }
+
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -99,6 +129,175 @@ DATABASES = {
     }
 }
 
+if SQLITE_TUNING:
+    DATABASES['default'].update(
+        OPTIONS=sqlite_options(),
+        # Persistent connections skip reconnecting and re-running the PRAGMAs
+        CONN_MAX_AGE=int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        CONN_HEALTH_CHECKS=True,
+    )
+    # Same file opened read-only; roadmap.routers sends reads here
+    DATABASES['readonly'] = {
+        **DATABASES['default'],
+        'OPTIONS': sqlite_options(transaction_mode=None, query_only='ON'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['roadmap.routers.ReadWriteRouter']
+ROADMAP_READ_DATABASE = 'readonly' if SQLITE_TUNING else None
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Anonymous roadmap responses are cached in the 'responses' alias. Local memory
+# is private to each worker process, so multi-worker deployments default to the
+# file-based backend, which all workers on the host share.
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_DIR', BASE_DIR / '.response_cache'),
+    } if RESPONSE_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roadmap-responses',
+    },
+}
+
+ROADMAP_RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true',
+    'ALIAS': 'responses',
+    'TIMEOUT': 300,
+}
+
+# Token -> user lookups cached per worker process (see roadmap.authentication).
+# Logout and user changes evict entries; ALIAS carries evictions to other workers.
+ROADMAP_TOKEN_CACHE = {
+    'ENABLED': os.environ.get('TOKEN_CACHE_ENABLED', 'True').lower() == 'true',
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'ALIAS': 'responses',
+}
+
+# Password hashing for login/register runs on a bounded per-process pool; when
+# WORKERS + MAX_QUEUE requests are already hashing, new ones get a 503.
+ROADMAP_PASSWORD_HASHING = {
+    'ENABLED': os.environ.get('PASSWORD_HASHING_POOL', 'True').lower() == 'true',
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 2)),
+    'MAX_QUEUE': int(os.environ.get('PASSWORD_HASHING_MAX_QUEUE', 8)),
+    'TIMEOUT': 30,
+    'RETRY_AFTER': 1,
+}
+
+# ModelBackend with its hashing on the pool above; API and admin logins alike
+AUTHENTICATION_BACKENDS = [
+    'roadmap.hashing.PooledModelBackend',
+]
+
+# Optional write-behind mode for upvote toggles (see roadmap.upvote_buffer):
+# toggles go to an fsynced journal in DIRECTORY and reach the database in
+# batches every FLUSH_INTERVAL seconds. DIRECTORY must be local to the host.
+ROADMAP_UPVOTE_BUFFER = {
+    'ENABLED': os.environ.get('UPVOTE_BUFFER', 'False').lower() == 'true',
+    'DIRECTORY': os.environ.get('UPVOTE_JOURNAL_DIR', BASE_DIR / '.upvote_journal'),
+    'ALIAS': 'responses',
+    'FLUSH_INTERVAL': 1.0,
+    'BATCH_SIZE': 500,
+    'FSYNC': True,
+}
+
+# POST /api/batch/ runs up to MAX_REQUESTS GET sub-requests in one round trip
+ROADMAP_BATCH = {
+    'MAX_REQUESTS': 10,
+}
+
+# Server-Sent Events at /api/events/ (see roadmap.events). Each worker tails the
+# LiveEvent table every POLL_INTERVAL seconds while clients are connected and
+# keeps the newest BUFFER events in memory; RETENTION bounds the table (and so
+# how far back Last-Event-ID can resume). Streams close after MAX_DURATION
+# seconds and clients reconnect after RETRY milliseconds.
+ROADMAP_LIVE_EVENTS = {
+    'POLL_INTERVAL': 0.5,
+    'BUFFER': 1000,
+    'BATCH_SIZE': 500,
+    'RETENTION': 10000,
+    'PRUNE_EVERY': 500,
+    'HEARTBEAT': 15,
+    'MAX_DURATION': 300,
+    'RETRY': 3000,
+    # Streams each worker process serves under WSGI, where every stream holds a thread
+    'MAX_SYNC_STREAMS': 2,
+}
+
+# sort_by=hot ranks by log2(1 + upvotes + COMMENT_WEIGHT * comments), with an
+# item's weight halving every HALF_LIFE seconds of age (see roadmap.ranking).
+# Run manage.py rescore_hot after changing either value.
+ROADMAP_HOT_RANKING = {
+    'COMMENT_WEIGHT': 2,
+    'HALF_LIFE': 7 * 24 * 3600,
+}
+
+# Per-user sets of upvoted item ids (see roadmap.upvote_sets), behind
+# GET /api/roadmap/upvoted/ and the user_upvoted flags on list and detail
+# responses. ALIAS should be shared between workers outside DEBUG.
+ROADMAP_UPVOTE_SET_CACHE = {
+    'ENABLED': os.environ.get('UPVOTE_SET_CACHE', 'True').lower() == 'true',
+    'ALIAS': 'responses',
+    'TIMEOUT': 300,
+}
+
+# Per-request timing (see roadmap.timing): query count, SQL, auth, serializer
+# and render time in a Server-Timing header and a JSON log line per request.
+# Requests of SLOW_MS or more log at WARNING; per-route histograms cover the
+# last WINDOW seconds in SLOT-second steps, with BUCKETS upper bounds in ms.
+ROADMAP_REQUEST_TIMING = {
+    'ENABLED': os.environ.get('REQUEST_TIMING', 'True').lower() == 'true',
+    'HEADER': True,
+    'SLOW_MS': 500,
+    'BUCKETS': (5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+    'WINDOW': 300,
+    'SLOT': 10,
+}
+
+# Prometheus metrics at /api/metrics (see roadmap.metrics). Each worker writes
+# its counts to its own file in DIRECTORY every FLUSH_INTERVAL seconds and a
+# scrape sums them; without a DIRECTORY only the answering process is counted.
+# Scrapers authenticate with "Authorization: Bearer <TOKEN>"; staff sessions
+# can always read it. BUCKETS are the latency histogram bounds in seconds.
+ROADMAP_METRICS = {
+    'ENABLED': os.environ.get('METRICS', 'True').lower() == 'true',
+    'DIRECTORY': os.environ.get('METRICS_DIR', None if DEBUG else BASE_DIR / '.metrics'),
+    'FLUSH_INTERVAL': 1.0,
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Every request at INFO in production; only slow ones while developing
+        'roadmap.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_TIMING_LOG_LEVEL', 'WARNING' if DEBUG else 'INFO'),
+            'propagate': False,
+        },
+        # Background flush failures of the write-behind upvote buffer
+        'roadmap.upvote_buffer': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,19 +347,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'roadmap.authentication.CachedTokenAuthentication',
+        'roadmap.authentication.TimedSessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'roadmap.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'roadmap.timing.TimedJSONRenderer',
     ],
 }
 
+# Serve the roadmap read endpoints from async views (roadmap.async_views). Turn
+# on when running under ASGI (uvicorn workers); under WSGI every async view
+# pays for its own event loop, so the sync views are the better fit there.
+ROADMAP_ASYNC_READS = os.environ.get('ASYNC_READS', 'False').lower() == 'true'
+if ROADMAP_ASYNC_READS:
+    # The async ORM runs queries on executor threads, so persistent
+    # connections would pile up per thread instead of per request
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+
+# Build roadmap and comment payloads as plain dicts instead of going through
+# DRF's per-field machinery (output is identical; see roadmap.serializers)
+ROADMAP_FAST_SERIALIZATION = os.environ.get('FAST_SERIALIZATION', 'True').lower() == 'true'
+
 # CORS settings for frontend communication
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React development server
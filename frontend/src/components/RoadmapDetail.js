@@ -240,9 +240,6 @@ const RoadmapDetail = () => {
   useEffect(() => {
     const loadData = async () => {
       await fetchRoadmapItem();
-      if (isAuthenticated) {
-        await fetchComments();
-      }
     };
     
     loadData();
@@ -253,6 +250,8 @@ const RoadmapDetail = () => {
       setLoading(true);
       const response = await roadmapAPI.getItem(id);
       setRoadmapItem(response.data);
+      // The detail payload already carries the nested comment tree
+      setComments(isAuthenticated ? (response.data.comments || []) : []);
       setError('');
     } catch (err) {
       const errorInfo = errorHandlers.dataFetch(err, 'roadmap_item');
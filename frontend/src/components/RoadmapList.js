@@ -76,6 +76,7 @@ const FilterSection = React.memo(({
             value={filters.ordering}
             onChange={(e) => onFilterChange('ordering', e.target.value)}
           >
+            <option value="-hot_score">Trending</option>
             <option value="-upvote_count_annotated">Most Popular (Most Upvotes)</option>
             <option value="upvote_count_annotated">Least Popular (Least Upvotes)</option>
             <option value="-created_at">Newest First</option>
@@ -68,6 +68,8 @@ export const roadmapAPI = {
   getItems: (params = {}) => api.get('/roadmap/', { params }),
   getItem: (id) => api.get(`/roadmap/${id}/`),
   toggleUpvote: (id) => api.post(`/roadmap/${id}/upvote/`),
+  getUpvotedIds: () => api.get('/roadmap/upvoted/'),
+  getStats: () => api.get('/roadmap/stats/'),
 };
 
 // Comment APIs
@@ -80,4 +82,12 @@ export const commentAPI = {
   deleteComment: (commentId) => api.delete(`/comments/${commentId}/`),
 };
 
+// Batch API: several GETs in one round trip. Paths are relative to the API
+// root (e.g. `/roadmap/7/`); results come back in order as {id, status, body}.
+export const batchAPI = {
+  get: (paths) => api.post('/batch/', {
+    requests: paths.map((path) => `${new URL(api.defaults.baseURL).pathname}${path}`),
+  }).then((response) => response.data.responses),
+};
+
 export default api; 
\ No newline at end of file